@@ -0,0 +1,112 @@
+"""Add user item_count maintained by triggers
+
+Revision ID: 5f0c2b7d9e41
+Revises: 1a31ce608336
+Create Date: 2026-10-18 10:12:31.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c2b7d9e41'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+    # Statement-level triggers with transition tables: one UPDATE per owner
+    # per statement, so multi-row inserts/deletes and FK cascades stay cheap
+    # and the counter can never drift from what the application writes.
+    op.execute(
+        """
+        CREATE FUNCTION item_count_after_insert() RETURNS trigger AS $$
+        BEGIN
+            UPDATE "user" SET item_count = "user".item_count + delta.n
+            FROM (SELECT owner_id, count(*) AS n FROM new_items GROUP BY owner_id) AS delta
+            WHERE "user".id = delta.owner_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION item_count_after_delete() RETURNS trigger AS $$
+        BEGIN
+            UPDATE "user" SET item_count = "user".item_count - delta.n
+            FROM (SELECT owner_id, count(*) AS n FROM old_items GROUP BY owner_id) AS delta
+            WHERE "user".id = delta.owner_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION item_count_after_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE "user" SET item_count = "user".item_count + delta.n
+            FROM (
+                SELECT owner_id, sum(n) AS n FROM (
+                    SELECT new_items.owner_id, 1 AS n
+                    FROM new_items JOIN old_items ON old_items.id = new_items.id
+                    WHERE new_items.owner_id <> old_items.owner_id
+                    UNION ALL
+                    SELECT old_items.owner_id, -1 AS n
+                    FROM new_items JOIN old_items ON old_items.id = new_items.id
+                    WHERE new_items.owner_id <> old_items.owner_id
+                ) AS moved
+                GROUP BY owner_id
+            ) AS delta
+            WHERE "user".id = delta.owner_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER item_count_insert AFTER INSERT ON item
+        REFERENCING NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION item_count_after_insert()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER item_count_delete AFTER DELETE ON item
+        REFERENCING OLD TABLE AS old_items
+        FOR EACH STATEMENT EXECUTE FUNCTION item_count_after_delete()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER item_count_update AFTER UPDATE ON item
+        REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION item_count_after_update()
+        """
+    )
+    # Backfill only once the triggers exist, in the same transaction and with
+    # writers to item blocked, so no insert or delete can land between the
+    # count and the triggers taking over.
+    op.execute('LOCK TABLE item IN SHARE MODE')
+    op.execute(
+        """
+        UPDATE "user" SET item_count = counts.n
+        FROM (SELECT owner_id, count(*) AS n FROM item GROUP BY owner_id) AS counts
+        WHERE "user".id = counts.owner_id
+        """
+    )
+
+
+def downgrade():
+    op.execute('DROP TRIGGER item_count_update ON item')
+    op.execute('DROP TRIGGER item_count_delete ON item')
+    op.execute('DROP TRIGGER item_count_insert ON item')
+    op.execute('DROP FUNCTION item_count_after_update()')
+    op.execute('DROP FUNCTION item_count_after_delete()')
+    op.execute('DROP FUNCTION item_count_after_insert()')
+    op.drop_column('user', 'item_count')
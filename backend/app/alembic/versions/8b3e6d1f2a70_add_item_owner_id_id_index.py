@@ -0,0 +1,37 @@
+"""Add (owner_id, id) index on item
+
+Revision ID: 8b3e6d1f2a70
+Revises: 5f0c2b7d9e41
+Create Date: 2026-10-18 11:02:47.903115
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3e6d1f2a70'
+down_revision = '5f0c2b7d9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction and does not
+    # block writes to a live table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_owner_id_id',
+            'item',
+            ['owner_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_item_owner_id_id',
+            table_name='item',
+            postgresql_concurrently=True,
+        )
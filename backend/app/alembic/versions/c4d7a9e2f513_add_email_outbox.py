@@ -0,0 +1,46 @@
+"""Add email outbox table
+
+Revision ID: c4d7a9e2f513
+Revises: 8b3e6d1f2a70
+Create Date: 2026-10-18 14:21:09.336871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7a9e2f513'
+down_revision = '8b3e6d1f2a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('email_to', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(length=1024), nullable=False),
+        sa.Column('html_content', sa.Text(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_email_outbox_pending',
+        'email_outbox',
+        ['next_attempt_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_pending', table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,28 @@
+"""Clear bodies of delivered and failed outbox emails
+
+Revision ID: f3b8d2a61c05
+Revises: a6e3f9c18d27
+Create Date: 2026-10-18 18:20:11.402917
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d2a61c05'
+down_revision = 'a6e3f9c18d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bodies may contain new-account passwords or password reset tokens; the
+    # worker now clears them once an email is done, do the same for old rows.
+    op.execute(
+        "UPDATE email_outbox SET html_content = '' "
+        "WHERE status IN ('sent', 'failed') AND html_content <> ''"
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,132 @@
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pydantic_core
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.fields import fields_response
+from app.api.serialization import fast_response
+from app.core.db import async_engine
+from app.core.response_cache import response_cache
+
+# 命名空间：缓存的响应依赖哪些数据，写操作按命名空间精确失效
+ITEMS = "items"  # 所有项目（超级用户的项目列表）
+ITEM_OWNERS = "item-owners"  # 项目的所有者，删除用户时级联删除项目
+USERS = "users"  # 用户列表
+
+
+def items_of(owner_id: uuid.UUID) -> str:
+    """某个用户的项目列表"""
+    return f"items:owner:{owner_id}"
+
+
+def item(id: uuid.UUID) -> str:
+    """单个项目"""
+    return f"item:{id}"
+
+
+def user(id: uuid.UUID) -> str:
+    """单个用户"""
+    return f"user:{id}"
+
+
+def item_namespaces(owner_id: uuid.UUID, *ids: uuid.UUID) -> list[str]:
+    """
+    项目写操作影响的命名空间
+
+    Args:
+        owner_id: 项目所有者ID
+        *ids: 被修改的项目ID
+
+    Returns:
+        命名空间列表
+    """
+    return [ITEMS, items_of(owner_id), *(item(id) for id in ids)]
+
+
+def user_namespaces(id: uuid.UUID, *, deleted: bool = False) -> list[str]:
+    """
+    用户写操作影响的命名空间
+    删除用户会级联删除其项目，同时使项目相关的缓存失效
+
+    Args:
+        id: 用户ID
+        deleted: 用户是否被删除
+
+    Returns:
+        命名空间列表
+    """
+    namespaces = [USERS, user(id)]
+    if deleted:
+        namespaces += [ITEMS, items_of(id), ITEM_OWNERS]
+    return namespaces
+
+
+async def cached_response(
+    request: Request,
+    *,
+    session: AsyncSession,
+    scope: str,
+    namespaces: list[str],
+    load: Callable[[AsyncSession], Awaitable[Any]],
+    response_type: Any,
+) -> Any:
+    """
+    带缓存的读取
+    缓存键由用户范围、请求路径和排序后的查询参数组成；
+    未启用缓存时直接调用load，行为与不使用缓存相同
+
+    Args:
+        request: 当前请求
+        session: 当前请求的数据库会话
+        scope: 用户范围，结果不同的用户必须使用不同的范围
+        namespaces: 响应依赖的命名空间
+        load: 使用给定会话生成响应内容，返回模型或稀疏字段字典
+        response_type: 路由的response_model
+
+    Returns:
+        响应
+    """
+    if response_cache is None:
+        content = await load(session)
+        if not isinstance(content, BaseModel):
+            return fields_response(content)
+        return fast_response(response_type, content)
+
+    async def load_body() -> bytes:
+        return pydantic_core.to_json(await load(session))
+
+    async def refresh_body() -> bytes:
+        # 后台刷新时请求的会话已经关闭，需要单独的会话
+        async with AsyncSession(async_engine, expire_on_commit=False) as s:
+            return pydantic_core.to_json(await load(s))
+
+    query = sorted(request.query_params.multi_items())
+    key = f"{scope}|{request.url.path}|{query}"
+    body = await response_cache.get_or_load(key, namespaces, load_body, refresh_body)
+    return Response(content=body, media_type="application/json")
+
+
+async def invalidate(namespaces: list[str]) -> None:
+    """
+    写操作提交后使相关缓存失效，未启用缓存时什么都不做
+
+    Args:
+        namespaces: 命名空间列表
+    """
+    if response_cache is not None:
+        await response_cache.invalidate(namespaces)
+
+
+def invalidate_sync(namespaces: list[str]) -> None:
+    """
+    同步版本的invalidate，供没有事件循环的线程（如任务worker）调用
+
+    Args:
+        namespaces: 命名空间列表
+    """
+    if response_cache is not None:
+        response_cache.invalidate_sync(namespaces)
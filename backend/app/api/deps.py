@@ -1,16 +1,23 @@
-from collections.abc import Generator
+import uuid
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.datastructures import Headers
+from starlette.types import Scope
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
+from app.core.security import Principal, principal_cache
+from app.core.tracing import span
 from app.models import TokenPayload, User
 
 # OAuth2密码承载者，用于处理访问令牌
@@ -27,48 +34,100 @@ def get_db() -> Generator[Session, None, None]:
     Yields:
         数据库会话对象
     """
-    with Session(engine) as session:
+    # 写入的字段都在客户端生成，提交后不需要重新加载对象
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    异步数据库会话依赖
+    为异步路由提供数据库会话，等待数据库期间不占用线程池
+
+    Yields:
+        异步数据库会话对象
+    """
+    # 提交后不使对象过期，避免在异步上下文中隐式触发懒加载
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
 
 
 # 类型注解别名，用于依赖注入
 SessionDep = Annotated[Session, Depends(get_db)]  # 数据库会话依赖
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]  # 异步数据库会话依赖
 TokenDep = Annotated[str, Depends(reusable_oauth2)]  # 令牌依赖
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+async def get_current_principal(session: AsyncSessionDep, token: TokenDep) -> Principal:
     """
-    获取当前用户
-    验证JWT令牌并返回当前用户对象
-    
+    获取当前认证主体
+    验证JWT令牌，并优先从进程内缓存读取用户的授权字段
+
     Args:
-        session: 数据库会话
+        session: 异步数据库会话
         token: JWT访问令牌
-        
+
     Returns:
-        当前用户对象
-        
+        当前认证主体
+
     Raises:
         HTTPException: 当令牌无效、用户不存在或用户未激活时
     """
     try:
         # 解码JWT令牌
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        with span("jwt.decode", "access_token"):
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
         token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+        user_id = uuid.UUID(token_data.sub)
+    except (InvalidTokenError, ValidationError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",  # 无法验证凭据
         )
-    
-    # 根据令牌中的用户ID获取用户
-    user = session.get(User, token_data.sub)
+
+    # 缓存未命中时才查询用户表
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")  # 用户未找到
+        principal = Principal(
+            id=user.id, is_active=user.is_active, is_superuser=user.is_superuser
+        )
+        principal_cache.set(user_id, principal)
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")  # 用户未激活
+    return principal
+
+
+# 当前认证主体依赖，仅需授权判断的路由应优先使用
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+
+async def get_current_user(
+    session: AsyncSessionDep, principal: CurrentPrincipal
+) -> User:
+    """
+    获取当前用户
+    在认证主体的基础上加载完整的用户对象
+
+    Args:
+        session: 异步数据库会话
+        principal: 当前认证主体
+
+    Returns:
+        当前用户对象
+
+    Raises:
+        HTTPException: 当用户不存在时
+    """
+    # 缓存未命中时用户已在会话的标识映射中，不会再次查询
+    user = await session.get(User, principal.id)
     if not user:
+        principal_cache.invalidate(principal.id)
         raise HTTPException(status_code=404, detail="User not found")  # 用户未找到
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")  # 用户未激活
     return user
 
 
@@ -76,16 +135,16 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
+def get_current_active_superuser(current_user: CurrentPrincipal) -> Principal:
     """
     获取当前活跃的超级用户
-    检查当前用户是否为超级用户
+    检查当前认证主体是否为超级用户
     
     Args:
-        current_user: 当前用户对象
+        current_user: 当前认证主体
         
     Returns:
-        超级用户对象
+        超级用户的认证主体
         
     Raises:
         HTTPException: 当用户不是超级用户时
@@ -95,3 +154,28 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"  # 用户权限不足
         )
     return current_user
+
+
+async def is_superuser_request(scope: Scope) -> bool:
+    """
+    检查原始ASGI请求是否由活跃的超级用户发起
+    供无法使用依赖注入的中间件调用，校验规则与get_current_active_superuser相同
+
+    Args:
+        scope: ASGI请求scope
+
+    Returns:
+        请求携带有效的超级用户访问令牌时为True
+    """
+    scheme, token = get_authorization_scheme_param(
+        Headers(scope=scope).get("authorization")
+    )
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            principal = await get_current_principal(session, token)
+        get_current_active_superuser(principal)
+    except HTTPException:
+        return False
+    return True
@@ -0,0 +1,71 @@
+from typing import Annotated, Any
+
+import pydantic_core
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import Select, select
+from sqlmodel import SQLModel
+
+# 稀疏字段参数，逗号分隔，只返回并查询指定的字段
+FieldsParam = Annotated[
+    str | None,
+    Query(description="Comma-separated list of fields to return, e.g. id,title"),
+]
+
+
+def parse_fields(fields: str | None, public_model: type[SQLModel]) -> list[str] | None:
+    """
+    解析并校验稀疏字段参数
+
+    Args:
+        fields: 逗号分隔的字段列表
+        public_model: 公开模型，只允许选择其中的字段
+
+    Returns:
+        去重后的字段列表，未指定时返回None
+
+    Raises:
+        HTTPException: 当字段为空或不属于公开模型时
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    invalid = [name for name in names if name not in public_model.model_fields]
+    if not names or invalid:
+        allowed = ", ".join(public_model.model_fields)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(invalid)}. Allowed fields: {allowed}",
+        )
+    return names
+
+
+def select_fields(table_model: type[SQLModel], fields: list[str]) -> Select[Any]:
+    """
+    构建只查询指定列的SELECT语句，始终包含id以便分页
+
+    Args:
+        table_model: 数据库模型类
+        fields: 字段列表
+
+    Returns:
+        SELECT语句
+    """
+    names = dict.fromkeys(["id", *fields])
+    return select(*(getattr(table_model, name) for name in names))
+
+
+def pick_fields(row: Any, fields: list[str]) -> dict[str, Any]:
+    """
+    从查询结果行中取出指定字段
+    """
+    return {name: getattr(row, name) for name in fields}
+
+
+def fields_response(content: Any) -> Response:
+    """
+    输出稀疏字段响应
+    部分字段无法通过完整的response_model校验，直接编码为JSON
+    """
+    return Response(
+        content=pydantic_core.to_json(content), media_type="application/json"
+    )
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils
+from app.api.routes import items, login, private, profiling, users, utils
 from app.core.config import settings
 
 # 创建主API路由器
@@ -12,6 +12,10 @@ api_router.include_router(users.router)  # 用户管理路由
 api_router.include_router(utils.router)  # 工具功能路由
 api_router.include_router(items.router)  # 项目管理路由
 
+# 按需剖析的管理接口，仅超级用户可用
+if settings.PROFILING_ENABLED:
+    api_router.include_router(profiling.router)
+
 # 仅在本地开发环境包含私有路由（用于测试和调试）
 if settings.ENVIRONMENT == "local":
     api_router.include_router(private.router)
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import Annotated
+
+from fastapi import HTTPException, Query
+
+from app.core.config import settings
+
+# 分页查询参数，limit有硬性上限，避免一次拉取过多数据
+SkipParam = Annotated[int, Query(ge=0)]
+LimitParam = Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)]
+CursorParam = Annotated[
+    str | None,
+    Query(description="Opaque cursor returned as next_cursor by the previous page"),
+]
+IncludeCountParam = Annotated[
+    bool, Query(description="Set to false to skip computing the total count")
+]
+
+
+def encode_cursor(last_id: uuid.UUID) -> str:
+    """
+    编码游标
+    游标对客户端是不透明的，内部记录上一页最后一行的排序键
+
+    Args:
+        last_id: 上一页最后一行的ID
+
+    Returns:
+        URL安全的游标字符串
+    """
+    payload = json.dumps({"id": str(last_id)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    """
+    解码游标
+
+    Args:
+        cursor: 游标字符串
+
+    Returns:
+        上一页最后一行的ID
+
+    Raises:
+        HTTPException: 当游标格式无效时
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return uuid.UUID(payload["id"])
+    except (binascii.Error, AttributeError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def check_pagination(skip: int, cursor: str | None) -> uuid.UUID | None:
+    """
+    校验分页参数
+
+    Args:
+        skip: 偏移量
+        cursor: 游标
+
+    Returns:
+        游标对应的ID，未使用游标时返回None
+
+    Raises:
+        HTTPException: 当同时使用偏移量和游标时
+    """
+    if cursor is None:
+        return None
+    if skip:
+        raise HTTPException(
+            status_code=400, detail="skip cannot be combined with cursor"
+        )
+    return decode_cursor(cursor)
+
+
+def next_cursor(rows: list[uuid.UUID], limit: int) -> str | None:
+    """
+    计算下一页游标，当前页未满时说明已经没有更多数据
+
+    Args:
+        rows: 当前页各行的ID（按排序顺序）
+        limit: 每页条数
+
+    Returns:
+        下一页游标，没有下一页时返回None
+    """
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1])
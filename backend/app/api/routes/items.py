@@ -1,109 +1,477 @@
+import csv
+import io
+import json
 import uuid
-from typing import Any
+from collections.abc import AsyncIterator, Sequence
+from typing import Annotated, Any, Literal, NoReturn, TypeVar
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlmodel import col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api import caching
+from app.api.caching import cached_response
+from app.api.deps import AsyncSessionDep, CurrentPrincipal
+from app.api.fields import (
+    FieldsParam,
+    parse_fields,
+    pick_fields,
+    select_fields,
+)
+from app.api.pagination import (
+    CursorParam,
+    IncludeCountParam,
+    LimitParam,
+    SkipParam,
+    check_pagination,
+    next_cursor,
+)
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.security import Principal
+from app.models import (
+    Item,
+    ItemBulkResult,
+    ItemBulkResults,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+S = TypeVar("S", bound=Select[Any])
+
+
+def _cache_scope(current_user: Principal) -> str:
+    """
+    缓存范围：超级用户看到的结果相同，可以共享缓存；普通用户只能看到自己的项目
+    """
+    return "superuser" if current_user.is_superuser else str(current_user.id)
+
+
+def visible_items(
+    statement: S, current_user: Principal, after_id: uuid.UUID | None = None
+) -> S:
+    """
+    限定为当前用户可见的项目，按ID排序
+    普通用户按owner_id过滤，过滤和排序都可以使用(owner_id, id)索引
+
+    Args:
+        statement: 查询项目的SELECT语句
+        current_user: 当前用户
+        after_id: 游标分页时上一页最后一个项目的ID
+
+    Returns:
+        SELECT语句
+    """
+    if not current_user.is_superuser:
+        statement = statement.where(col(Item.owner_id) == current_user.id)
+    if after_id is not None:
+        statement = statement.where(col(Item.id) > after_id)
+    return statement.order_by(col(Item.id))
+
 
 @router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def read_items(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    skip: SkipParam = 0,
+    limit: LimitParam = 100,
+    cursor: CursorParam = None,
+    include_count: IncludeCountParam = True,
+    fields: FieldsParam = None,
 ) -> Any:
     """
     Retrieve items.
+
+    Pass the returned `next_cursor` as `cursor` to fetch the next page with
+    keyset pagination, which stays fast at any depth. For superusers on a
+    large table `count` is estimated from planner statistics and
+    `count_estimated` is true. Pass `fields` to load and return only some
+    columns.
     """
+    after_id = check_pagination(skip, cursor)
+    field_names = parse_fields(fields, ItemPublic)
+
+    async def load(session: AsyncSession) -> Any:
+        count: int | None = None
+        count_estimated = False
+        if include_count:
+            if current_user.is_superuser:
+                count, count_estimated = await crud.count_rows_async(
+                    session=session, model=Item
+                )
+            else:
+                count = await crud.get_item_count_async(
+                    session=session, owner_id=current_user.id
+                )
+
+        if field_names is not None:
+            statement = visible_items(
+                select_fields(Item, field_names), current_user, after_id
+            )
+            rows = (await session.execute(statement.offset(skip).limit(limit))).all()
+            return {
+                "data": [pick_fields(row, field_names) for row in rows],
+                "count": count,
+                "count_estimated": count_estimated,
+                "next_cursor": next_cursor([row.id for row in rows], limit),
+            }
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
+        items_statement = visible_items(select(Item), current_user, after_id)
+        items = (await session.exec(items_statement.offset(skip).limit(limit))).all()
+        return ItemsPublic(
+            data=items,
+            count=count,
+            count_estimated=count_estimated,
+            next_cursor=next_cursor([item.id for item in items], limit),
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+
+    return await cached_response(
+        request,
+        session=session,
+        scope=_cache_scope(current_user),
+        namespaces=(
+            [caching.ITEMS]
+            if current_user.is_superuser
+            else [caching.items_of(current_user.id)]
+        ),
+        load=load,
+        response_type=ItemsPublic,
+    )
+
+
+@router.post("/bulk", response_model=ItemBulkResults)
+async def create_items_bulk(
+    *,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    items_in: Annotated[
+        list[ItemCreate], Body(min_length=1, max_length=settings.MAX_BULK_SIZE)
+    ],
+) -> Any:
+    """
+    Create many items in one transaction.
+    """
+    items = await crud.create_items_async(
+        session=session, items_in=items_in, owner_id=current_user.id
+    )
+    await caching.invalidate(
+        caching.item_namespaces(current_user.id, *(item.id for item in items))
+    )
+    return ItemBulkResults(
+        data=[
+            ItemBulkResult(id=item.id, status=200, item=ItemPublic.model_validate(item))
+            for item in items
+        ]
+    )
+
+
+@router.put("/bulk", response_model=ItemBulkResults)
+async def update_items_bulk(
+    *,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    items_in: Annotated[
+        list[ItemBulkUpdate], Body(min_length=1, max_length=settings.MAX_BULK_SIZE)
+    ],
+) -> Any:
+    """
+    Update many items in one transaction.
+
+    Rows that fail are reported in the result and do not affect the others.
+    """
+    statement = select(Item).where(col(Item.id).in_([row.id for row in items_in]))
+    items = {item.id: item for item in (await session.exec(statement)).all()}
+
+    results: list[tuple[uuid.UUID, int, str | None, Item | None]] = []
+    seen: set[uuid.UUID] = set()
+    for row in items_in:
+        item = items.get(row.id)
+        if row.id in seen:
+            results.append((row.id, 400, "Duplicate item id", None))
+        elif item is None:
+            results.append((row.id, 404, "Item not found", None))
+        elif not current_user.is_superuser and item.owner_id != current_user.id:
+            results.append((row.id, 400, "Not enough permissions", None))
+        else:
+            item.sqlmodel_update(row.model_dump(exclude_unset=True, exclude={"id"}))
+            session.add(item)
+            results.append((row.id, 200, None, item))
+        seen.add(row.id)
+    await session.commit()
+    namespaces = [caching.ITEMS]
+    for *_, item in results:
+        if item is not None:
+            namespaces += [caching.items_of(item.owner_id), caching.item(item.id)]
+    await caching.invalidate(list(dict.fromkeys(namespaces)))
+
+    return ItemBulkResults(
+        data=[
+            ItemBulkResult(
+                id=id,
+                status=status,
+                detail=detail,
+                item=ItemPublic.model_validate(item) if item else None,
+            )
+            for id, status, detail, item in results
+        ]
+    )
+
+
+@router.delete("/bulk", response_model=ItemBulkResults)
+async def delete_items_bulk(
+    *,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    ids: Annotated[
+        list[uuid.UUID], Body(min_length=1, max_length=settings.MAX_BULK_SIZE)
+    ],
+) -> Any:
+    """
+    Delete many items in one transaction.
+
+    Rows that fail are reported in the result and do not affect the others.
+    """
+    statement = delete(Item).where(col(Item.id).in_(ids))
+    if not current_user.is_superuser:
+        statement = statement.where(col(Item.owner_id) == current_user.id)
+    result = await session.execute(
+        statement.returning(col(Item.id), col(Item.owner_id))
+    )
+    deleted_rows = result.all()
+    deleted = {row.id for row in deleted_rows}
+
+    # 只有存在未删除的行时才需要再查一次，用于区分不存在和无权限
+    forbidden: set[uuid.UUID] = set()
+    missing = set(ids) - deleted
+    if missing:
+        result = await session.execute(select(Item.id).where(col(Item.id).in_(missing)))
+        forbidden = set(result.scalars().all())
+    await session.commit()
+    namespaces = [caching.ITEMS]
+    for row in deleted_rows:
+        namespaces += [caching.items_of(row.owner_id), caching.item(row.id)]
+    await caching.invalidate(list(dict.fromkeys(namespaces)))
+
+    data: list[ItemBulkResult] = []
+    seen: set[uuid.UUID] = set()
+    for id in ids:
+        if id in seen:
+            data.append(ItemBulkResult(id=id, status=400, detail="Duplicate item id"))
+        elif id in deleted:
+            data.append(ItemBulkResult(id=id, status=200))
+        elif id in forbidden:
+            data.append(
+                ItemBulkResult(id=id, status=400, detail="Not enough permissions")
+            )
+        else:
+            data.append(ItemBulkResult(id=id, status=404, detail="Item not found"))
+        seen.add(id)
+    return ItemBulkResults(data=data)
+
+
+EXPORT_COLUMNS = ("title", "description", "id", "owner_id")
+
+
+def _format_ndjson(rows: Sequence[Any]) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "title": row.title,
+                "description": row.description,
+                "id": str(row.id),
+                "owner_id": str(row.owner_id),
+            }
         )
-        items = session.exec(statement).all()
+        + "\n"
+        for row in rows
+    )
 
-    return ItemsPublic(data=items, count=count)
+
+def _format_csv(rows: Sequence[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (row.title, row.description, row.id, row.owner_id) for row in rows
+    )
+    return buffer.getvalue()
+
+
+def export_statement(current_user: Principal) -> Select[Any]:
+    """
+    导出查询，按ID顺序读取当前用户可见的项目
+    """
+    return visible_items(select_fields(Item, list(EXPORT_COLUMNS)), current_user)
+
+
+async def _export_items(
+    current_user: Principal, format: Literal["ndjson", "csv"]
+) -> AsyncIterator[str]:
+    """
+    逐批读取并输出项目，内存占用与总行数无关
+    """
+    statement = export_statement(current_user)
+    formatter = _format_csv if format == "csv" else _format_ndjson
+    if format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+    # 依赖注入的会话在响应开始发送前就会关闭，流式响应需要自己持有会话
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield formatter(rows)
+
+
+@router.get("/export")
+async def export_items(
+    current_user: CurrentPrincipal, format: Literal["ndjson", "csv"] = "ndjson"
+) -> StreamingResponse:
+    """
+    Export all items visible to the current user as NDJSON or CSV.
+
+    Rows are streamed from a server-side cursor, so the response can be
+    arbitrarily large.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_items(current_user, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+
+def _item_filter(current_user: Principal, id: uuid.UUID) -> list[Any]:
+    """
+    按ID定位项目，非超级用户只能命中自己的项目
+    """
+    clauses = [col(Item.id) == id]
+    if not current_user.is_superuser:
+        clauses.append(col(Item.owner_id) == current_user.id)
+    return clauses
+
+
+async def _raise_item_not_accessible(session: AsyncSession, id: uuid.UUID) -> NoReturn:
+    """
+    按所有者过滤后没有命中任何行时再查一次，区分项目不存在和无权限
+    """
+    exists = (await session.exec(select(Item.id).where(Item.id == id))).first()
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    raise HTTPException(status_code=400, detail="Not enough permissions")
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+async def read_item(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    id: uuid.UUID,
+    fields: FieldsParam = None,
+) -> Any:
     """
     Get item by ID.
     """
-    item = session.get(Item, id)
+    field_names = parse_fields(fields, ItemPublic)
+
+    async def load(session: AsyncSession) -> Any:
+        return await _load_item(session, current_user, id, field_names)
+
+    return await cached_response(
+        request,
+        session=session,
+        scope=_cache_scope(current_user),
+        namespaces=[caching.item(id), caching.ITEM_OWNERS],
+        load=load,
+        response_type=ItemPublic,
+    )
+
+
+async def _load_item(
+    session: AsyncSession,
+    current_user: Principal,
+    id: uuid.UUID,
+    field_names: list[str] | None = None,
+) -> Any:
+    """
+    读取单个项目，不存在或无权限时抛出异常
+    """
+    filters = _item_filter(current_user, id)
+    if field_names is not None:
+        statement = select_fields(Item, field_names).where(*filters)
+        row = (await session.execute(statement)).first()
+        if not row:
+            await _raise_item_not_accessible(session, id)
+        return pick_fields(row, field_names)
+
+    item = (await session.exec(select(Item).where(*filters))).first()
     if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    return item
+        await _raise_item_not_accessible(session, id)
+    return ItemPublic.model_validate(item)
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+async def create_item(
+    *, session: AsyncSessionDep, current_user: CurrentPrincipal, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+    item = await crud.create_item_async(
+        session=session, item_in=item_in, owner_id=current_user.id
+    )
+    await caching.invalidate(caching.item_namespaces(item.owner_id, item.id))
     return item
 
 
 @router.put("/{id}", response_model=ItemPublic)
-def update_item(
+async def update_item(
     *,
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
     id: uuid.UUID,
     item_in: ItemUpdate,
 ) -> Any:
     """
     Update an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
     update_dict = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_dict)
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+    if not update_dict:
+        return await _load_item(session, current_user, id)
+    statement = (
+        update(Item)
+        .where(*_item_filter(current_user, id))
+        .values(**update_dict)
+        .returning(Item)
+    )
+    item = (await session.execute(statement)).scalar_one_or_none()
+    if not item:
+        await _raise_item_not_accessible(session, id)
+    await session.commit()
+    await caching.invalidate(caching.item_namespaces(item.owner_id, item.id))
     return item
 
 
 @router.delete("/{id}")
-def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+async def delete_item(
+    session: AsyncSessionDep, current_user: CurrentPrincipal, id: uuid.UUID
 ) -> Message:
     """
     Delete an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    statement = delete(Item).where(*_item_filter(current_user, id))
+    result = await session.execute(statement.returning(col(Item.owner_id)))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        await _raise_item_not_accessible(session, id)
+    await session.commit()
+    await caching.invalidate(caching.item_namespaces(owner_id, id))
     return Message(message="Item deleted successfully")
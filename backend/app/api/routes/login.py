@@ -6,15 +6,19 @@ from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+)
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, principal_cache
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
-    send_email,
     verify_password_reset_token,
 )
 
@@ -23,15 +27,17 @@ router = APIRouter(tags=["login"])
 
 
 @router.post("/login/access-token")
-def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+async def login_access_token(
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2兼容的令牌登录
     获取访问令牌用于后续请求
-    
+    异步路由在等待bcrypt进程池期间不占用线程池，登录高峰时不会耗尽线程池
+
     Args:
-        session: 数据库会话
+        session: 异步数据库会话
         form_data: OAuth2密码请求表单
         
     Returns:
@@ -41,7 +47,7 @@ def login_access_token(
         HTTPException: 当邮箱或密码错误，或用户未激活时
     """
     # 验证用户凭据
-    user = crud.authenticate(
+    user = await crud.authenticate_async(
         session=session, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -102,11 +108,14 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    # 写入发件箱后立即返回，由后台worker发送
+    crud.enqueue_email(
+        session=session,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
+    session.commit()
     return Message(message="Password recovery email sent")  # 密码恢复邮件已发送
 
 
@@ -146,6 +155,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     user.hashed_password = hashed_password
     session.add(user)
     session.commit()
+    principal_cache.invalidate(user.id)
     return Message(message="Password updated successfully")  # 密码更新成功
 
 
@@ -0,0 +1,24 @@
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.prometheus import CONTENT_TYPE, generate_latest
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: Annotated[str | None, Header()] = None) -> Response:
+    """
+    Request metrics in the Prometheus text format.
+    """
+    token = settings.METRICS_BEARER_TOKEN
+    # 非本地环境必须配置令牌，未配置时不开放，避免公开路由和流量信息
+    if not token and settings.ENVIRONMENT != "local":
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token and not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(generate_latest(), media_type=CONTENT_TYPE)
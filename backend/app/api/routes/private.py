@@ -3,6 +3,7 @@ from typing import Any
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from app.api import caching
 from app.api.deps import SessionDep
 from app.core.security import get_password_hash
 from app.models import (
@@ -34,5 +35,6 @@ def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
 
     session.add(user)
     session.commit()
+    caching.invalidate_sync(caching.user_namespaces(user.id))
 
     return user
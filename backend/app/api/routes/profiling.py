@@ -0,0 +1,60 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.api.deps import get_current_active_superuser
+from app.core.profiling import profile_store
+from app.models import Message, ProfileInfo, ProfilingTarget, ProfilingTargetCreate
+
+router = APIRouter(
+    prefix="/profiling",
+    tags=["profiling"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get("/target", response_model=ProfilingTarget | None)
+def read_profiling_target() -> Any:
+    """
+    Get the active profiling target.
+    """
+    return profile_store.get_target()
+
+
+@router.put("/target", response_model=ProfilingTarget)
+def set_profiling_target(target_in: ProfilingTargetCreate) -> Any:
+    """
+    Profile every request whose path starts with the prefix until it expires.
+    """
+    return profile_store.set_target(target_in.path_prefix, target_in.expires_in_seconds)
+
+
+@router.delete("/target")
+def clear_profiling_target() -> Message:
+    """
+    Stop profiling requests by path.
+    """
+    profile_store.clear_target()
+    return Message(message="Profiling target cleared")
+
+
+@router.get("/profiles/", response_model=list[ProfileInfo])
+def read_profiles() -> Any:
+    """
+    List stored profiles, newest first.
+    """
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}")
+def read_profile(profile_id: str) -> FileResponse:
+    """
+    Download a profile in the speedscope format.
+    """
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path, media_type="application/json", filename=f"{profile_id}.speedscope.json"
+    )
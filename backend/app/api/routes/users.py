@@ -1,19 +1,40 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel import col, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app import crud
+from app import crud, jobs
+from app.api import caching
+from app.api.caching import cached_response
 from app.api.deps import (
+    AsyncSessionDep,
+    CurrentPrincipal,
     CurrentUser,
-    SessionDep,
     get_current_active_superuser,
 )
+from app.api.fields import (
+    FieldsParam,
+    parse_fields,
+    pick_fields,
+    select_fields,
+)
+from app.api.pagination import (
+    CursorParam,
+    IncludeCountParam,
+    LimitParam,
+    SkipParam,
+    check_pagination,
+    next_cursor,
+)
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import (
+    get_password_hash_async,
+    principal_cache,
+    verify_password_async,
+)
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
@@ -24,101 +45,198 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+async def _delete_user(
+    session: AsyncSession, user: User, response: Response
+) -> Message:
+    """
+    删除用户，项目由数据库外键级联删除
+    项目数超过阈值时先停用用户，再由后台任务分批删除，返回202表示删除尚未完成；
+    停用和任务在同一事务中提交，进程退出也不会丢失删除
+    """
+    user_id = user.id
+    threshold = settings.USER_BACKGROUND_PURGE_THRESHOLD
+    if threshold and user.item_count > threshold:
+        user.is_active = False
+        session.add(user)
+        crud.enqueue_job(
+            session=session,
+            name=jobs.PURGE_USER,
+            payload={"user_id": str(user_id)},
+            priority=-10,
+        )
+        await session.commit()
+        principal_cache.invalidate(user_id)
+        await caching.invalidate(caching.user_namespaces(user_id))
+        response.status_code = 202
+        return Message(message="User deactivated, deletion pending")
+    await session.delete(user)
+    await session.commit()
+    principal_cache.invalidate(user_id)
+    await caching.invalidate(caching.user_namespaces(user_id, deleted=True))
+    return Message(message="User deleted successfully")
+
+
 @router.get(
     "/",
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+    request: Request,
+    session: AsyncSessionDep,
+    skip: SkipParam = 0,
+    limit: LimitParam = 100,
+    cursor: CursorParam = None,
+    include_count: IncludeCountParam = True,
+    fields: FieldsParam = None,
+) -> Any:
     """
     Retrieve users.
+
+    Pass the returned `next_cursor` as `cursor` to fetch the next page with
+    keyset pagination, which stays fast at any depth. On a large table
+    `count` is estimated from planner statistics and `count_estimated` is
+    true. Pass `fields` to load and return only some columns.
     """
+    after_id = check_pagination(skip, cursor)
+    field_names = parse_fields(fields, UserPublic)
+    filters = [] if after_id is None else [col(User.id) > after_id]
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    async def load(session: AsyncSession) -> Any:
+        count: int | None = None
+        count_estimated = False
+        if include_count:
+            count, count_estimated = await crud.count_rows_async(
+                session=session, model=User
+            )
+
+        if field_names is not None:
+            statement = select_fields(User, field_names)
+            statement = statement.where(*filters).order_by(col(User.id))
+            rows = (await session.execute(statement.offset(skip).limit(limit))).all()
+            return {
+                "data": [pick_fields(row, field_names) for row in rows],
+                "count": count,
+                "count_estimated": count_estimated,
+                "next_cursor": next_cursor([row.id for row in rows], limit),
+            }
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+        users_statement = select(User).where(*filters).order_by(col(User.id))
+        users = (await session.exec(users_statement.offset(skip).limit(limit))).all()
+        return UsersPublic(
+            data=users,
+            count=count,
+            count_estimated=count_estimated,
+            next_cursor=next_cursor([user.id for user in users], limit),
+        )
 
-    return UsersPublic(data=users, count=count)
+    # 只有超级用户能访问，结果与具体用户无关
+    return await cached_response(
+        request,
+        session=session,
+        scope="superuser",
+        namespaces=[caching.USERS],
+        load=load,
+        response_type=UsersPublic,
+    )
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, session: AsyncSessionDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await crud.get_user_by_email_async(session=session, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        # 邮件写入发件箱，与用户在同一个事务中提交，由后台worker发送
+        crud.enqueue_email(
+            session=session,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
         )
+    user = await crud.create_user_async(session=session, user_create=user_in)
+    await caching.invalidate(caching.user_namespaces(user.id))
     return user
 
 
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
-    *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
+async def update_user_me(
+    *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: CurrentPrincipal
 ) -> Any:
     """
     Update own user.
     """
 
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.get_user_by_email_async(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
     user_data = user_in.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(user_data)
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
-    return current_user
+    if not user_data:
+        user = await session.get(User, current_user.id)
+    else:
+        # 直接UPDATE ... RETURNING，不需要先加载用户
+        statement = (
+            update(User)
+            .where(col(User.id) == current_user.id)
+            .values(**user_data)
+            .returning(User)
+        )
+        user = (await session.execute(statement)).scalar_one_or_none()
+        await session.commit()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.invalidate(current_user.id)
+    await caching.invalidate(caching.user_namespaces(current_user.id))
+    return user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
-    *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
+async def update_password_me(
+    *, session: AsyncSessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await session.commit()
+    principal_cache.invalidate(current_user.id)
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
@@ -126,7 +244,11 @@ def read_user_me(current_user: CurrentUser) -> Any:
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    response: Response,
+) -> Any:
     """
     Delete own user.
     """
@@ -134,43 +256,65 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    return await _delete_user(session, current_user, response)
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await crud.get_user_by_email_async(session=session, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    user = await crud.create_user_async(session=session, user_create=user_create)
+    await caching.invalidate(caching.user_namespaces(user.id))
     return user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+async def read_user_by_id(
+    request: Request,
+    user_id: uuid.UUID,
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    fields: FieldsParam = None,
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
-    if not current_user.is_superuser:
+    field_names = parse_fields(fields, UserPublic)
+    if user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
-    return user
+
+    async def load(session: AsyncSession) -> Any:
+        if field_names is not None:
+            statement = select_fields(User, field_names).where(col(User.id) == user_id)
+            row = (await session.execute(statement)).first()
+            if not row:
+                raise HTTPException(status_code=404, detail="User not found")
+            return pick_fields(row, field_names)
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserPublic.model_validate(user)
+
+    # 权限已在读取缓存前检查，结果与具体用户无关
+    return await cached_response(
+        request,
+        session=session,
+        scope="any",
+        namespaces=[caching.user(user_id)],
+        load=load,
+        response_type=UserPublic,
+    )
 
 
 @router.patch(
@@ -178,9 +322,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: uuid.UUID,
     user_in: UserUpdate,
 ) -> Any:
@@ -188,39 +332,46 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.get_user_by_email_async(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    db_user = await crud.update_user_async(
+        session=session, db_user=db_user, user_in=user_in
+    )
+    await caching.invalidate(caching.user_namespaces(user_id))
     return db_user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
-def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+async def delete_user(
+    session: AsyncSessionDep,
+    current_user: CurrentPrincipal,
+    user_id: uuid.UUID,
+    response: Response,
 ) -> Message:
     """
     Delete a user.
+
+    Users owning more than `USER_BACKGROUND_PURGE_THRESHOLD` items are
+    deactivated and deleted by the job worker; the response is then 202.
     """
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if user == current_user:
+    if user.id == current_user.id:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    return await _delete_user(session, user, response)
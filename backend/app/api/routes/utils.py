@@ -1,8 +1,21 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app import crud
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.db import get_pool_stats
+from app.core.response_cache import response_cache
+from app.core.security import password_hasher, principal_cache
+from app.models import (
+    CacheStats,
+    DBPoolStats,
+    JobQueueStats,
+    Message,
+    PasswordHashingStats,
+    ResponseCacheStats,
+)
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -26,6 +39,68 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/password-hashing-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=PasswordHashingStats,
+)
+def password_hashing_stats() -> Any:
+    """
+    Password hashing executor queue and timing stats.
+    """
+    return password_hasher.stats()
+
+
+@router.get(
+    "/principal-cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=CacheStats,
+)
+def principal_cache_stats() -> Any:
+    """
+    Principal cache hit/miss counters.
+    """
+    return principal_cache.stats()
+
+
+@router.get(
+    "/response-cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=ResponseCacheStats,
+)
+def response_cache_stats() -> Any:
+    """
+    Response cache hit ratio and backend error counters.
+    """
+    if response_cache is None:
+        return ResponseCacheStats(backend="disabled")
+    return response_cache.stats()
+
+
+@router.get(
+    "/db-pool-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=list[DBPoolStats],
+)
+def db_pool_stats() -> Any:
+    """
+    Database connection pool usage and checkout wait times.
+    """
+    return get_pool_stats()
+
+
+@router.get(
+    "/job-queue-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=JobQueueStats,
+)
+def job_queue_stats(session: SessionDep) -> Any:
+    """
+    Background job counts by status and the age of the oldest due job.
+    """
+    return crud.get_job_queue_stats(session=session)
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
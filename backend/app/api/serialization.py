@@ -0,0 +1,43 @@
+import functools
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+
+
+@functools.cache
+def get_type_adapter(tp: Any) -> TypeAdapter[Any]:
+    """
+    获取类型适配器，每种响应类型只构建一次序列化器
+
+    Args:
+        tp: 响应类型，例如ItemsPublic或list[DBPoolStats]
+
+    Returns:
+        该类型的TypeAdapter
+    """
+    return TypeAdapter(tp)
+
+
+def fast_response(tp: Any, content: Any) -> Any:
+    """
+    快速序列化响应
+    启用FAST_JSON_RESPONSES时直接用pydantic-core把已校验的对象编码为JSON字节，
+    跳过FastAPI对返回值的二次校验、jsonable_encoder和标准库json；
+    未启用时原样返回，由路由的response_model处理
+
+    Args:
+        tp: 响应类型，应与路由的response_model一致
+        content: 已经是该类型的返回值
+
+    Returns:
+        JSON响应或原始返回值
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return content
+    return Response(
+        content=get_type_adapter(tp).dump_json(content),
+        media_type="application/json",
+    )
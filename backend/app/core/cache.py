@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    进程内的TTL/LRU缓存
+    条目在写入ttl秒后过期，超过maxsize时淘汰最久未使用的条目
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用（ttl或maxsize为0时关闭）"""
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: K) -> V | None:
+        """
+        读取缓存条目
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的值，不存在或已过期时返回None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """
+        写入缓存条目
+
+        Args:
+            key: 缓存键
+            value: 缓存的值
+        """
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """
+        使缓存条目失效
+
+        Args:
+            key: 缓存键
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含命中、未命中、淘汰次数和当前大小的字典
+        """
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,281 @@
+import importlib
+import zlib
+from collections.abc import Callable, Iterable
+from typing import Any, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _optional_import(name: str) -> Any:
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+# brotli和zstandard是可选依赖，安装后自动启用对应的编码
+brotli = _optional_import("brotli")
+zstandard = _optional_import("zstandard")
+
+# 值得压缩的内容类型，图片、压缩包等已经压缩过的内容不再压缩
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class Compressor(Protocol):
+    """流式压缩器"""
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩一段数据并刷新，使已压缩的数据可以立即发送"""
+        ...
+
+    def finish(self) -> bytes:
+        """结束压缩流"""
+        ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._obj.process(data) + self._obj.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._obj.finish())
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(
+            self._obj.compress(data)
+            + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        )
+
+    def finish(self) -> bytes:
+        return bytes(self._obj.flush())
+
+
+# 编码名称 -> (压缩器类, 最高压缩级别)，按服务端偏好排序
+ENCODINGS: dict[str, tuple[Callable[[int], Compressor], int]] = {}
+if zstandard is not None:
+    ENCODINGS["zstd"] = (ZstdCompressor, 19)
+if brotli is not None:
+    ENCODINGS["br"] = (BrotliCompressor, 11)
+ENCODINGS["gzip"] = (GzipCompressor, 9)
+
+
+def compress(encoding: str, level: int, data: bytes) -> bytes:
+    """
+    一次性压缩完整的数据
+
+    Args:
+        encoding: 编码名称
+        level: 压缩级别
+        data: 原始数据
+
+    Returns:
+        压缩后的数据
+    """
+    compressor = ENCODINGS[encoding][0](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def select_encoding(accept_encoding: str, available: Iterable[str]) -> str | None:
+    """
+    根据Accept-Encoding选择编码
+    优先选择客户端权重最高的编码，权重相同时按服务端偏好
+
+    Args:
+        accept_encoding: 请求头Accept-Encoding的值
+        available: 服务端支持的编码，按偏好排序
+
+    Returns:
+        选中的编码，没有可用编码时返回None
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best: str | None = None
+    best_q = 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件
+    根据Accept-Encoding协商gzip/br/zstd编码；小于阈值的响应不压缩；
+    流式响应逐块压缩并立即刷新；static_paths中的响应（如OpenAPI文档）
+    内容不变，第一次以最高级别压缩后缓存响应体，之后只替换响应体，
+    响应头（如CORS）仍按每个请求生成
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        levels: dict[str, int] | None = None,
+        static_paths: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": 6, "br": 4, "zstd": 3, **(levels or {})}
+        self.static_paths = set(static_paths)
+        # (路径, 编码) -> 压缩后的响应体，响应头每次由内层应用生成
+        self._static_cache: dict[tuple[str, str], bytes] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), ENCODINGS
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] in self.static_paths and scope["method"] == "GET":
+            await self._send_static(scope, receive, send, encoding)
+            return
+        responder = _CompressionResponder(
+            send, encoding, self.levels[encoding], self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+    async def _send_static(
+        self, scope: Scope, receive: Receive, send: Send, encoding: str
+    ) -> None:
+        # 每次都调用内层应用，CORS等按请求生成的响应头保持正确，只复用压缩结果
+        start: Message = {}
+        body = bytearray()
+
+        async def capture(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            else:
+                body.extend(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": bytes(body)})
+            return
+        key = (scope["path"], encoding)
+        compressed = self._static_cache.get(key)
+        if compressed is None:
+            compressed = compress(encoding, ENCODINGS[encoding][1], bytes(body))
+            self._static_cache[key] = compressed
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": compressed})
+
+
+class _CompressionResponder:
+    """
+    单个请求的压缩状态
+    """
+
+    def __init__(
+        self, send: Send, encoding: str, level: int, minimum_size: int
+    ) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self._start: Message | None = None
+        self._compressor: Compressor | None = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self._passthrough = (
+                "content-encoding" in headers
+                or message["status"] < 200
+                or message["status"] in (204, 206, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self._passthrough:
+                await self._send(message)
+            else:
+                # 等到第一段响应体才能判断是否达到压缩阈值
+                self._start = message
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self._start is not None:
+            start, self._start = self._start, None
+            if not more_body and len(body) < self.minimum_size:
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                self._compressor = ENCODINGS[self.encoding][0](self.level)
+                chunk = self._compressor.compress(body)
+            else:
+                chunk = compress(self.encoding, self.level, body)
+                headers["Content-Length"] = str(len(chunk))
+            await self._send({**start, "headers": headers.raw})
+            await self._send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+            return
+
+        assert self._compressor is not None
+        chunk = self._compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self._compressor.finish()
+        await self._send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
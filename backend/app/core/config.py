@@ -47,6 +47,11 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 访问令牌过期时间
     FRONTEND_HOST: str = "http://localhost:5173"  # 前端主机地址
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"  # 运行环境
+    MAX_PAGE_SIZE: int = 1000  # 列表接口单页最大条数
+    FAST_JSON_RESPONSES: bool = False  # 列表接口直接输出JSON字节，跳过返回值的二次校验
+    MAX_BULK_SIZE: int = 1000  # 批量接口单次请求最多处理的行数
+    EXPORT_BATCH_SIZE: int = 1000  # 导出接口每批从服务端游标读取的行数
+    COUNT_ESTIMATE_THRESHOLD: int = 100_000  # 整表行数超过该值时返回估算总数
 
     # CORS配置
     BACKEND_CORS_ORIGINS: Annotated[
@@ -66,6 +71,17 @@ class Settings(BaseSettings):
     # 项目信息
     PROJECT_NAME: str  # 项目名称
     SENTRY_DSN: HttpUrl | None = None  # Sentry错误追踪DSN
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.05  # 普通请求的追踪采样率
+    # 路径前缀 -> 追踪采样率，最长的匹配前缀优先，0表示不追踪
+    SENTRY_TRACES_ROUTE_SAMPLE_RATES: dict[str, float] = {
+        "/api/v1/utils/health-check/": 0.0,
+        "/metrics": 0.0,
+    }
+    # 慢请求保留（可选，默认关闭）：大于0时耗时不少于该秒数的请求和5xx请求始终上报；
+    # 代价是采样率不为0的路由上每个请求都被完整记录，结束后再丢弃不需要的，
+    # 追踪开销与采样率1.0相同。0表示在请求开始时按路由采样率决定
+    SENTRY_TRACES_KEEP_SLOW_SECONDS: float = 0.0
+    SENTRY_PROFILES_SAMPLE_RATE: float = 0.0  # 被追踪的请求中进行性能剖析的比例
     
     # 数据库配置
     POSTGRES_SERVER: str  # PostgreSQL服务器地址
@@ -74,6 +90,14 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = ""  # PostgreSQL密码
     POSTGRES_DB: str = ""  # PostgreSQL数据库名
 
+    # 数据库连接池配置（每个worker进程、每个引擎独立生效）
+    DB_POOL_SIZE: int = 5  # 连接池保持的连接数
+    DB_MAX_OVERFLOW: int = 10  # 连接池满时允许额外创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 等待可用连接的超时时间（秒）
+    DB_POOL_RECYCLE: int = 1800  # 连接最长复用时间（秒），-1表示不回收
+    DB_POOL_PRE_PING: bool = True  # 检出连接前先检测连接是否可用
+    DB_POOL_USE_LIFO: bool = False  # 后进先出复用连接，便于空闲连接被回收
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
@@ -98,6 +122,10 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str | None = None  # SMTP密码
     EMAILS_FROM_EMAIL: EmailStr | None = None  # 发件人邮箱
     EMAILS_FROM_NAME: EmailStr | None = None  # 发件人名称
+    SMTP_TIMEOUT_SECONDS: float = 10.0  # SMTP连接和命令的超时时间
+    SMTP_POOL_SIZE: int = 2  # 最多同时打开的SMTP连接数
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # 每个连接最多发送的邮件数
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 30.0  # 连接空闲超过该时间后重新连接
 
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
@@ -119,7 +147,81 @@ class Settings(BaseSettings):
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
     EMAIL_TEST_USER: EmailStr = "test@example.com"  # 测试用户邮箱
-    
+
+    # 邮件发件箱配置，邮件先写入数据库，再由worker在后台发送
+    EMAIL_OUTBOX_EMBEDDED_WORKER: bool = True  # 在API进程中运行worker，单独部署时关闭
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50  # 每批取出的邮件数
+    EMAIL_OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0  # 没有待发送邮件时的查询间隔
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8  # 最多尝试发送的次数，超过后标记为failed
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = 30  # 第一次失败后的重试间隔，之后逐次翻倍
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = 3600  # 重试间隔上限
+
+    # 后台任务配置，任务写入数据库，由单独的任务worker进程领取执行
+    JOB_WORKER_CONCURRENCY: int = 4  # 每个worker进程同时执行的任务数
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0  # 没有可执行任务时的查询间隔
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = 300  # 领取后的租约时长，执行中定期续约
+    JOB_MAX_ATTEMPTS: int = 5  # 默认最多执行次数
+    JOB_RETRY_BASE_SECONDS: float = 10  # 第一次失败后的重试间隔，之后逐次翻倍
+    JOB_RETRY_MAX_SECONDS: float = 3600  # 重试间隔上限
+    JOB_STATS_LOG_INTERVAL_SECONDS: float = 60  # worker输出吞吐统计的间隔，0表示不输出
+
+    # 邮件模板配置，模板在启动时预编译
+    EMAIL_TEMPLATES_BYTECODE_CACHE: bool = True  # 是否把编译结果写入字节码缓存
+    EMAIL_TEMPLATES_BYTECODE_CACHE_DIR: str | None = None  # 缓存目录，默认使用临时目录
+    EMAIL_TEMPLATES_PRECOMPUTE_STATIC: bool = True  # 编译时写入项目名称等不变的内容
+
+    # 响应缓存配置，缓存列表和详情接口的GET响应
+    # memory只适用于单个worker进程：缓存和失效都不跨进程，多worker或使用任务worker时
+    # 其他进程的写操作不会使其失效；多进程部署使用redis
+    RESPONSE_CACHE_BACKEND: Literal["disabled", "memory", "redis"] = "disabled"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"  # Redis服务地址
+    RESPONSE_CACHE_TTL_SECONDS: float = 30  # 缓存保持新鲜的时间
+    RESPONSE_CACHE_STALE_SECONDS: float = 30  # 过期后仍可返回旧值并后台刷新的时间
+    RESPONSE_CACHE_MAX_SIZE: int = 10_000  # 内存后端最多缓存的响应数
+
+    # 响应压缩配置，br和zstd需要安装brotli、zstandard
+    COMPRESSION_ENABLED: bool = True  # 是否根据Accept-Encoding压缩响应
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # 小于该字节数的响应不压缩
+    COMPRESSION_GZIP_LEVEL: int = 6  # gzip压缩级别（1-9）
+    COMPRESSION_BROTLI_LEVEL: int = 4  # brotli压缩级别（0-11）
+    COMPRESSION_ZSTD_LEVEL: int = 3  # zstd压缩级别（1-19）
+
+    # 请求指标配置，/metrics以Prometheus文本格式输出
+    METRICS_ENABLED: bool = True  # 是否记录请求指标并开放/metrics
+    # 设置后抓取时必须携带该Bearer令牌；非本地环境未设置时/metrics返回404
+    METRICS_BEARER_TOKEN: str | None = None
+    # 多个worker进程共享的目录，每个进程定期写入快照，/metrics汇总所有进程；
+    # 为空时只输出当前进程的指标，部署时应在启动前清空该目录
+    METRICS_MULTIPROCESS_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5.0  # 每个进程写入快照的间隔
+
+    # 按需剖析配置，超级用户带X-Profile头的请求或命中剖析目标的请求会被采样剖析
+    PROFILING_ENABLED: bool = True  # 是否启用按需剖析，关闭时不添加中间件
+    # 剖析结果目录，多个worker进程应共享同一目录；为空时使用临时目录下的app-profiles
+    PROFILING_DIR: str | None = None
+    PROFILING_INTERVAL_SECONDS: float = 0.001  # 采样间隔
+    PROFILING_MAX_FILES: int = 50  # 最多保留的剖析结果数
+    # 持续剖析配置，每个进程以低频率采样所有线程，定期把折叠栈写入PROFILING_DIR/continuous
+    PROFILING_CONTINUOUS_ENABLED: bool = False  # 是否启用持续剖析
+    PROFILING_CONTINUOUS_INTERVAL_SECONDS: float = 0.1  # 采样间隔，默认10Hz
+    PROFILING_CONTINUOUS_ROTATE_SECONDS: float = 600  # 每个折叠栈文件覆盖的时间
+    PROFILING_CONTINUOUS_MAX_FILES: int = 1000  # 最多保留的折叠栈文件数（所有进程合计）
+
+    # 密码哈希配置
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt进程池大小，0表示在调用线程中计算
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # 最多排队等待的哈希任务数，超出返回503
+
+    # 用户删除配置，项目数超过阈值时由后台任务分批删除，0表示不启用（默认）；
+    # 启用前必须部署任务worker（app/job_worker.py），否则这些用户只会被停用
+    USER_BACKGROUND_PURGE_THRESHOLD: int = 0  # 后台删除的项目数阈值
+    USER_PURGE_BATCH_SIZE: int = 10_000  # 后台删除时每个事务删除的项目数
+
+    # 认证缓存配置
+    # 缓存在每个worker进程内独立，invalidate只清除当前进程的缓存；
+    # 用户被停用、删除或取消超级用户后，其他进程最多在TTL秒内仍按旧权限放行
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 5  # 用户授权信息缓存时间，0表示不缓存
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000  # 最多缓存的用户数
+
     # 超级用户配置
     FIRST_SUPERUSER: EmailStr  # 第一个超级用户邮箱
     FIRST_SUPERUSER_PASSWORD: str  # 第一个超级用户密码
@@ -1,11 +1,132 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import Histogram
 from app.models import User, UserCreate
 
+# 连接检出等待时间的分桶（秒），比默认分桶更细
+POOL_CHECKOUT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class PoolMetrics:
+    """
+    连接池指标
+    记录每次检出连接的等待时间（包括建立新连接和pre-ping）以及超时次数
+    """
+
+    def __init__(self) -> None:
+        self.checkout_wait = Histogram(POOL_CHECKOUT_BUCKETS)
+        self._lock = threading.Lock()
+        self.checkout_timeouts = 0
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.checkout_timeouts += 1
+
+
+def _instrumented_pool(base: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    """
+    创建带指标记录的连接池类
+    指标挂在类属性上，engine.dispose()重建连接池后仍然保留
+    """
+
+    class InstrumentedPool(base):  # type: ignore[valid-type,misc]
+        pool_metrics = metrics
+
+        def connect(self) -> PoolProxiedConnection:
+            start = time.perf_counter()
+            try:
+                return super().connect()  # type: ignore[no-any-return]
+            except exc.TimeoutError:
+                self.pool_metrics.record_timeout()
+                raise
+            finally:
+                self.pool_metrics.checkout_wait.observe(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+# 连接池参数，同步引擎和异步引擎各自拥有一个连接池，
+# 因此每个worker进程最多占用 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) 个连接
+_pool_options: dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+}
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
 # 创建数据库引擎
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=_instrumented_pool(QueuePool, sync_pool_metrics),
+    **_pool_options,
+)
+
+# 创建异步数据库引擎（psycopg异步驱动），供异步路由使用
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=_instrumented_pool(AsyncAdaptedQueuePool, async_pool_metrics),
+    **_pool_options,
+)
+
+
+def get_pool_stats() -> list[dict[str, Any]]:
+    """
+    获取连接池状态
+
+    Returns:
+        每个引擎连接池的已检出、空闲、溢出连接数以及检出等待时间直方图
+    """
+    stats = []
+    for name, pool, metrics in (
+        ("sync", engine.pool, sync_pool_metrics),
+        ("async", async_engine.sync_engine.pool, async_pool_metrics),
+    ):
+        assert isinstance(pool, QueuePool)
+        stats.append(
+            {
+                "name": name,
+                "size": pool.size(),
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # QueuePool.overflow()在连接数低于pool_size时为负数
+                "overflow": max(pool.overflow(), 0),
+                "checkout_timeouts": metrics.checkout_timeouts,
+                "checkout_wait_seconds": metrics.checkout_wait.snapshot(),
+            }
+        )
+    return stats
 
 
 # 确保在初始化数据库之前导入所有SQLModel模型（app.models）
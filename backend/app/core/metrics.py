@@ -0,0 +1,67 @@
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Any
+
+# 默认的耗时分桶（秒），覆盖从毫秒级查询到数秒级的慢操作
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    线程安全的直方图
+    记录观测值的分布，用于统计排队时间、执行耗时等指标
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # 最后一个槽位对应 +Inf
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值（通常为秒）
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        获取直方图快照
+
+        Returns:
+            包含总数、总和以及累计分桶计数的字典
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total_count = self._count
+        buckets: dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts[:-1], strict=True):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = total_count
+        return {"count": total_count, "sum": total_sum, "buckets": buckets}
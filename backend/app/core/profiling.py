@@ -0,0 +1,546 @@
+import abc
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 栈帧标识：(函数限定名, 文件, 函数首行行号)，同一函数的不同行合并为一帧
+Frame = tuple[str, str, int]
+
+# 触发剖析的请求头，值为空或0时不触发
+PROFILE_HEADER = b"x-profile"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# 线程名称末尾的编号，如ThreadPoolExecutor-0_1
+_THREAD_NUMBER = re.compile(r"[-_\d]+$")
+
+# 线程空闲等待时所在的函数：(文件名, 函数限定名)，调用栈最内层为这些函数的线程不计入
+IDLE_FRAMES = frozenset(
+    {
+        ("threading.py", "Condition.wait"),
+        ("threading.py", "Event.wait"),
+        ("queue.py", "Queue.get"),
+        ("thread.py", "_worker"),
+        ("selectors.py", "EpollSelector.select"),
+        ("selectors.py", "KqueueSelector.select"),
+        ("selectors.py", "PollSelector.select"),
+        ("selectors.py", "SelectSelector.select"),
+    }
+)
+
+
+def _short_path(filename: str) -> str:
+    """
+    去掉文件路径中最长的sys.path前缀，不同部署目录下的结果可以直接比较
+    """
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) :].lstrip(os.sep) if best else filename
+
+
+class StackSampler(abc.ABC):
+    """
+    采样式剖析器
+    后台线程按固定间隔读取所有线程（除自身外）的调用栈，交给collect处理；
+    不修改被剖析的代码，未启动时没有任何开销
+    """
+
+    def __init__(self, interval: float) -> None:
+        """
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self._frames: dict[CodeType, Frame] = {}
+        # 线程名称在第一次采样到时记录，采样结束前退出的线程也能显示名称
+        self.thread_names: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _frame(self, code: CodeType) -> Frame:
+        frame = self._frames.get(code)
+        if frame is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            frame = self._frames[code] = (name, code.co_filename, code.co_firstlineno)
+        return frame
+
+    def stacks(self, exclude: int | None = None) -> dict[int, tuple[Frame, ...]]:
+        """
+        读取当前所有线程的调用栈
+
+        Args:
+            exclude: 不采样的线程ID
+
+        Returns:
+            线程ID -> 从最外层到最内层的栈帧
+        """
+        result: dict[int, tuple[Frame, ...]] = {}
+        for thread_id, top in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            stack: list[Frame] = []
+            frame: FrameType | None = top
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            result[thread_id] = tuple(stack)
+        return result
+
+    def _update_thread_names(self, thread_ids: Iterable[int]) -> None:
+        if not self.thread_names.keys() >= set(thread_ids):
+            self.thread_names.update(
+                (t.ident, t.name) for t in threading.enumerate() if t.ident is not None
+            )
+
+    @abc.abstractmethod
+    def collect(self, stacks: dict[int, tuple[Frame, ...]], elapsed: float) -> None:
+        """
+        处理一次采样，由子类实现
+
+        Args:
+            stacks: 线程ID -> 调用栈
+            elapsed: 距上一次采样的时间（秒），作为本次采样的权重
+        """
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self.collect(self.stacks(exclude=own), now - last)
+            last = now
+
+    def start(self) -> None:
+        """
+        在后台线程中开始采样
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止采样并等待采样线程退出
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class RequestProfiler(StackSampler):
+    """
+    单个请求的剖析器
+    按线程保存每次采样的调用栈，结束后输出speedscope格式；
+    同步路由在线程池中执行，所以采样所有线程，而不只是事件循环所在的线程
+    """
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(interval)
+        self.samples: dict[int, list[tuple[tuple[Frame, ...], float]]] = {}
+        # 启动剖析的线程，即处理请求的事件循环线程
+        self.origin = threading.get_ident()
+
+    def collect(self, stacks: dict[int, tuple[Frame, ...]], elapsed: float) -> None:
+        self._update_thread_names(stacks)
+        for thread_id, stack in stacks.items():
+            self.samples.setdefault(thread_id, []).append((stack, elapsed))
+
+    def to_speedscope(self, name: str) -> dict[str, Any]:
+        """
+        输出speedscope文件格式，每个线程一个profile，
+        启动剖析的线程排在最前并默认显示，其他线程按名称排序
+
+        Args:
+            name: 剖析结果名称
+
+        Returns:
+            可序列化为JSON的speedscope文件内容
+        """
+        thread_names = self.thread_names
+        threads = sorted(
+            self.samples.items(),
+            key=lambda item: (
+                item[0] != self.origin,
+                thread_names.get(item[0], str(item[0])),
+            ),
+        )
+        frames: list[dict[str, Any]] = []
+        index: dict[Frame, int] = {}
+        profiles = []
+        for thread_id, samples in threads:
+            stacks = []
+            weights = []
+            for stack, elapsed in samples:
+                indices = []
+                for frame in stack:
+                    i = index.get(frame)
+                    if i is None:
+                        i = index[frame] = len(frames)
+                        frames.append(
+                            {"name": frame[0], "file": frame[1], "line": frame[2]}
+                        )
+                    indices.append(i)
+                stacks.append(indices)
+                weights.append(elapsed * 1000)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread_names.get(thread_id, str(thread_id)),
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": stacks,
+                    "weights": weights,
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.PROJECT_NAME,
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+class ContinuousProfiler(StackSampler):
+    """
+    持续运行的低频剖析器
+    以较低频率采样所有线程（包括执行同步路由的线程池线程），按折叠栈汇总采样次数，
+    每隔一段时间把汇总结果写入一个折叠栈文件（flamegraph.pl和speedscope均可读取），
+    用于比较不同版本的热点路径；空闲等待的线程不计入
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        interval: float,
+        rotate_seconds: float,
+        max_files: int,
+    ) -> None:
+        """
+        Args:
+            directory: 折叠栈文件目录
+            interval: 采样间隔（秒）
+            rotate_seconds: 每个文件覆盖的时间（秒）
+            max_files: 最多保留的文件数，超出时删除最旧的
+        """
+        super().__init__(interval)
+        self.directory = Path(directory)
+        self.rotate_seconds = rotate_seconds
+        self.max_files = max_files
+        self.counts: Counter[str] = Counter()
+        self._labels: dict[Frame, str] = {}
+        self._window_start = time.time()
+
+    def _label(self, frame: Frame) -> str:
+        label = self._labels.get(frame)
+        if label is None:
+            name, filename, line = frame
+            label = f"{name} ({_short_path(filename)}:{line})".replace(";", ":")
+            self._labels[frame] = label
+        return label
+
+    def collect(self, stacks: dict[int, tuple[Frame, ...]], elapsed: float) -> None:
+        self._update_thread_names(stacks)
+        for thread_id, stack in stacks.items():
+            if not stack or (Path(stack[-1][1]).name, stack[-1][0]) in IDLE_FRAMES:
+                continue
+            # 线程名称去掉末尾的编号，同一线程池的线程合并在一起
+            thread = _THREAD_NUMBER.sub("", self.thread_names.get(thread_id, ""))
+            labels = [thread or "thread", *map(self._label, stack)]
+            self.counts[";".join(labels)] += 1
+        if time.time() - self._window_start >= self.rotate_seconds:
+            self.flush()
+
+    def flush(self) -> Path | None:
+        """
+        把当前汇总结果写入文件并开始新的时间窗口，删除超出数量上限的旧文件
+
+        Returns:
+            写入的文件路径，没有采样时为None
+        """
+        counts, self.counts = self.counts, Counter()
+        started = datetime.fromtimestamp(self._window_start, timezone.utc)
+        self._window_start = time.time()
+        if not counts:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{started:%Y%m%dT%H%M%SZ}-{os.getpid()}.collapsed"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text("".join(f"{stack} {n}\n" for stack, n in counts.items()))
+        os.replace(tmp, path)
+        paths = sorted(self.directory.glob("*.collapsed"), reverse=True)
+        for old in paths[self.max_files :]:
+            old.unlink(missing_ok=True)
+        return path
+
+    def run(self) -> None:
+        try:
+            super().run()
+        except Exception:
+            # 剖析出错不能影响服务，放弃本进程的持续剖析
+            logger.exception("Continuous profiler stopped")
+
+    def stop(self) -> None:
+        """
+        停止采样并写入最后一个时间窗口的结果
+        """
+        super().stop()
+        try:
+            self.flush()
+        except OSError:
+            logger.exception("Failed to write continuous profile")
+
+
+def _mtime(path: Path) -> float:
+    # 其他进程可能同时删除旧结果
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+class ProfileStore:
+    """
+    剖析结果存储
+    剖析结果和管理员设置的剖析目标都保存在目录中，多个worker进程共享同一目录时，
+    在任意进程上设置的目标对所有进程生效，剖析结果也可以从任意进程下载
+    """
+
+    # 剖析目标文件的重新读取间隔（秒），请求路径上最多每秒读一次文件
+    TARGET_REFRESH_SECONDS = 1.0
+
+    def __init__(self, directory: str | Path, max_files: int) -> None:
+        """
+        Args:
+            directory: 存储目录
+            max_files: 最多保留的剖析结果数，超出时删除最旧的
+        """
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._target: dict[str, Any] | None = None
+        self._target_checked_at = -self.TARGET_REFRESH_SECONDS
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def _write(self, path: Path, data: dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+
+    def save(self, profile_id: str, profile: dict[str, Any]) -> None:
+        """
+        保存剖析结果，并删除超出数量上限的旧结果
+        """
+        self._write(self.directory / f"{profile_id}.speedscope.json", profile)
+        paths = sorted(
+            self.directory.glob("*.speedscope.json"), key=_mtime, reverse=True
+        )
+        for path in paths[self.max_files :]:
+            path.unlink(missing_ok=True)
+
+    def path(self, profile_id: str) -> Path | None:
+        """
+        获取剖析结果文件路径
+
+        Returns:
+            文件路径，ID无效或结果已被删除时为None
+        """
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.speedscope.json"
+        return path if path.exists() else None
+
+    def list(self) -> list[dict[str, Any]]:
+        """
+        列出保存的剖析结果，最新的在前
+
+        Returns:
+            包含id、name、created_at和size_bytes的字典列表
+        """
+        result = []
+        for path in self.directory.glob("*.speedscope.json"):
+            try:
+                stat = path.stat()
+                name = json.loads(path.read_text()).get("name", "")
+            except (OSError, ValueError):
+                continue
+            result.append(
+                {
+                    "id": path.name.split(".", 1)[0],
+                    "name": name,
+                    "created_at": stat.st_mtime,
+                    "size_bytes": stat.st_size,
+                }
+            )
+        result.sort(key=lambda info: info["created_at"], reverse=True)
+        return result
+
+    def set_target(self, path_prefix: str, expires_in: float) -> dict[str, Any]:
+        """
+        设置剖析目标，到期前路径匹配的请求都会被剖析
+
+        Args:
+            path_prefix: 请求路径前缀
+            expires_in: 有效时间（秒）
+
+        Returns:
+            包含path_prefix和expires_at（Unix时间戳）的字典
+        """
+        target = {"path_prefix": path_prefix, "expires_at": time.time() + expires_in}
+        self._write(self.directory / "target.json", target)
+        self._target_checked_at = -self.TARGET_REFRESH_SECONDS
+        return target
+
+    def clear_target(self) -> None:
+        """
+        清除剖析目标
+        """
+        (self.directory / "target.json").unlink(missing_ok=True)
+        self._target_checked_at = -self.TARGET_REFRESH_SECONDS
+
+    def get_target(self) -> dict[str, Any] | None:
+        """
+        读取剖析目标
+
+        Returns:
+            剖析目标，未设置或已过期时为None
+        """
+        try:
+            target = json.loads((self.directory / "target.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if target["expires_at"] <= time.time():
+            return None
+        return dict(target)
+
+    def matches(self, path: str) -> bool:
+        """
+        检查请求路径是否命中剖析目标，剖析目标最多每秒重新读取一次
+        """
+        now = time.monotonic()
+        if now - self._target_checked_at >= self.TARGET_REFRESH_SECONDS:
+            self._target = self.get_target()
+            self._target_checked_at = now
+        target = self._target
+        return (
+            target is not None
+            and target["expires_at"] > time.time()
+            and path.startswith(target["path_prefix"])
+        )
+
+
+class ProfilingMiddleware:
+    """
+    按需剖析中间件
+    请求带有X-Profile头且由超级用户发起，或路径命中管理员设置的剖析目标时，
+    在请求期间运行采样剖析器，结果保存到ProfileStore，响应头X-Profile-Id为结果ID；
+    其他请求只检查一次请求头和缓存的剖析目标
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        authorize: Callable[[Scope], Awaitable[bool]],
+        store: ProfileStore | None = None,
+        interval: float | None = None,
+    ) -> None:
+        """
+        Args:
+            app: ASGI应用
+            authorize: 检查带X-Profile头的请求是否允许剖析
+            store: 剖析结果存储，为None时使用全局profile_store
+            interval: 采样间隔（秒），为None时使用PROFILING_INTERVAL_SECONDS
+        """
+        self.app = app
+        self.authorize = authorize
+        self.store = store or profile_store
+        self.interval = interval or settings.PROFILING_INTERVAL_SECONDS
+
+    async def _should_profile(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if value not in (b"", b"0") and await self.authorize(scope):
+                    return True
+                break
+        return self.store.matches(scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not await self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        profile_id = self.store.new_id()
+        profiler = RequestProfiler(self.interval)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            name = f"{scope['method']} {scope['path']} {status} {elapsed_ms:.1f}ms"
+            await run_in_threadpool(
+                self.store.save, profile_id, profiler.to_speedscope(name)
+            )
+
+
+# 剖析结果目录，未配置PROFILING_DIR时使用临时目录
+PROFILES_DIR = Path(
+    settings.PROFILING_DIR or Path(tempfile.gettempdir()) / "app-profiles"
+)
+
+# 全局剖析结果存储
+profile_store = ProfileStore(PROFILES_DIR, settings.PROFILING_MAX_FILES)
+
+# 持续剖析器，未启用PROFILING_CONTINUOUS_ENABLED时为None
+continuous_profiler = (
+    ContinuousProfiler(
+        PROFILES_DIR / "continuous",
+        interval=settings.PROFILING_CONTINUOUS_INTERVAL_SECONDS,
+        rotate_seconds=settings.PROFILING_CONTINUOUS_ROTATE_SECONDS,
+        max_files=settings.PROFILING_CONTINUOUS_MAX_FILES,
+    )
+    if settings.PROFILING_CONTINUOUS_ENABLED
+    else None
+)
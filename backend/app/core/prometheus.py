@@ -0,0 +1,453 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import DEFAULT_BUCKETS, Histogram
+
+# 没有匹配到路由的请求（如404）统一使用该标签，避免按原始路径产生大量时间序列
+UNMATCHED = "unmatched"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def operation_id(
+    route: Any, generate_unique_id: Callable[[APIRoute], str] | None = None
+) -> str:
+    """
+    获取路由的操作ID，与OpenAPI文档中的operationId一致
+
+    Args:
+        route: 请求匹配到的路由
+        generate_unique_id: 应用的generate_unique_id_function，为None时使用路由自带的ID
+
+    Returns:
+        操作ID，非FastAPI路由（如挂载的静态文件）使用路由名称
+    """
+    if isinstance(route, APIRoute):
+        if route.operation_id:
+            return route.operation_id
+        if generate_unique_id is not None:
+            return generate_unique_id(route)
+        return route.unique_id
+    return str(getattr(route, "name", None) or UNMATCHED)
+
+
+class RequestMetrics:
+    """
+    HTTP请求指标
+    按操作ID、请求方法和状态码统计请求数，按操作ID和请求方法记录耗时直方图，
+    按请求方法记录正在处理的请求数
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str, str], int] = defaultdict(int)
+        self._durations: dict[tuple[str, str], Histogram] = {}
+        self._in_progress: dict[str, int] = defaultdict(int)
+
+    def started(self, method: str) -> None:
+        with self._lock:
+            self._in_progress[method] += 1
+
+    def finished(
+        self, operation: str, method: str, status: int, duration: float
+    ) -> None:
+        key = (operation, method)
+        with self._lock:
+            self._in_progress[method] -= 1
+            self._requests[(operation, method, str(status))] += 1
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = Histogram(self.buckets)
+        histogram.observe(duration)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        获取可序列化为JSON的指标快照，用于多进程汇总
+
+        Returns:
+            包含counters、gauges和histograms的字典，每项为(标签, 值)列表
+        """
+        with self._lock:
+            requests = list(self._requests.items())
+            durations = list(self._durations.items())
+            in_progress = list(self._in_progress.items())
+        return {
+            "counters": {
+                "http_requests_total": [
+                    [{"operation": op, "method": method, "status": status}, value]
+                    for (op, method, status), value in requests
+                ]
+            },
+            "gauges": {
+                "http_requests_in_progress": [
+                    [{"method": method}, value] for method, value in in_progress
+                ]
+            },
+            "histograms": {
+                "http_request_duration_seconds": [
+                    [{"operation": op, "method": method}, histogram.snapshot()]
+                    for (op, method), histogram in durations
+                ]
+            },
+        }
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件
+    纯ASGI实现，每个请求只记录开始时间和最终状态码；
+    耗时包含响应体发送完成之前的全部时间
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        metrics: RequestMetrics | None = None,
+        generate_unique_id: Callable[[APIRoute], str] | None = None,
+    ) -> None:
+        """
+        Args:
+            app: ASGI应用
+            metrics: 记录指标的对象，为None时使用全局request_metrics
+            generate_unique_id: 应用的generate_unique_id_function，
+                路由上保存的unique_id不一定由它生成，需要用它重新计算
+        """
+        self.app = app
+        self.metrics = metrics or request_metrics
+        self.generate_unique_id = generate_unique_id
+        # id(路由) -> (路由, 操作ID)，路由对象不可哈希；同时保存路由，保证id不被复用
+        self._operation_ids: dict[int, tuple[Any, str]] = {}
+
+    def _operation_id(self, scope: Scope) -> str:
+        # 路由匹配后scope中带有route，没有匹配到路由（如404）时没有
+        route = scope.get("route")
+        if route is None:
+            return UNMATCHED
+        cached = self._operation_ids.get(id(route))
+        if cached is None:
+            cached = (route, operation_id(route, self.generate_unique_id))
+            self._operation_ids[id(route)] = cached
+        return cached[1]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+        self.metrics.started(method)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.finished(
+                self._operation_id(scope), method, status, time.perf_counter() - start
+            )
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _pid(path: Path) -> int | None:
+    try:
+        return int(path.stem.split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: Path, value: Any) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(value))
+    os.replace(tmp, path)
+
+
+class MultiProcessStore:
+    """
+    多进程指标存储
+    每个进程定期把自己的快照原子地写入共享目录中的一个文件，
+    /metrics由任意一个进程读取全部文件后汇总；
+    已退出进程的计数器和直方图继续计入总数，正在处理的请求数只统计存活的进程；
+    进程启动时把已退出进程的文件合并到归档文件后删除，文件数不随worker重启增长
+    """
+
+    ARCHIVE_NAME = "archive.json"
+
+    def __init__(self, directory: str | Path, metrics: RequestMetrics) -> None:
+        self.directory = Path(directory)
+        self.metrics = metrics
+        # 文件名带随机后缀，容器中进程号被复用时不会覆盖旧进程的数据
+        self.path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        self.archive_path = self.directory / self.ARCHIVE_NAME
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @contextmanager
+    def _locked(self, *, exclusive: bool) -> Iterator[None]:
+        # 合并归档与读取互斥，读取时不会看到合并了一半的数据
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _process_files(self) -> list[tuple[Path, int]]:
+        # 其他进程的快照文件及其进程号，不含当前进程和归档文件
+        files = []
+        for path in self.directory.glob("*.json"):
+            pid = _pid(path)
+            if path != self.path and pid is not None:
+                files.append((path, pid))
+        return files
+
+    def _read_archive(self) -> dict[str, Any]:
+        archive = _read_json(self.archive_path)
+        if not isinstance(archive, dict):
+            return {"snapshot": {}, "merged": []}
+        return archive
+
+    def write(self) -> None:
+        """
+        写入当前进程的快照
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_json(self.path, self.metrics.snapshot())
+
+    def read_all(self) -> list[dict[str, Any]]:
+        """
+        读取所有进程的快照和已退出进程的归档，当前进程直接使用内存中的最新值
+
+        Returns:
+            快照列表，已退出进程的快照不包含gauges
+        """
+        snapshots = [self.metrics.snapshot()]
+        with self._locked(exclusive=False):
+            archive = self._read_archive()
+            merged = set(archive["merged"])
+            snapshots.append(archive["snapshot"])
+            for path, pid in self._process_files():
+                if path.name in merged:
+                    continue
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                if not _pid_alive(pid):
+                    snapshot["gauges"] = {}
+                snapshots.append(snapshot)
+        return snapshots
+
+    def prune(self) -> int:
+        """
+        把已退出进程的快照合并到归档文件后删除
+        计数器和直方图的总数不变；归档中记录已合并的文件名，
+        删除文件前中断也不会重复计数
+
+        Returns:
+            本次合并的文件数
+        """
+        with self._locked(exclusive=True):
+            archive = self._read_archive()
+            merged = set(archive["merged"])
+            dead = [path for path, pid in self._process_files() if not _pid_alive(pid)]
+            new = [path for path in dead if path.name not in merged]
+            if new:
+                snapshots = [archive["snapshot"]]
+                for path in new:
+                    snapshot = _read_json(path)
+                    if snapshot is not None:
+                        snapshots.append({**snapshot, "gauges": {}})
+                _write_json(
+                    self.archive_path,
+                    {
+                        "snapshot": merge(snapshots),
+                        "merged": sorted(path.name for path in dead),
+                    },
+                )
+            for path in dead:
+                path.unlink(missing_ok=True)
+        return len(new)
+
+    def run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def start(self, interval: float) -> None:
+        """
+        在后台线程中定期写入快照，启动前先合并已退出进程的文件
+
+        Args:
+            interval: 写入间隔（秒）
+        """
+        try:
+            self.prune()
+        except OSError:
+            pass
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, args=(interval,), name="metrics-store", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止定期写入，并写入最后一次快照
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str], extra: dict[str, str] | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+def merge(snapshots: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """
+    汇总多个快照，计数器、直方图和gauge按标签相加
+
+    Args:
+        snapshots: RequestMetrics.snapshot返回的快照
+
+    Returns:
+        汇总后的快照，格式与RequestMetrics.snapshot相同
+    """
+    counters: dict[str, dict[Any, float]] = defaultdict(lambda: defaultdict(float))
+    gauges: dict[str, dict[Any, float]] = defaultdict(lambda: defaultdict(float))
+    histograms: dict[str, dict[Any, dict[str, Any]]] = defaultdict(dict)
+    for snapshot in snapshots:
+        for name, samples in snapshot.get("counters", {}).items():
+            for labels, value in samples:
+                counters[name][_key(labels)] += value
+        for name, samples in snapshot.get("gauges", {}).items():
+            for labels, value in samples:
+                gauges[name][_key(labels)] += value
+        for name, samples in snapshot.get("histograms", {}).items():
+            for labels, value in samples:
+                merged = histograms[name].setdefault(
+                    _key(labels), {"count": 0, "sum": 0.0, "buckets": {}}
+                )
+                merged["count"] += value["count"]
+                merged["sum"] += value["sum"]
+                for bound, count in value["buckets"].items():
+                    merged["buckets"][bound] = merged["buckets"].get(bound, 0) + count
+    return {
+        kind: {
+            name: [[dict(key), value] for key, value in sorted(series.items())]
+            for name, series in merged_kind.items()
+        }
+        for kind, merged_kind in (
+            ("counters", counters),
+            ("gauges", gauges),
+            ("histograms", histograms),
+        )
+    }
+
+
+def render(snapshots: Iterable[dict[str, Any]]) -> str:
+    """
+    汇总多个快照并输出Prometheus文本格式
+
+    Args:
+        snapshots: RequestMetrics.snapshot返回的快照
+
+    Returns:
+        Prometheus文本格式（0.0.4）
+    """
+    merged = merge(snapshots)
+    lines: list[str] = []
+    for name, samples in merged["counters"].items():
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for name, samples in merged["gauges"].items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for name, samples in merged["histograms"].items():
+        lines.append(f"# TYPE {name} histogram")
+        for labels, value in samples:
+            for bound, count in value["buckets"].items():
+                bucket_labels = _format_labels(labels, {"le": bound})
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(
+                f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}"
+            )
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# 全局请求指标
+request_metrics = RequestMetrics()
+
+# 多进程指标存储，未配置METRICS_MULTIPROCESS_DIR时为None
+metrics_store = (
+    MultiProcessStore(settings.METRICS_MULTIPROCESS_DIR, request_metrics)
+    if settings.METRICS_MULTIPROCESS_DIR
+    else None
+)
+
+
+def generate_latest() -> str:
+    """
+    生成/metrics的响应内容，多进程模式下汇总所有进程
+
+    Returns:
+        Prometheus文本格式
+    """
+    if metrics_store is None:
+        return render([request_metrics.snapshot()])
+    return render(metrics_store.read_all())
@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+import struct
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 缓存值的头部：新鲜期截止时间（Unix时间戳），之后是响应体
+_HEADER = struct.Struct("!d")
+
+Loader = Callable[[], Awaitable[bytes]]
+
+
+class CacheBackend(Protocol):
+    """
+    响应缓存后端
+    除了键值读写外还需要维护命名空间版本号：版本号变化后，
+    该命名空间下的所有键都不会再被命中，从而实现精确失效
+    """
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def get_versions(self, namespaces: list[str]) -> list[str]: ...
+
+    async def bump(self, namespaces: list[str]) -> None: ...
+
+    def bump_sync(self, namespaces: list[str]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """
+    进程内缓存后端，只适用于单个worker进程
+    每个进程各有一份缓存，失效也只作用于当前进程：多个uvicorn worker或
+    独立的任务worker进程中，其他进程的写操作不会使这里的缓存失效，
+    最多返回RESPONSE_CACHE_TTL_SECONDS加RESPONSE_CACHE_STALE_SECONDS之前的数据
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._values: TTLCache[str, bytes] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 版本号用随机值而不是递增计数：版本号被淘汰后会生成新值，
+        # 旧的缓存键不会因为计数回到0而重新被命中
+        self._versions: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> bytes | None:
+        return self._values.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values.set(key, value)
+
+    async def get_versions(self, namespaces: list[str]) -> list[str]:
+        versions = []
+        with self._lock:
+            for namespace in namespaces:
+                version = self._versions.get(namespace)
+                if version is None:
+                    version = secrets.token_hex(4)
+                    self._versions.set(namespace, version)
+                versions.append(version)
+        return versions
+
+    async def bump(self, namespaces: list[str]) -> None:
+        self.bump_sync(namespaces)
+
+    def bump_sync(self, namespaces: list[str]) -> None:
+        with self._lock:
+            for namespace in namespaces:
+                self._versions.invalidate(namespace)
+
+    async def close(self) -> None:
+        self._values.clear()
+        self._versions.clear()
+
+
+class RedisBackend:
+    """
+    基于Redis的缓存后端，多个worker和实例之间共享
+    兼容Valkey、KeyDB等实现了Redis协议的服务
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "response-cache:") -> None:
+        """
+        Args:
+            url: Redis地址，支持redis://、rediss://和unix://
+            ttl: 命名空间版本号的过期时间（秒）
+            prefix: 所有键的前缀
+        """
+        self.url = url
+        # 异步客户端的连接绑定在首次使用它的事件循环上
+        self.client: AsyncRedis = AsyncRedis.from_url(url)
+        # 同步客户端供没有事件循环的线程（如任务worker）使用，按需创建
+        self._sync_client: Redis | None = None
+        # 版本号与缓存值同样会过期，避免每个项目的命名空间永久占用内存
+        self.ttl_ms = max(int(ttl * 1000), 1)
+        self.prefix = prefix
+
+    def _namespace_keys(self, namespaces: list[str]) -> list[str]:
+        return [f"{self.prefix}ns:{namespace}" for namespace in namespaces]
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.client.get(self.prefix + key)
+        return value if isinstance(value, bytes) else None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    async def get_versions(self, namespaces: list[str]) -> list[str]:
+        keys = self._namespace_keys(namespaces)
+        # SET NX只在版本号不存在时写入，之后的MGET拿到的一定是最终值；
+        # 不使用事务，所有命令一次网络往返
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, secrets.token_hex(4), nx=True, px=self.ttl_ms)
+            pipe.mget(keys)
+            replies = await pipe.execute()
+        return [v.decode() if isinstance(v, bytes) else "" for v in replies[-1]]
+
+    async def bump(self, namespaces: list[str]) -> None:
+        await self.client.delete(*self._namespace_keys(namespaces))
+
+    def bump_sync(self, namespaces: list[str]) -> None:
+        if self._sync_client is None:
+            self._sync_client = Redis.from_url(self.url)
+        self._sync_client.delete(*self._namespace_keys(namespaces))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+class ResponseCache:
+    """
+    响应缓存
+    值在ttl内视为新鲜；之后的stale_ttl内仍会返回旧值，同时在后台刷新
+    （stale-while-revalidate）；后端出错时直接回源，不影响请求
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, stale_ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._errors = 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def _storage_key(self, key: str, namespaces: list[str]) -> str:
+        versions = await self.backend.get_versions(namespaces)
+        raw = "|".join([key, *namespaces, *versions])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def _store(self, storage_key: str, body: bytes) -> None:
+        value = _HEADER.pack(time.time() + self.ttl) + body
+        await self.backend.set(storage_key, value, self.ttl + self.stale_ttl)
+
+    async def get_or_load(
+        self,
+        key: str,
+        namespaces: list[str],
+        load: Loader,
+        refresh: Loader | None = None,
+    ) -> bytes:
+        """
+        读取缓存，未命中时调用load生成响应体并写入缓存
+
+        Args:
+            key: 缓存键，应包含请求路径、查询参数和用户范围
+            namespaces: 该响应依赖的命名空间，任一命名空间失效都会使其失效
+            load: 在当前请求中生成响应体
+            refresh: 在后台重新生成响应体，不能依赖请求内的资源；
+                为None时不使用stale-while-revalidate
+
+        Returns:
+            响应体
+        """
+        try:
+            storage_key = await self._storage_key(key, namespaces)
+            cached = await self.backend.get(storage_key)
+        except Exception:
+            logger.exception("Response cache backend failed")
+            self._count("_errors")
+            return await load()
+
+        if cached is not None:
+            (fresh_until,) = _HEADER.unpack_from(cached)
+            body = cached[_HEADER.size :]
+            if time.time() < fresh_until:
+                self._count("_hits")
+                return body
+            if refresh is not None:
+                self._count("_stale_hits")
+                self._schedule_refresh(storage_key, refresh)
+                return body
+
+        self._count("_misses")
+        body = await load()
+        try:
+            await self._store(storage_key, body)
+        except Exception:
+            logger.exception("Response cache backend failed")
+            self._count("_errors")
+        return body
+
+    def _schedule_refresh(self, storage_key: str, refresh: Loader) -> None:
+        with self._lock:
+            if storage_key in self._refreshing:
+                return
+            self._refreshing.add(storage_key)
+
+        async def run() -> None:
+            try:
+                await self._store(storage_key, await refresh())
+                self._count("_refreshes")
+            except Exception:
+                logger.exception("Response cache refresh failed")
+                self._count("_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(storage_key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def invalidate(self, namespaces: list[str]) -> None:
+        """
+        使命名空间下的所有缓存失效
+
+        Args:
+            namespaces: 命名空间列表
+        """
+        if not namespaces:
+            return
+        try:
+            await self.backend.bump(namespaces)
+        except Exception:
+            logger.exception("Response cache invalidation failed")
+            self._count("_errors")
+
+    def invalidate_sync(self, namespaces: list[str]) -> None:
+        """
+        同步地使命名空间下的所有缓存失效，供没有事件循环的线程（如任务worker）调用
+
+        Args:
+            namespaces: 命名空间列表
+        """
+        if not namespaces:
+            return
+        try:
+            self.backend.bump_sync(namespaces)
+        except Exception:
+            logger.exception("Response cache invalidation failed")
+            self._count("_errors")
+
+    async def close(self) -> None:
+        """
+        等待后台刷新结束并关闭后端
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.backend.close()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含命中、过期命中、未命中、后台刷新、错误次数和命中率的字典
+        """
+        with self._lock:
+            hits, stale_hits, misses = self._hits, self._stale_hits, self._misses
+            refreshes, errors = self._refreshes, self._errors
+        total = hits + stale_hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "stale_hits": stale_hits,
+            "misses": misses,
+            "refreshes": refreshes,
+            "errors": errors,
+            "hit_ratio": (hits + stale_hits) / total if total else 0.0,
+        }
+
+
+def create_response_cache() -> ResponseCache | None:
+    """
+    根据配置创建响应缓存，未启用时返回None
+    """
+    ttl = settings.RESPONSE_CACHE_TTL_SECONDS
+    stale_ttl = settings.RESPONSE_CACHE_STALE_SECONDS
+    backend: CacheBackend
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        backend = MemoryBackend(settings.RESPONSE_CACHE_MAX_SIZE, ttl + stale_ttl)
+    elif settings.RESPONSE_CACHE_BACKEND == "redis":
+        backend = RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, ttl + stale_ttl)
+    else:
+        return None
+    return ResponseCache(backend, ttl=ttl, stale_ttl=stale_ttl)
+
+
+# 全局响应缓存，未启用时为None
+response_cache = create_response_cache()
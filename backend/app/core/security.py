@@ -1,10 +1,21 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 import jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.tracing import span
 
 # 密码加密上下文，使用bcrypt算法
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -12,15 +23,42 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # JWT算法
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+
+class PasswordHashingBusyError(Exception):
+    """密码哈希队列已满，调用方应快速返回503"""
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    已认证的主体
+    仅包含授权判断所需的用户字段，可安全地在进程内缓存
+    """
+
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+
+# 主体缓存，按用户ID缓存授权字段，避免每个请求都查询用户表
+# 修改用户（包括停用、删除、修改密码）时必须调用invalidate
+# 缓存按进程独立，其他worker进程的旧数据最多保留PRINCIPAL_CACHE_TTL_SECONDS秒
+principal_cache: TTLCache[uuid.UUID, Principal] = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     """
     创建访问令牌
-    
+
     Args:
         subject: 令牌主题（通常是用户ID）
         expires_delta: 过期时间增量
-        
+
     Returns:
         编码后的JWT令牌
     """
@@ -30,28 +68,228 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def _hash_password(password: str) -> tuple[str, float]:
+    """
+    在工作进程中计算密码哈希，同时返回实际耗时
+    """
+    start = time.perf_counter()
+    hashed_password = pwd_context.hash(password)
+    return hashed_password, time.perf_counter() - start
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> tuple[bool, float]:
+    """
+    在工作进程中验证密码，同时返回实际耗时
+    """
+    start = time.perf_counter()
+    verified = pwd_context.verify(plain_password, hashed_password)
+    return verified, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """
+    有界的密码哈希执行器
+    将bcrypt计算放到独立的进程池中，避免占用线程池和GIL；
+    当排队任务超过上限时立即抛出PasswordHashingBusyError
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        # 允许同时存在的任务数 = 正在执行的 + 排队等待的
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self.queue_wait = Histogram()
+        self.hash_time = Histogram()
+
+    def start(self) -> None:
+        """
+        预先启动进程池，避免第一次请求承担进程启动开销
+        """
+        if self.workers > 0:
+            self._get_executor()
+
+    def shutdown(self) -> None:
+        """
+        关闭进程池
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 使用spawn避免在多线程进程中fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _acquire(self) -> float:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHashingBusyError("Password hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+        return time.perf_counter()
+
+    def _release(self, submitted: float, elapsed: float | None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+        if elapsed is not None:
+            total = time.perf_counter() - submitted
+            self.hash_time.observe(elapsed)
+            self.queue_wait.observe(max(total - elapsed, 0.0))
+
+    def _submit(
+        self, fn: Callable[..., tuple[T, float]], *args: Any
+    ) -> "Future[tuple[T, float]]":
+        submitted = self._acquire()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(submitted, None)
+            raise
+
+        def _done(f: "Future[tuple[T, float]]") -> None:
+            elapsed = None
+            if not f.cancelled() and f.exception() is None:
+                elapsed = f.result()[1]
+            self._release(submitted, elapsed)
+
+        future.add_done_callback(_done)
+        return future
+
+    def _run_inline(self, fn: Callable[..., tuple[T, float]], *args: Any) -> T:
+        submitted = self._acquire()
+        elapsed = None
+        try:
+            result, elapsed = fn(*args)
+        finally:
+            self._release(submitted, elapsed)
+        return result
+
+    def run(self, fn: Callable[..., tuple[T, float]], *args: Any) -> T:
+        """
+        同步执行哈希任务，等待期间释放GIL
+
+        Args:
+            fn: 工作进程中执行的函数
+            *args: 函数参数
+
+        Returns:
+            函数的返回值
+        """
+        if self.workers <= 0:
+            return self._run_inline(fn, *args)
+        return self._submit(fn, *args).result()[0]
+
+    async def run_async(self, fn: Callable[..., tuple[T, float]], *args: Any) -> T:
+        """
+        异步执行哈希任务，不阻塞事件循环
+
+        Args:
+            fn: 工作进程中执行的函数
+            *args: 函数参数
+
+        Returns:
+            函数的返回值
+        """
+        if self.workers <= 0:
+            return await asyncio.to_thread(self._run_inline, fn, *args)
+        result, _ = await asyncio.wrap_future(self._submit(fn, *args))
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取执行器统计信息，用于评估进程数和队列深度
+
+        Returns:
+            包含配置、当前任务数、拒绝次数和耗时直方图的字典
+        """
+        with self._lock:
+            in_flight = self._in_flight
+            rejected = self._rejected
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "rejected": rejected,
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "hash_seconds": self.hash_time.snapshot(),
+        }
+
+
+# 全局密码哈希执行器
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
-    
+
     Args:
         plain_password: 明文密码
         hashed_password: 哈希密码
-        
+
     Returns:
         密码是否匹配
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with span("password.verify", "bcrypt"):
+        return password_hasher.run(_verify_password, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     获取密码哈希值
-    
+
+    Args:
+        password: 明文密码
+
+    Returns:
+        哈希后的密码
+    """
+    with span("password.hash", "bcrypt"):
+        return password_hasher.run(_hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    异步验证密码
+
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希密码
+
+    Returns:
+        密码是否匹配
+    """
+    with span("password.verify", "bcrypt"):
+        return await password_hasher.run_async(
+            _verify_password, plain_password, hashed_password
+        )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    异步获取密码哈希值
+
     Args:
         password: 明文密码
-        
+
     Returns:
         哈希后的密码
     """
-    return pwd_context.hash(password)
+    with span("password.hash", "bcrypt"):
+        return await password_hasher.run_async(_hash_password, password)
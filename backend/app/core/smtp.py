@@ -0,0 +1,350 @@
+import re
+import smtplib
+import ssl
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from typing import Any
+
+from app.core.config import settings
+from app.core.tracing import span
+
+_EOLS = re.compile(rb"(?:\r\n|\n|\r(?!\n))")
+_LEADING_DOTS = re.compile(rb"(?m)^\.")
+
+
+@dataclass(frozen=True)
+class SMTPOptions:
+    """SMTP连接参数"""
+
+    host: str
+    port: int
+    tls: bool = False  # 连接后执行STARTTLS
+    ssl: bool = False  # 直接使用SSL连接
+    user: str | None = None
+    password: str | None = None
+    timeout: float = 10.0
+
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    """待发送的邮件"""
+
+    from_addr: str
+    to_addrs: list[str]
+    data: bytes  # 完整的MIME邮件
+
+
+class _Connection:
+    def __init__(self, client: smtplib.SMTP) -> None:
+        self.client = client
+        self.messages = 0
+        self.last_used = time.monotonic()
+        self.pipelining = client.has_extn("pipelining")
+
+    def close(self) -> None:
+        try:
+            self.client.quit()
+        except Exception:
+            self.client.close()
+
+
+def _is_connection_error(e: OSError) -> bool:
+    """
+    连接级别的错误，连接已不可用，需要重新连接
+    SMTPException也是OSError的子类，其中只有连接断开属于连接错误
+    """
+    return isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(
+        e, smtplib.SMTPException
+    )
+
+
+def _encode_address(addr: str) -> str:
+    """
+    将地址转换为SMTP命令可以使用的ASCII形式
+    域名按IDNA编码；本地部分含非ASCII字符时需要SMTPUTF8，不支持，直接拒绝
+
+    Args:
+        addr: 邮件地址
+
+    Returns:
+        ASCII形式的地址
+
+    Raises:
+        ValueError: 地址无法用ASCII表示
+    """
+    if addr.isascii():
+        return addr
+    local, sep, domain = addr.rpartition("@")
+    if not sep or not local.isascii():
+        raise ValueError(f"Cannot send to non-ASCII address without SMTPUTF8: {addr}")
+    try:
+        return f"{local}@{domain.encode('idna').decode('ascii')}"
+    except UnicodeError as e:
+        raise ValueError(f"Invalid domain in address {addr}: {e}") from e
+
+
+def _encode_addresses(email: OutgoingEmail) -> OutgoingEmail:
+    return replace(
+        email,
+        from_addr=_encode_address(email.from_addr),
+        to_addrs=[_encode_address(addr) for addr in email.to_addrs],
+    )
+
+
+def _encode_data(data: bytes) -> bytes:
+    """
+    按SMTP DATA的要求统一换行符、转义行首的点，并追加结束标记
+    """
+    data = _LEADING_DOTS.sub(b"..", _EOLS.sub(b"\r\n", data))
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+class SMTPTransport:
+    """
+    SMTP连接池
+    连接建立、TLS握手和认证后保持打开，多封邮件复用同一个会话；
+    服务器支持PIPELINING时，MAIL FROM、RCPT TO和DATA一次发出，
+    每封邮件只需要两次网络往返；连接断开时自动重连并重试当前邮件
+    """
+
+    def __init__(
+        self,
+        options: SMTPOptions | None = None,
+        *,
+        pool_size: int = 2,
+        max_messages_per_connection: int = 100,
+        idle_timeout: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            options: 连接参数，为None时每次建立连接都从配置读取
+            pool_size: 最多同时打开的连接数
+            max_messages_per_connection: 每个连接最多发送的邮件数，之后重新连接
+            idle_timeout: 连接空闲超过该时间后不再复用，避免被服务器超时断开
+        """
+        self.options = options
+        self.pool_size = pool_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self._idle: list[_Connection] = []
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._connections_opened = 0
+        self._messages_sent = 0
+        self._messages_failed = 0
+        self._reconnects = 0
+
+    def _connect(self) -> _Connection:
+        options = self.options or get_smtp_options()
+        with span("smtp.connect", f"{options.host}:{options.port}"):
+            return self._open(options)
+
+    def _open(self, options: SMTPOptions) -> _Connection:
+        client: smtplib.SMTP
+        if options.ssl:
+            client = smtplib.SMTP_SSL(
+                options.host,
+                options.port,
+                timeout=options.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            client = smtplib.SMTP(options.host, options.port, timeout=options.timeout)
+        try:
+            client.ehlo()
+            if options.tls:
+                client.starttls(context=ssl.create_default_context())
+                client.ehlo()
+            if options.user and options.password:
+                client.login(options.user, options.password)
+        except Exception:
+            client.close()
+            raise
+        with self._lock:
+            self._connections_opened += 1
+        return _Connection(client)
+
+    def _checkout(self) -> _Connection:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if now - conn.last_used < self.idle_timeout:
+                return conn
+            conn.close()
+
+    def _checkin(self, conn: _Connection) -> None:
+        if conn.messages >= self.max_messages_per_connection:
+            conn.close()
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    def _send_pipelined(self, client: smtplib.SMTP, email: OutgoingEmail) -> None:
+        # RFC 2920：DATA必须是一组命令中的最后一条
+        commands = [
+            f"MAIL FROM:<{email.from_addr}>",
+            *(f"RCPT TO:<{addr}>" for addr in email.to_addrs),
+            "DATA",
+        ]
+        client.send("".join(f"{command}\r\n" for command in commands))
+        mail_reply, *rcpt_replies, data_reply = [client.getreply() for _ in commands]
+        refused = {
+            addr: reply
+            for addr, reply in zip(email.to_addrs, rcpt_replies, strict=True)
+            if reply[0] not in (250, 251)
+        }
+        if data_reply[0] == 354 and (mail_reply[0] != 250 or refused):
+            # 服务器已经在等待正文，不能发送残缺的邮件，只能断开连接，
+            # 下一封邮件会因连接断开而重新连接
+            client.close()
+            raise smtplib.SMTPDataError(
+                554, b"Server accepted DATA after rejecting the envelope"
+            )
+        if mail_reply[0] != 250:
+            client.rset()
+            raise smtplib.SMTPSenderRefused(*mail_reply, email.from_addr)
+        if refused:
+            client.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if data_reply[0] != 354:
+            client.rset()
+            raise smtplib.SMTPDataError(*data_reply)
+        client.send(_encode_data(email.data))
+        code, message = client.getreply()
+        if code != 250:
+            client.rset()
+            raise smtplib.SMTPDataError(code, message)
+
+    def _send_one(self, conn: _Connection, email: OutgoingEmail) -> None:
+        if conn.pipelining:
+            self._send_pipelined(conn.client, email)
+        else:
+            conn.client.sendmail(email.from_addr, email.to_addrs, email.data)
+        conn.messages += 1
+
+    def send_many(self, emails: Sequence[OutgoingEmail]) -> list[Exception | None]:
+        """
+        在同一个连接上依次发送多封邮件
+
+        Args:
+            emails: 待发送的邮件
+
+        Returns:
+            与邮件一一对应的发送结果，成功为None，失败为异常；
+            被拒绝或发送出错的邮件不影响后续邮件
+        """
+        results: list[Exception | None] = []
+        with self._slots:
+            conn: _Connection | None = None
+            try:
+                for email in emails:
+                    error: Exception | None = None
+                    # 地址在发出任何命令之前检查，无效时不影响连接
+                    try:
+                        email = _encode_addresses(email)
+                    except ValueError as e:
+                        results.append(e)
+                        continue
+                    # 复用的连接可能已被服务器关闭，连接错误时重连并重试一次
+                    for attempt in range(2):
+                        try:
+                            if conn is None:
+                                conn = self._checkout()
+                            self._send_one(conn, email)
+                            error = None
+                            break
+                        except OSError as e:
+                            error = e
+                            if not _is_connection_error(e):
+                                break
+                            if conn is not None:
+                                conn.client.close()
+                                conn = None
+                                if attempt == 0:
+                                    with self._lock:
+                                        self._reconnects += 1
+                        except Exception as e:
+                            # 意外错误时会话可能停在事务中途，丢弃连接，
+                            # 下一封邮件重新连接
+                            error = e
+                            if conn is not None:
+                                conn.client.close()
+                                conn = None
+                            break
+                    results.append(error)
+            finally:
+                if conn is not None:
+                    self._checkin(conn)
+        failed = sum(result is not None for result in results)
+        with self._lock:
+            self._messages_sent += len(results) - failed
+            self._messages_failed += failed
+        return results
+
+    def send(self, email: OutgoingEmail) -> None:
+        """
+        发送一封邮件，失败时抛出异常
+
+        Args:
+            email: 待发送的邮件
+        """
+        (error,) = self.send_many([email])
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """
+        关闭所有空闲连接
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            包含已建立连接数、重连次数、发送成功和失败数的字典
+        """
+        with self._lock:
+            return {
+                "idle_connections": len(self._idle),
+                "connections_opened": self._connections_opened,
+                "reconnects": self._reconnects,
+                "messages_sent": self._messages_sent,
+                "messages_failed": self._messages_failed,
+            }
+
+
+def get_smtp_options() -> SMTPOptions:
+    """
+    从配置读取SMTP连接参数
+    """
+    assert settings.SMTP_HOST, "no provided configuration for email variables"
+    return SMTPOptions(
+        host=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        tls=settings.SMTP_TLS,
+        ssl=settings.SMTP_SSL and not settings.SMTP_TLS,
+        user=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+    )
+
+
+# 全局SMTP连接池
+smtp_transport = SMTPTransport(
+    pool_size=settings.SMTP_POOL_SIZE,
+    max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,145 @@
+import threading
+from pathlib import Path
+from typing import Any
+
+from jinja2 import (
+    BytecodeCache,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+    nodes,
+)
+from jinja2.visitor import NodeTransformer
+
+from app.core.config import settings
+
+EMAIL_TEMPLATES_DIR = Path(__file__).parent.parent / "email-templates" / "build"
+
+
+class _InlineStaticNames(NodeTransformer):
+    """
+    把模板中引用的静态变量替换为常量
+    编译时相邻的常量输出会合并成一个字符串，渲染时不再逐段拼接
+    """
+
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values = values
+
+    def visit_Name(self, node: nodes.Name) -> nodes.Node:
+        if node.ctx == "load" and node.name in self.values:
+            return nodes.Const.from_untrusted(
+                self.values[node.name],
+                lineno=node.lineno,
+                environment=node.environment,
+            )
+        return node
+
+
+class TemplateRegistry:
+    """
+    预编译的模板注册表
+    模板在启动时一次性编译并常驻内存；编译结果写入字节码缓存，
+    进程重启后不需要重新解析模板
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        bytecode_cache: BytecodeCache | None = None,
+        static_context: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Args:
+            directory: 模板目录
+            bytecode_cache: Jinja字节码缓存，为None时不缓存
+            static_context: 所有模板共用且运行期间不变的变量，
+                编译时直接写入模板，渲染时传入的同名变量会被忽略
+        """
+        self.environment = Environment(
+            loader=FileSystemLoader(directory),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+        )
+        self.static_context = static_context or {}
+        self._templates: dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """
+        编译目录下的所有模板
+        """
+        for name in self.environment.list_templates():
+            self._get(name)
+
+    def render(self, name: str, context: dict[str, Any]) -> str:
+        """
+        渲染模板
+
+        Args:
+            name: 模板文件名
+            context: 模板变量
+
+        Returns:
+            渲染结果
+        """
+        return self._get(name).render(context)
+
+    def _get(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self._compile(name)
+                    self._templates[name] = template
+        return template
+
+    def _compile(self, name: str) -> Template:
+        env = self.environment
+        if not self.static_context:
+            return env.get_template(name)
+
+        assert env.loader is not None
+        source, filename, _ = env.loader.get_source(env, name)
+        # 字节码缓存按源码校验，静态变量的值也要计入，否则修改配置后会读到旧结果
+        checksum_source = source + repr(sorted(self.static_context.items()))
+        cache = env.bytecode_cache
+        bucket = (
+            cache.get_bucket(env, name, filename, checksum_source) if cache else None
+        )
+        code = bucket.code if bucket else None
+        if code is None:
+            ast = _InlineStaticNames(self.static_context).visit(
+                env.parse(source, name, filename)
+            )
+            code = env.compile(ast, name, filename)
+            if cache and bucket:
+                bucket.code = code
+                cache.set_bucket(bucket)
+        return env.template_class.from_code(env, code, env.make_globals(None))
+
+
+def create_email_templates() -> TemplateRegistry:
+    """
+    根据配置创建邮件模板注册表
+    """
+    bytecode_cache = None
+    if settings.EMAIL_TEMPLATES_BYTECODE_CACHE:
+        # 目录为None时使用Jinja默认的临时目录
+        bytecode_cache = FileSystemBytecodeCache(
+            settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR
+        )
+    static_context = None
+    if settings.EMAIL_TEMPLATES_PRECOMPUTE_STATIC:
+        static_context = {"project_name": settings.PROJECT_NAME}
+    return TemplateRegistry(
+        EMAIL_TEMPLATES_DIR,
+        bytecode_cache=bytecode_cache,
+        static_context=static_context,
+    )
+
+
+# 全局邮件模板注册表，应用启动时预编译
+email_templates = create_email_templates()
@@ -0,0 +1,167 @@
+import functools
+import inspect
+import random
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime
+from typing import Any, ParamSpec, TypeVar, cast
+from urllib.parse import urlsplit
+
+import sentry_sdk
+
+from app.core.config import settings
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# 服务端错误对应的事务状态（5xx），这类请求始终保留
+SERVER_ERROR_STATUSES = frozenset(
+    {
+        "internal_error",
+        "unknown_error",
+        "unknown",
+        "unimplemented",
+        "unavailable",
+        "deadline_exceeded",
+        "data_loss",
+    }
+)
+
+# Sentry是否已初始化，未初始化时span和traced不产生任何开销
+_enabled = False
+
+
+def route_sample_rate(path: str) -> float:
+    """
+    获取请求路径的追踪采样率
+    按SENTRY_TRACES_ROUTE_SAMPLE_RATES中最长的匹配前缀取值，没有匹配时使用默认采样率
+
+    Args:
+        path: 请求路径
+
+    Returns:
+        采样率（0-1）
+    """
+    best = ""
+    rate = settings.SENTRY_TRACES_SAMPLE_RATE
+    for prefix, prefix_rate in settings.SENTRY_TRACES_ROUTE_SAMPLE_RATES.items():
+        if path.startswith(prefix) and len(prefix) > len(best):
+            best, rate = prefix, prefix_rate
+    return rate
+
+
+def traces_sampler(sampling_context: dict[str, Any]) -> float:
+    """
+    事务开始时的采样决定
+    上游已决定采样的请求沿用其决定；默认直接返回路由采样率；
+    启用慢请求保留时采样率不为0的请求都完整记录（开销等同采样率1.0），
+    结束后再由before_send_transaction决定是否上报
+    """
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    scope = sampling_context.get("asgi_scope") or {}
+    transaction = sampling_context.get("transaction_context") or {}
+    rate = route_sample_rate(scope.get("path") or transaction.get("name") or "")
+    if rate > 0 and settings.SENTRY_TRACES_KEEP_SLOW_SECONDS > 0:
+        return 1.0
+    return rate
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return float(value)
+
+
+def before_send_transaction(
+    event: dict[str, Any], _hint: dict[str, Any]
+) -> dict[str, Any] | None:
+    """
+    事务结束后的尾部采样，仅在启用慢请求保留时生效
+    5xx请求、耗时不少于SENTRY_TRACES_KEEP_SLOW_SECONDS的请求和属于上游追踪的请求
+    始终上报，其余请求按路由采样率上报
+    """
+    threshold = settings.SENTRY_TRACES_KEEP_SLOW_SECONDS
+    if threshold <= 0:
+        return event
+    trace = event.get("contexts", {}).get("trace", {})
+    if trace.get("status") in SERVER_ERROR_STATUSES or trace.get("parent_span_id"):
+        return event
+    try:
+        duration = _timestamp(event["timestamp"]) - _timestamp(event["start_timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return event
+    if duration >= threshold:
+        return event
+    url = (event.get("request") or {}).get("url") or ""
+    path = urlsplit(url).path or event.get("transaction") or ""
+    if random.random() < route_sample_rate(path):
+        return event
+    return None
+
+
+def init_sentry() -> None:
+    """
+    初始化Sentry错误追踪和性能追踪（仅在非本地环境且配置了DSN时）
+    """
+    global _enabled
+    if not settings.SENTRY_DSN or settings.ENVIRONMENT == "local":
+        return
+    sentry_sdk.init(
+        dsn=str(settings.SENTRY_DSN),
+        environment=settings.ENVIRONMENT,
+        traces_sampler=traces_sampler,
+        profiles_sample_rate=settings.SENTRY_PROFILES_SAMPLE_RATE,
+        # Sentry将事件声明为TypedDict，这里按普通字典处理
+        before_send_transaction=cast(Any, before_send_transaction),
+    )
+    _enabled = True
+
+
+def span(op: str, description: str | None = None) -> AbstractContextManager[Any]:
+    """
+    在当前事务中创建子span，Sentry未初始化时不做任何事
+
+    Args:
+        op: span类型，如db、password.hash
+        description: span描述
+
+    Returns:
+        上下文管理器
+    """
+    if not _enabled:
+        return nullcontext()
+    return sentry_sdk.start_span(op=op, description=description)
+
+
+def traced(op: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    用span包裹函数调用的装饰器，支持同步和异步函数，span描述为函数的限定名
+
+    Args:
+        op: span类型
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        description = f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                with span(op, description):
+                    return await func(*args, **kwargs)
+
+            return cast(Callable[P, R], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(op, description):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
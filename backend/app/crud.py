@@ -1,12 +1,33 @@
 import uuid
+from collections.abc import Collection
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import Delete, insert, text
+from sqlmodel import Session, SQLModel, col, delete, func, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.core.config import settings
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    principal_cache,
+    verify_password,
+    verify_password_async,
+)
+from app.core.tracing import traced
+from app.models import (
+    EmailOutbox,
+    Item,
+    ItemCreate,
+    Job,
+    User,
+    UserCreate,
+    UserUpdate,
+)
 
 
+@traced("db")
 def create_user(*, session: Session, user_create: UserCreate) -> User:
     """
     创建新用户
@@ -24,10 +45,10 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     )
     session.add(db_obj)
     session.commit()
-    session.refresh(db_obj)
     return db_obj
 
 
+@traced("db")
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     """
     更新用户信息
@@ -49,11 +70,14 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
+    user_id = db_user.id
     session.commit()
-    session.refresh(db_user)
+    # 用户的激活状态或权限可能已变化，使认证缓存失效
+    principal_cache.invalidate(user_id)
     return db_user
 
 
+@traced("db")
 def get_user_by_email(*, session: Session, email: str) -> User | None:
     """
     根据邮箱获取用户
@@ -70,6 +94,7 @@ def get_user_by_email(*, session: Session, email: str) -> User | None:
     return session_user
 
 
+@traced("db")
 def authenticate(*, session: Session, email: str, password: str) -> User | None:
     """
     用户身份验证
@@ -90,6 +115,7 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+@traced("db")
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
     """
     创建新项目
@@ -105,5 +131,468 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
-    session.refresh(db_item)
     return db_item
+
+
+def enqueue_email(
+    *,
+    session: Session | AsyncSession,
+    email_to: str,
+    subject: str,
+    html_content: str,
+) -> EmailOutbox:
+    """
+    写入一封待发送邮件，不提交
+    由调用方和业务修改一起提交，两者要么都生效要么都不生效
+
+    Args:
+        session: 数据库会话（同步或异步）
+        email_to: 收件人
+        subject: 主题
+        html_content: HTML正文
+
+    Returns:
+        待发送邮件对象
+    """
+    db_obj = EmailOutbox(email_to=email_to, subject=subject, html_content=html_content)
+    session.add(db_obj)
+    return db_obj
+
+
+@traced("db")
+def claim_outbox_emails(*, session: Session, limit: int) -> list[EmailOutbox]:
+    """
+    锁定一批到期的待发送邮件
+    使用FOR UPDATE SKIP LOCKED，多个worker同时运行时不会取到同一行；
+    行锁在调用方提交事务时释放
+
+    Args:
+        session: 数据库会话
+        limit: 最多取出的行数
+
+    Returns:
+        按到期时间排序的待发送邮件列表
+    """
+    statement = (
+        select(EmailOutbox)
+        .where(
+            EmailOutbox.status == "pending",
+            col(EmailOutbox.next_attempt_at) <= datetime.now(timezone.utc),
+        )
+        .order_by(col(EmailOutbox.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(session.exec(statement).all())
+
+
+def purge_items_statement(*, user_id: uuid.UUID, batch_size: int) -> Delete:
+    """
+    删除用户的一批项目
+    按owner_id选出一批ID再删除，每批都可以使用(owner_id, id)索引
+
+    Args:
+        user_id: 用户ID
+        batch_size: 每批删除的项目数
+
+    Returns:
+        DELETE语句
+    """
+    batch = select(Item.id).where(Item.owner_id == user_id).limit(batch_size)
+    return delete(Item).where(col(Item.id).in_(batch.scalar_subquery()))
+
+
+@traced("db")
+def purge_user(*, session: Session, user_id: uuid.UUID, batch_size: int) -> None:
+    """
+    分批删除用户及其项目
+    每批项目在单独的事务中删除并提交，避免一个大事务长时间持有锁
+
+    Args:
+        session: 数据库会话
+        user_id: 用户ID
+        batch_size: 每批删除的项目数
+    """
+    statement = purge_items_statement(user_id=user_id, batch_size=batch_size)
+    while True:
+        result = session.execute(statement)
+        session.commit()
+        if result.rowcount < batch_size:  # type: ignore[attr-defined]
+            break
+    session.execute(delete(User).where(col(User.id) == user_id))
+    session.commit()
+
+
+def enqueue_job(
+    *,
+    session: Session | AsyncSession,
+    name: str,
+    payload: dict[str, Any] | None = None,
+    priority: int = 0,
+    delay_seconds: float = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    写入一个后台任务，不提交
+    由调用方和业务修改一起提交，两者要么都生效要么都不生效
+
+    Args:
+        session: 数据库会话（同步或异步）
+        name: 任务名称
+        payload: 任务参数，必须能序列化为JSON
+        priority: 优先级，数值大的先执行
+        delay_seconds: 延迟执行的秒数
+        max_attempts: 最多执行次数，为None时使用配置的默认值
+
+    Returns:
+        任务对象
+    """
+    db_obj = Job(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        available_at=datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+    )
+    session.add(db_obj)
+    return db_obj
+
+
+@traced("db")
+def claim_jobs(
+    *,
+    session: Session,
+    limit: int,
+    visibility_timeout: float,
+    names: Collection[str] | None = None,
+) -> list[Job]:
+    """
+    领取一批可执行的任务并提交
+    使用FOR UPDATE SKIP LOCKED，多个worker同时领取时不会取到同一行；
+    领取后任务在visibility_timeout内对其他worker不可见，
+    worker崩溃或停止续约时，租约到期后任务会被重新领取
+
+    Args:
+        session: 数据库会话
+        limit: 最多领取的任务数
+        visibility_timeout: 租约时长（秒）
+        names: 只领取这些名称的任务，为None时不限
+
+    Returns:
+        按优先级和到期时间排序的任务列表，每个任务带有新的lease_id
+    """
+    now = datetime.now(timezone.utc)
+    statement = (
+        select(Job)
+        .where(
+            col(Job.status).in_(("queued", "running")),
+            col(Job.available_at) <= now,
+        )
+        .order_by(col(Job.priority).desc(), col(Job.available_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if names is not None:
+        statement = statement.where(col(Job.name).in_(names))
+    jobs = []
+    for job in session.exec(statement).all():
+        if job.status == "running" and job.attempts >= job.max_attempts:
+            # 租约到期且已用完执行次数，上一个worker很可能在执行中退出
+            job.status = "failed"
+            job.last_error = "Visibility timeout expired"
+            job.lease_id = None
+            job.finished_at = now
+        else:
+            job.status = "running"
+            job.attempts += 1
+            job.lease_id = uuid.uuid4()
+            job.started_at = now
+            job.available_at = now + timedelta(seconds=visibility_timeout)
+            jobs.append(job)
+        session.add(job)
+    session.commit()
+    return jobs
+
+
+@traced("db")
+def extend_job_leases(
+    *, session: Session, lease_ids: Collection[uuid.UUID], visibility_timeout: float
+) -> int:
+    """
+    为执行中的任务续约，长时间运行的任务不会因租约到期被重复执行
+
+    Args:
+        session: 数据库会话
+        lease_ids: 租约ID
+        visibility_timeout: 从现在起的租约时长（秒）
+
+    Returns:
+        续约成功的任务数
+    """
+    if not lease_ids:
+        return 0
+    statement = (
+        update(Job)
+        .where(col(Job.lease_id).in_(lease_ids), col(Job.status) == "running")
+        .values(
+            available_at=datetime.now(timezone.utc)
+            + timedelta(seconds=visibility_timeout)
+        )
+    )
+    result = session.execute(statement)
+    session.commit()
+    return int(result.rowcount)  # type: ignore[attr-defined]
+
+
+@traced("db")
+def finish_job(
+    *,
+    session: Session,
+    job: Job,
+    error: str | None = None,
+    retry_at: datetime | None = None,
+) -> bool:
+    """
+    记录任务的执行结果并提交
+    按lease_id条件更新，租约已到期并被其他worker重新领取时不覆盖其状态
+
+    Args:
+        session: 数据库会话
+        job: claim_jobs返回的任务
+        error: 失败原因，成功时为None
+        retry_at: 失败后重新排队的时间，为None时标记为最终失败
+
+    Returns:
+        是否仍持有租约并更新成功
+    """
+    now = datetime.now(timezone.utc)
+    values: dict[str, Any] = {"lease_id": None, "last_error": error}
+    if error is None:
+        values.update(status="succeeded", finished_at=now)
+    elif retry_at is not None:
+        values.update(status="queued", available_at=retry_at)
+    else:
+        values.update(status="failed", finished_at=now)
+    statement = (
+        update(Job)
+        .where(col(Job.id) == job.id, col(Job.lease_id) == job.lease_id)
+        .values(**values)
+    )
+    result = session.execute(statement)
+    session.commit()
+    return bool(result.rowcount)  # type: ignore[attr-defined]
+
+
+@traced("db")
+def get_job_queue_stats(*, session: Session) -> dict[str, Any]:
+    """
+    统计后台任务队列
+
+    Args:
+        session: 数据库会话
+
+    Returns:
+        各状态的任务数，以及最早一个到期未执行任务的等待秒数
+    """
+    now = datetime.now(timezone.utc)
+    counts = session.exec(
+        select(Job.status, func.count()).group_by(col(Job.status))
+    ).all()
+    oldest: datetime | None = session.exec(
+        select(func.min(Job.available_at)).where(
+            col(Job.status) == "queued", col(Job.available_at) <= now
+        )
+    ).one()
+    stats: dict[str, Any] = dict(counts)
+    if oldest is not None:
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        stats["oldest_queued_seconds"] = (now - oldest).total_seconds()
+    return stats
+
+
+# 异步版本，供使用AsyncSession的异步路由调用
+
+
+@traced("db")
+async def create_user_async(*, session: AsyncSession, user_create: UserCreate) -> User:
+    """
+    创建新用户（异步）
+
+    Args:
+        session: 异步数据库会话
+        user_create: 用户创建数据
+
+    Returns:
+        创建的用户对象
+    """
+    hashed_password = await get_password_hash_async(user_create.password)
+    db_obj = User.model_validate(
+        user_create, update={"hashed_password": hashed_password}
+    )
+    session.add(db_obj)
+    await session.commit()
+    return db_obj
+
+
+@traced("db")
+async def update_user_async(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate
+) -> Any:
+    """
+    更新用户信息（异步）
+
+    Args:
+        session: 异步数据库会话
+        db_user: 数据库中的用户对象
+        user_in: 更新的用户数据
+
+    Returns:
+        更新后的用户对象
+    """
+    user_data = user_in.model_dump(exclude_unset=True)
+    extra_data = {}
+    if "password" in user_data:
+        password = user_data["password"]
+        extra_data["hashed_password"] = await get_password_hash_async(password)
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    principal_cache.invalidate(db_user.id)
+    return db_user
+
+
+@traced("db")
+async def get_user_by_email_async(*, session: AsyncSession, email: str) -> User | None:
+    """
+    根据邮箱获取用户（异步）
+
+    Args:
+        session: 异步数据库会话
+        email: 用户邮箱
+
+    Returns:
+        用户对象，如果不存在则返回None
+    """
+    statement = select(User).where(User.email == email)
+    result = await session.exec(statement)
+    return result.first()
+
+
+@traced("db")
+async def authenticate_async(
+    *, session: AsyncSession, email: str, password: str
+) -> User | None:
+    """
+    用户身份验证（异步）
+
+    Args:
+        session: 异步数据库会话
+        email: 用户邮箱
+        password: 用户密码
+
+    Returns:
+        验证成功的用户对象，验证失败返回None
+    """
+    db_user = await get_user_by_email_async(session=session, email=email)
+    if not db_user:
+        return None
+    if not await verify_password_async(password, db_user.hashed_password):
+        return None
+    return db_user
+
+
+@traced("db")
+async def create_item_async(
+    *, session: AsyncSession, item_in: ItemCreate, owner_id: uuid.UUID
+) -> Item:
+    """
+    创建新项目（异步）
+
+    Args:
+        session: 异步数据库会话
+        item_in: 项目创建数据
+        owner_id: 所有者ID
+
+    Returns:
+        创建的项目对象
+    """
+    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
+    session.add(db_item)
+    await session.commit()
+    return db_item
+
+
+@traced("db")
+async def create_items_async(
+    *, session: AsyncSession, items_in: list[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    """
+    批量创建项目（异步）
+    使用一条多行INSERT ... RETURNING写入，所有行在同一个事务中提交
+
+    Args:
+        session: 异步数据库会话
+        items_in: 项目创建数据列表
+        owner_id: 所有者ID
+
+    Returns:
+        创建的项目对象列表，顺序与输入一致
+    """
+    rows = [
+        Item.model_validate(item_in, update={"owner_id": owner_id}).model_dump()
+        for item_in in items_in
+    ]
+    statement = insert(Item).returning(Item, sort_by_parameter_order=True)
+    items = list((await session.scalars(statement, rows)).all())
+    await session.commit()
+    return items
+
+
+@traced("db")
+async def count_rows_async(
+    *, session: AsyncSession, model: type[SQLModel]
+) -> tuple[int, bool]:
+    """
+    统计整表行数
+    先读取规划器统计信息（pg_class.reltuples），表较大时直接返回估算值，
+    避免对整表执行COUNT(*)；表较小或尚未ANALYZE时执行精确统计
+
+    Args:
+        session: 异步数据库会话
+        model: 数据库模型类
+
+    Returns:
+        (行数, 是否为估算值)
+    """
+    table = model.__table__  # type: ignore[attr-defined]
+    estimate = (
+        await session.execute(
+            text(
+                "SELECT CAST(reltuples AS bigint) FROM pg_class "
+                "WHERE oid = to_regclass(quote_ident(:table))"
+            ),
+            {"table": table.name},
+        )
+    ).scalar_one_or_none()
+    if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+        return estimate, True
+    count = (await session.exec(select(func.count()).select_from(table))).one()
+    return count, False
+
+
+@traced("db")
+async def get_item_count_async(*, session: AsyncSession, owner_id: uuid.UUID) -> int:
+    """
+    获取用户拥有的项目数
+    读取由触发器维护的计数列，是主键查询，不需要扫描项目表
+
+    Args:
+        session: 异步数据库会话
+        owner_id: 所有者ID
+
+    Returns:
+        项目数，用户不存在时返回0
+    """
+    statement = select(User.item_count).where(User.id == owner_id)
+    return (await session.exec(statement)).first() or 0
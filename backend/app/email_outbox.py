@@ -0,0 +1,151 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.smtp import smtp_transport
+from app.utils import EmailData, send_emails
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    """
+    邮件发件箱worker
+    分批取出到期的待发送邮件，通过SMTP连接池在同一个会话中依次发送；
+    发送失败按指数退避重试，达到最大次数后标记为failed
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = settings.EMAIL_OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS,
+        max_attempts: int = settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        retry_base_seconds: float = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """
+        计算第attempts次失败后的重试间隔
+
+        Args:
+            attempts: 已失败的次数，从1开始
+
+        Returns:
+            重试间隔
+        """
+        seconds = self.retry_base_seconds * 2 ** (attempts - 1)
+        return timedelta(seconds=min(seconds, self.retry_max_seconds))
+
+    def drain_once(self) -> int:
+        """
+        发送一批到期的邮件
+        发送期间持有这些行的行锁，其他worker会跳过它们；
+        发送成功或最终失败后清空正文，只保留投递记录
+
+        Returns:
+            本批处理的邮件数
+        """
+        with Session(engine, expire_on_commit=False) as session:
+            batch = crud.claim_outbox_emails(session=session, limit=self.batch_size)
+            if not batch:
+                return 0
+            messages = [
+                (
+                    email.email_to,
+                    EmailData(html_content=email.html_content, subject=email.subject),
+                )
+                for email in batch
+            ]
+            try:
+                results = send_emails(messages=messages)
+            except Exception as e:
+                # 整批失败时也要记录失败次数，否则这批邮件会无限重试
+                logger.exception("Failed to send email batch")
+                results = [e] * len(batch)
+            for email, error in zip(batch, results, strict=True):
+                email.attempts += 1
+                if error is None:
+                    email.status = "sent"
+                    email.sent_at = datetime.now(timezone.utc)
+                    email.last_error = None
+                    # 正文可能包含密码或重置令牌，不再需要后立即清除
+                    email.html_content = ""
+                else:
+                    email.last_error = str(error)
+                    if email.attempts >= self.max_attempts:
+                        email.status = "failed"
+                        email.html_content = ""
+                        logger.error(f"Giving up sending email {email.id}: {error}")
+                    else:
+                        delay = self.retry_delay(email.attempts)
+                        email.next_attempt_at = datetime.now(timezone.utc) + delay
+                        logger.warning(f"Failed to send email {email.id}: {error}")
+                session.add(email)
+            session.commit()
+        return len(batch)
+
+    def run(self) -> None:
+        """
+        持续发送邮件直到调用stop
+        一批取满时立即取下一批，否则等待poll_interval后再查询
+        """
+        logger.info("Email outbox worker started")
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception:
+                logger.exception("Email outbox worker failed")
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        smtp_transport.close()
+        logger.info("Email outbox worker stopped")
+
+    def start(self) -> None:
+        """
+        在后台线程中运行worker
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="email-outbox-worker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止worker并等待当前批次发送完成
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main() -> None:
+    if not settings.emails_enabled:
+        logger.error("Emails are not configured, nothing to send")
+        return
+    worker = EmailOutboxWorker()
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import logging
+import signal
+import threading
+import time
+import uuid
+from collections.abc import Collection
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.profiling import continuous_profiler
+from app.jobs import JobHandler, handlers
+from app.models import Job
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    后台任务worker
+    用FOR UPDATE SKIP LOCKED领取任务，在线程池中并发执行；
+    执行期间定期续约，失败按指数退避重新排队，达到最大次数后标记为failed
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        poll_interval: float = settings.JOB_POLL_INTERVAL_SECONDS,
+        visibility_timeout: float = settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+        retry_base_seconds: float = settings.JOB_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = settings.JOB_RETRY_MAX_SECONDS,
+        stats_interval: float = settings.JOB_STATS_LOG_INTERVAL_SECONDS,
+        names: Collection[str] | None = None,
+        job_handlers: dict[str, JobHandler] | None = None,
+    ) -> None:
+        """
+        Args:
+            concurrency: 同时执行的任务数
+            poll_interval: 没有可执行任务时的查询间隔（秒）
+            visibility_timeout: 租约时长（秒）
+            retry_base_seconds: 第一次失败后的重试间隔（秒）
+            retry_max_seconds: 重试间隔上限（秒）
+            stats_interval: 输出吞吐统计的间隔（秒），0表示不输出
+            names: 只执行这些名称的任务，为None时执行所有任务
+            job_handlers: 任务处理函数，为None时使用app.jobs中注册的函数
+        """
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.stats_interval = stats_interval
+        self.names = names
+        self.handlers = handlers if job_handlers is None else job_handlers
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._in_flight: dict[uuid.UUID, Job] = {}
+        self._started = time.monotonic()
+        self._claimed = 0
+        self._succeeded = 0
+        self._retried = 0
+        self._failed = 0
+        self._lost_leases = 0
+        self._durations: dict[str, tuple[int, float]] = {}
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """
+        计算第attempts次失败后的重试间隔
+
+        Args:
+            attempts: 已执行的次数，从1开始
+
+        Returns:
+            重试间隔
+        """
+        seconds = self.retry_base_seconds * 2 ** (attempts - 1)
+        return timedelta(seconds=min(seconds, self.retry_max_seconds))
+
+    def _claim(self, limit: int) -> list[Job]:
+        with Session(engine, expire_on_commit=False) as session:
+            jobs = crud.claim_jobs(
+                session=session,
+                limit=limit,
+                visibility_timeout=self.visibility_timeout,
+                names=self.names,
+            )
+        with self._lock:
+            self._claimed += len(jobs)
+            for job in jobs:
+                assert job.lease_id
+                self._in_flight[job.lease_id] = job
+        return jobs
+
+    def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job.name)
+        error: Exception | None = None
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job {job.name!r}")
+            handler(job.payload)
+        except Exception as e:
+            error = e
+        duration = time.perf_counter() - start
+
+        retry_at = None
+        if error is not None:
+            # 没有处理函数时重试也不会成功
+            if handler is not None and job.attempts < job.max_attempts:
+                retry_at = datetime.now(timezone.utc) + self.retry_delay(job.attempts)
+                logger.warning(f"Job {job.name} {job.id} failed, will retry: {error}")
+            else:
+                logger.error(f"Job {job.name} {job.id} failed: {error}")
+        try:
+            with Session(engine) as session:
+                kept_lease = crud.finish_job(
+                    session=session,
+                    job=job,
+                    error=None if error is None else str(error) or repr(error),
+                    retry_at=retry_at,
+                )
+        except Exception:
+            # 结果没有记录下来，租约到期后任务会被重新执行
+            logger.exception(f"Failed to record result of job {job.name} {job.id}")
+            kept_lease = False
+
+        with self._lock:
+            assert job.lease_id
+            self._in_flight.pop(job.lease_id, None)
+            count, total = self._durations.get(job.name, (0, 0.0))
+            self._durations[job.name] = (count + 1, total + duration)
+            if not kept_lease:
+                self._lost_leases += 1
+            elif error is None:
+                self._succeeded += 1
+            elif retry_at is not None:
+                self._retried += 1
+            else:
+                self._failed += 1
+
+    def _extend_leases(self) -> None:
+        with self._lock:
+            lease_ids = list(self._in_flight)
+        if not lease_ids:
+            return
+        try:
+            with Session(engine) as session:
+                crud.extend_job_leases(
+                    session=session,
+                    lease_ids=lease_ids,
+                    visibility_timeout=self.visibility_timeout,
+                )
+        except Exception:
+            logger.exception("Failed to extend job leases")
+
+    def drain_once(self) -> int:
+        """
+        在当前线程中领取并执行一批任务
+
+        Returns:
+            本批执行的任务数
+        """
+        jobs = self._claim(self.concurrency)
+        for job in jobs:
+            self._execute(job)
+        return len(jobs)
+
+    def run(self) -> None:
+        """
+        持续领取并执行任务直到调用stop
+        线程池有空闲时立即领取，否则等待任意任务结束；
+        停止时等待执行中的任务结束
+        """
+        logger.info(f"Job worker started with concurrency {self.concurrency}")
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="job")
+        futures: set[Future[None]] = set()
+        # 在租约到期前续约，留出两次续约失败的余量
+        heartbeat_interval = self.visibility_timeout / 3
+        last_heartbeat = last_stats = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                free = self.concurrency - len(futures)
+                jobs: list[Job] = []
+                if free > 0:
+                    try:
+                        jobs = self._claim(free)
+                    except Exception:
+                        logger.exception("Failed to claim jobs")
+                futures.update(executor.submit(self._execute, job) for job in jobs)
+
+                now = time.monotonic()
+                if now - last_heartbeat >= heartbeat_interval:
+                    self._extend_leases()
+                    last_heartbeat = now
+                if self.stats_interval and now - last_stats >= self.stats_interval:
+                    logger.info(f"Job worker stats: {self.stats()}")
+                    last_stats = now
+
+                if futures:
+                    # 线程池已满时等待任意任务结束，队列已空时最多等待poll_interval，
+                    # 都不超过续约间隔
+                    timeout = heartbeat_interval
+                    if len(jobs) < free:
+                        timeout = min(self.poll_interval, heartbeat_interval)
+                    _, pending = wait(
+                        futures, timeout=timeout, return_when=FIRST_COMPLETED
+                    )
+                    futures = set(pending)
+                elif len(jobs) < free:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            executor.shutdown(wait=True)
+        logger.info(f"Job worker stopped: {self.stats()}")
+
+    def start(self) -> None:
+        """
+        在后台线程中运行worker
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止worker并等待执行中的任务结束
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        获取worker统计信息
+
+        Returns:
+            包含领取、成功、重试、失败次数、吞吐量（每秒结束的任务数）
+            以及各任务平均耗时的字典
+        """
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            finished = self._succeeded + self._retried + self._failed
+            return {
+                "in_flight": len(self._in_flight),
+                "claimed": self._claimed,
+                "succeeded": self._succeeded,
+                "retried": self._retried,
+                "failed": self._failed,
+                "lost_leases": self._lost_leases,
+                "jobs_per_second": finished / uptime if uptime > 0 else 0.0,
+                "mean_ms": {
+                    name: total / count * 1000
+                    for name, (count, total) in self._durations.items()
+                },
+            }
+
+
+def main() -> None:
+    worker = JobWorker()
+    # 收到SIGTERM时不再领取新任务，等待执行中的任务结束后退出
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    if continuous_profiler is not None:
+        continuous_profiler.start()
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if continuous_profiler is not None:
+            continuous_profiler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session
+
+from app import crud
+from app.api import caching
+from app.core.config import settings
+from app.core.db import engine
+from app.utils import EmailData, send_emails
+
+JobHandler = Callable[[dict[str, Any]], None]
+
+# 任务名称到处理函数的映射，任务worker按名称查找
+handlers: dict[str, JobHandler] = {}
+
+PURGE_USER = "purge_user"
+SEND_EMAIL = "send_email"
+
+
+def job(name: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    注册任务处理函数
+    处理函数在worker线程中执行，接收任务参数；抛出异常表示失败，按退避间隔重试
+
+    Args:
+        name: 任务名称，与crud.enqueue_job的name一致
+    """
+
+    def decorator(func: JobHandler) -> JobHandler:
+        if name in handlers:
+            raise ValueError(f"Job handler {name!r} is already registered")
+        handlers[name] = func
+        return func
+
+    return decorator
+
+
+@job(PURGE_USER)
+def purge_user(payload: dict[str, Any]) -> None:
+    user_id = uuid.UUID(payload["user_id"])
+    with Session(engine) as session:
+        crud.purge_user(
+            session=session,
+            user_id=user_id,
+            batch_size=settings.USER_PURGE_BATCH_SIZE,
+        )
+    caching.invalidate_sync(caching.user_namespaces(user_id, deleted=True))
+
+
+@job(SEND_EMAIL)
+def send_email(payload: dict[str, Any]) -> None:
+    email_data = EmailData(
+        html_content=payload["html_content"], subject=payload["subject"]
+    )
+    (error,) = send_emails(messages=[(payload["email_to"], email_data)])
+    if error is not None:
+        raise error
@@ -1,35 +1,82 @@
-import sentry_sdk
-from fastapi import FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.deps import is_superuser_request
 from app.api.main import api_router
+from app.api.routes import metrics
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.db import async_engine
+from app.core.profiling import ProfilingMiddleware, continuous_profiler
+from app.core.prometheus import MetricsMiddleware, metrics_store
+from app.core.response_cache import response_cache
+from app.core.security import PasswordHashingBusyError, password_hasher
+from app.core.smtp import smtp_transport
+from app.core.templates import email_templates
+from app.core.tracing import init_sentry
+from app.email_outbox import EmailOutboxWorker
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     """
     自定义生成唯一ID函数
     用于OpenAPI文档中的操作ID
-    
+
     Args:
         route: API路由对象
-        
+
     Returns:
         唯一的操作ID
     """
     return f"{route.tags[0]}-{route.name}"
 
 
-# 初始化Sentry错误追踪（仅在非本地环境且配置了DSN时）
-if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
-    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """
+    应用生命周期
+    启动时预热密码哈希进程池、预编译邮件模板，并启动邮件发件箱worker、指标快照写入和持续剖析；
+    关闭时停止它们，并释放进程池、响应缓存、SMTP连接和异步连接池
+    """
+    password_hasher.start()
+    email_templates.load()
+    if continuous_profiler is not None:
+        continuous_profiler.start()
+    if metrics_store is not None:
+        metrics_store.start(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+    outbox_worker = None
+    if settings.emails_enabled and settings.EMAIL_OUTBOX_EMBEDDED_WORKER:
+        outbox_worker = EmailOutboxWorker()
+        outbox_worker.start()
+    yield
+    if outbox_worker is not None:
+        outbox_worker.stop()
+    if metrics_store is not None:
+        metrics_store.stop()
+    if continuous_profiler is not None:
+        continuous_profiler.stop()
+    password_hasher.shutdown()
+    smtp_transport.close()
+    if response_cache is not None:
+        await response_cache.close()
+    # 异步连接绑定在当前事件循环上，关闭时必须释放
+    await async_engine.dispose()
+
+
+# 初始化Sentry错误追踪和按路由采样的性能追踪
+init_sentry()
 
 # 创建FastAPI应用实例
 app = FastAPI(
     title=settings.PROJECT_NAME,  # 应用标题
     openapi_url=f"{settings.API_V1_STR}/openapi.json",  # OpenAPI文档URL
     generate_unique_id_function=custom_generate_unique_id,  # 自定义ID生成函数
+    lifespan=lifespan,  # 应用生命周期
 )
 
 # 配置CORS中间件
@@ -42,5 +89,45 @@ if settings.all_cors_origins:
         allow_headers=["*"],  # 允许所有请求头
     )
 
+# 配置响应压缩中间件，OpenAPI文档只压缩一次并缓存
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels={
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_LEVEL,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        },
+        static_paths=[f"{settings.API_V1_STR}/openapi.json"],
+    )
+
+# 配置按需剖析中间件，剖析范围包含路由、序列化和响应压缩
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, authorize=is_superuser_request)
+
+# 配置请求指标中间件，最后添加的中间件最先执行，耗时包含压缩等其他中间件
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, generate_unique_id=custom_generate_unique_id)
+
+
+@app.exception_handler(PasswordHashingBusyError)
+async def password_hashing_busy_handler(
+    _request: Request, _exc: PasswordHashingBusyError
+) -> JSONResponse:
+    """
+    密码哈希队列已满时快速返回503，提示客户端稍后重试
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # 包含API路由器
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+# /metrics不加API前缀，便于Prometheus按惯例抓取
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
@@ -1,7 +1,10 @@
 import uuid
+from datetime import datetime, timezone
+from typing import Any
 
 from pydantic import EmailStr
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import JSON, Column, DateTime, Text, text
+from sqlmodel import Field, Index, Relationship, SQLModel
 
 
 # 用户相关模型
@@ -52,7 +55,12 @@ class User(UserBase, table=True):
     """用户数据库模型"""
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)  # 用户ID，主键
     hashed_password: str  # 哈希密码
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)  # 用户拥有的项目，级联删除
+    # 用户拥有的项目数，由数据库触发器在项目增删时维护
+    item_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # 用户拥有的项目，由数据库外键级联删除，删除用户时不加载项目
+    items: list["Item"] = Relationship(
+        back_populates="owner", cascade_delete=True, passive_deletes=True
+    )
 
 
 # 通过API返回的属性，id始终必需
@@ -64,7 +72,9 @@ class UserPublic(UserBase):
 class UsersPublic(SQLModel):
     """用户列表公开信息模型"""
     data: list[UserPublic]  # 用户列表
-    count: int  # 用户总数
+    count: int | None = None  # 用户总数，未请求总数时为None
+    count_estimated: bool = False  # 总数是否为根据统计信息得到的估算值
+    next_cursor: str | None = None  # 下一页游标，没有更多数据时为None
 
 
 # 项目相关模型
@@ -91,6 +101,9 @@ class ItemUpdate(ItemBase):
 # 数据库模型，数据库表名从类名推断
 class Item(ItemBase, table=True):
     """项目数据库模型"""
+    # 按所有者过滤并按ID排序分页，同时服务于级联删除时的外键查找
+    __table_args__ = (Index("ix_item_owner_id_id", "owner_id", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)  # 项目ID，主键
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
@@ -108,7 +121,111 @@ class ItemPublic(ItemBase):
 class ItemsPublic(SQLModel):
     """项目列表公开信息模型"""
     data: list[ItemPublic]  # 项目列表
-    count: int  # 项目总数
+    count: int | None = None  # 项目总数，未请求总数时为None
+    count_estimated: bool = False  # 总数是否为根据统计信息得到的估算值
+    next_cursor: str | None = None  # 下一页游标，没有更多数据时为None
+
+
+# 批量更新项目时接收的属性
+class ItemBulkUpdate(ItemUpdate):
+    """项目批量更新模型，每一行需要指定项目ID"""
+    id: uuid.UUID  # 项目ID
+
+
+class ItemBulkResult(SQLModel):
+    """批量操作中单行的处理结果"""
+    id: uuid.UUID  # 项目ID
+    status: int  # 处理结果，与单个接口的HTTP状态码一致
+    detail: str | None = None  # 失败原因
+    item: ItemPublic | None = None  # 写入后的项目，删除或失败时为None
+
+
+class ItemBulkResults(SQLModel):
+    """批量操作结果，与请求中的行一一对应"""
+    data: list[ItemBulkResult]  # 每一行的处理结果
+
+
+# 邮件发件箱相关模型
+
+class EmailOutbox(SQLModel, table=True):
+    """待发送邮件，与触发它的业务修改在同一事务中写入，由后台worker发送"""
+    __tablename__ = "email_outbox"
+    # 只索引待发送的行，worker按到期时间取出，已发送的历史行不影响索引大小
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)  # 邮件ID，主键
+    email_to: str = Field(max_length=255)  # 收件人
+    subject: str = Field(max_length=1024)  # 主题
+    html_content: str = Field(sa_type=Text)  # HTML正文
+    status: str = Field(default="pending", max_length=16)  # pending、sent或failed
+    attempts: int = 0  # 已尝试发送的次数
+    last_error: str | None = Field(default=None, sa_type=Text)  # 最近一次发送失败的原因
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )  # 写入时间
+    next_attempt_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )  # 下一次可以尝试发送的时间
+    sent_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )  # 发送成功的时间
+
+
+# 后台任务相关模型
+
+class Job(SQLModel, table=True):
+    """后台任务，由任务worker从数据库中领取并执行"""
+    __tablename__ = "job"
+    # 只索引排队中和执行中的行，与领取任务时的排序一致
+    __table_args__ = (
+        Index(
+            "ix_job_available",
+            text("priority DESC"),
+            "available_at",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)  # 任务ID，主键
+    name: str = Field(max_length=255)  # 任务名称，对应注册的处理函数
+    payload: dict[str, Any] = Field(default_factory=dict, sa_type=JSON)  # 任务参数
+    priority: int = 0  # 优先级，数值大的先执行
+    status: str = Field(default="queued", max_length=16)  # queued、running等状态
+    attempts: int = 0  # 已领取执行的次数
+    max_attempts: int = 5  # 最多执行的次数，超过后标记为failed
+    last_error: str | None = Field(default=None, sa_type=Text)  # 最近一次执行失败的原因
+    lease_id: uuid.UUID | None = None  # 当前租约ID，每次领取时重新生成
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )  # 写入时间
+    available_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )  # 排队中为可以执行的时间，执行中为租约到期时间，到期后可被重新领取
+    started_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )  # 最近一次开始执行的时间
+    finished_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )  # 执行结束（成功或最终失败）的时间
+
+
+class JobQueueStats(SQLModel):
+    """后台任务队列统计模型"""
+    queued: int = 0  # 排队中的任务数
+    running: int = 0  # 执行中的任务数
+    succeeded: int = 0  # 执行成功的任务数
+    failed: int = 0  # 最终失败的任务数
+    oldest_queued_seconds: float | None = None  # 最早一个到期未执行任务的等待时间
 
 
 # 通用消息模型
@@ -134,3 +251,76 @@ class NewPassword(SQLModel):
     """新密码模型"""
     token: str  # 重置令牌
     new_password: str = Field(min_length=8, max_length=40)  # 新密码
+
+
+# 运行时统计相关模型
+
+class HistogramSnapshot(SQLModel):
+    """直方图快照模型"""
+    count: int  # 观测次数
+    sum: float  # 观测值总和
+    buckets: dict[str, int]  # 累计分桶计数，键为上界
+
+
+class PasswordHashingStats(SQLModel):
+    """密码哈希执行器统计模型"""
+    workers: int  # 进程池大小
+    queue_size: int  # 排队上限
+    in_flight: int  # 当前正在执行或排队的任务数
+    rejected: int  # 因队列已满被拒绝的任务数
+    queue_wait_seconds: HistogramSnapshot  # 排队等待时间
+    hash_seconds: HistogramSnapshot  # 哈希计算耗时
+
+
+
+class CacheStats(SQLModel):
+    """缓存统计模型"""
+    size: int  # 当前条目数
+    maxsize: int  # 最大条目数
+    ttl_seconds: float  # 条目存活时间
+    hits: int  # 命中次数
+    misses: int  # 未命中次数
+    evictions: int  # 淘汰次数
+
+
+class ResponseCacheStats(SQLModel):
+    """响应缓存统计模型"""
+    backend: str  # 缓存后端，未启用时为disabled
+    hits: int = 0  # 新鲜命中次数
+    stale_hits: int = 0  # 返回旧值并后台刷新的次数
+    misses: int = 0  # 未命中次数
+    refreshes: int = 0  # 后台刷新成功次数
+    errors: int = 0  # 后端出错次数
+    hit_ratio: float = 0.0  # 命中率（包含过期命中）
+
+
+class DBPoolStats(SQLModel):
+    """数据库连接池统计模型"""
+    name: str  # 引擎名称（sync或async）
+    size: int  # 连接池大小
+    max_overflow: int  # 最大溢出连接数
+    checked_out: int  # 已检出的连接数
+    idle: int  # 空闲连接数
+    overflow: int  # 当前溢出连接数
+    checkout_timeouts: int  # 检出超时次数
+    checkout_wait_seconds: HistogramSnapshot  # 检出等待时间
+
+
+class ProfilingTargetCreate(SQLModel):
+    """剖析目标设置模型"""
+    path_prefix: str = Field(min_length=1, max_length=255)  # 请求路径前缀
+    expires_in_seconds: int = Field(default=600, ge=1, le=86400)  # 有效时间（秒）
+
+
+class ProfilingTarget(SQLModel):
+    """剖析目标模型"""
+    path_prefix: str  # 请求路径前缀
+    expires_at: datetime  # 过期时间
+
+
+class ProfileInfo(SQLModel):
+    """剖析结果信息模型"""
+    id: str  # 剖析结果ID
+    name: str  # 请求方法、路径、状态码和耗时
+    created_at: datetime  # 保存时间
+    size_bytes: int  # 文件大小
@@ -1,10 +1,19 @@
+import csv
+import io
+import json
 import uuid
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 from sqlmodel import Session
 
+from app.api import caching
+from app.api.routes import utils as utils_routes
 from app.core.config import settings
+from app.core.response_cache import MemoryBackend, ResponseCache
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import count_queries
 
 
 def test_create_item(
@@ -79,6 +88,128 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_with_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    for _ in range(3):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": "Foo"},
+        )
+        assert response.status_code == 200
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        seen.extend(item["id"] for item in content["data"])
+        cursor = content["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen)
+    assert len(seen) == content["count"]
+
+
+def test_read_items_limit_too_large(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"limit": settings.MAX_PAGE_SIZE + 1},
+    )
+    assert response.status_code == 422
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_cursor_with_skip(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    cursor = response.json()["next_cursor"]
+    assert cursor
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": cursor, "skip": 1},
+    )
+    assert response.status_code == 400
+
+
+def test_read_items_count_follows_create_and_delete(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    before = client.get(url, headers=normal_user_token_headers).json()["count"]
+    response = client.post(
+        url, headers=normal_user_token_headers, json={"title": "Counted"}
+    )
+    item_id = response.json()["id"]
+    content = client.get(url, headers=normal_user_token_headers).json()
+    assert content["count"] == before + 1
+    assert content["count_estimated"] is False
+
+    client.delete(f"{url}{item_id}", headers=normal_user_token_headers)
+    content = client.get(url, headers=normal_user_token_headers).json()
+    assert content["count"] == before
+
+
+def test_read_items_without_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"include_count": False},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] is None
+
+
+def test_read_items_estimated_count(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    create_random_item(db)
+    db.execute(text("ANALYZE item"))
+    monkeypatch.setattr(settings, "COUNT_ESTIMATE_THRESHOLD", 0)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count_estimated"] is True
+    assert content["count"] >= 0
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +293,315 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_create_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = [{"title": f"Bulk {i}", "description": "Fighters"} for i in range(3)]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [r["status"] for r in results] == [200, 200, 200]
+    assert [r["item"]["title"] for r in results] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    assert all(r["id"] == r["item"]["id"] for r in results)
+
+
+def test_create_items_bulk_validates_all_rows(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Fine"}, {"title": ""}],
+    )
+    assert response.status_code == 422
+
+
+def test_update_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Mine"}],
+    )
+    own_id = response.json()["data"][0]["id"]
+    other_id = str(create_random_item(db).id)
+    missing_id = str(uuid.uuid4())
+
+    response = client.put(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[
+            {"id": own_id, "title": "Updated"},
+            {"id": other_id, "title": "Stolen"},
+            {"id": missing_id, "title": "Nothing"},
+        ],
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [r["status"] for r in results] == [200, 400, 404]
+    assert results[0]["item"]["title"] == "Updated"
+    assert results[1]["detail"] == "Not enough permissions"
+    assert results[2]["detail"] == "Item not found"
+
+
+def test_delete_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Gone"}],
+    )
+    own_id = response.json()["data"][0]["id"]
+    other_id = str(create_random_item(db).id)
+    missing_id = str(uuid.uuid4())
+
+    response = client.request(
+        "DELETE",
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[own_id, other_id, missing_id, own_id],
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [r["status"] for r in results] == [200, 400, 404, 400]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{own_id}", headers=normal_user_token_headers
+    )
+    assert response.status_code == 404
+
+
+def test_bulk_size_limit(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "x"}] * (settings.MAX_BULK_SIZE + 1),
+    )
+    assert response.status_code == 422
+
+
+def test_export_items_ndjson(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Export 1"}, {"title": "Export 2"}],
+    )
+    listed = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"limit": settings.MAX_PAGE_SIZE},
+    ).json()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export", headers=normal_user_token_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [item["id"] for item in listed["data"]]
+    assert len(rows) == listed["count"]
+
+
+def test_export_items_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=superuser_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    exported = {row["id"]: row for row in rows}
+    assert exported[str(item.id)]["title"] == item.title
+    assert exported[str(item.id)]["owner_id"] == str(item.owner_id)
+
+
+def test_create_item_issues_single_statement(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # Warm the principal cache so only the write itself is counted
+    client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"include_count": False, "limit": 1},
+    )
+    with count_queries() as statements:
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": "Foo"},
+        )
+    assert response.status_code == 200
+    assert statements == ["INSERT"]
+
+
+def test_update_and_delete_item_issue_single_statement(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Foo"},
+    )
+    item_id = response.json()["id"]
+
+    with count_queries() as statements:
+        response = client.put(
+            f"{settings.API_V1_STR}/items/{item_id}",
+            headers=normal_user_token_headers,
+            json={"title": "Updated"},
+        )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Updated"
+    assert statements == ["UPDATE"]
+
+    with count_queries() as statements:
+        response = client.delete(
+            f"{settings.API_V1_STR}/items/{item_id}",
+            headers=normal_user_token_headers,
+        )
+    assert response.status_code == 200
+    assert statements == ["DELETE"]
+
+
+def test_read_items_fast_json_response(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    default = client.get(url, headers=normal_user_token_headers)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get(url, headers=normal_user_token_headers)
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == default.json()
+
+
+def test_read_items_with_fields(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Sparse", "description": "Not returned"},
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"fields": "id,title"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["data"]
+    assert all(set(item) == {"id", "title"} for item in content["data"])
+    assert "count" in content
+
+
+def test_read_items_with_invalid_fields(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"fields": "title,secret"},
+    )
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+
+
+def test_read_item_with_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item.id}",
+        headers=superuser_token_headers,
+        params={"fields": "title"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"title": item.title}
+
+
+@pytest.fixture
+def memory_response_cache(monkeypatch: pytest.MonkeyPatch) -> ResponseCache:
+    cache = ResponseCache(MemoryBackend(maxsize=100, ttl=60), ttl=30, stale_ttl=30)
+    monkeypatch.setattr(caching, "response_cache", cache)
+    monkeypatch.setattr(utils_routes, "response_cache", cache)
+    return cache
+
+
+def test_read_items_cached_until_mutation(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    memory_response_cache: ResponseCache,
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    first = client.get(url, headers=normal_user_token_headers).json()
+    with count_queries() as statements:
+        second = client.get(url, headers=normal_user_token_headers).json()
+    assert second == first
+    assert statements == []
+
+    response = client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+    item_id = response.json()["id"]
+    after_create = client.get(url, headers=normal_user_token_headers).json()
+    assert after_create["count"] == first["count"] + 1
+
+    detail_url = f"{settings.API_V1_STR}/items/{item_id}"
+    assert (
+        client.get(detail_url, headers=normal_user_token_headers).json()["title"] == "A"
+    )
+    client.put(detail_url, headers=normal_user_token_headers, json={"title": "B"})
+    assert (
+        client.get(detail_url, headers=normal_user_token_headers).json()["title"] == "B"
+    )
+
+    client.delete(detail_url, headers=normal_user_token_headers)
+    assert client.get(detail_url, headers=normal_user_token_headers).status_code == 404
+    after_delete = client.get(url, headers=normal_user_token_headers).json()
+    assert after_delete["count"] == first["count"]
+
+    stats = memory_response_cache.stats()
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
+
+
+@pytest.mark.usefixtures("memory_response_cache")
+def test_read_items_cache_scoped_per_user(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        json={"title": "Superuser item"},
+    )
+    item_id = response.json()["id"]
+    url = f"{settings.API_V1_STR}/items/{item_id}"
+    assert client.get(url, headers=superuser_token_headers).status_code == 200
+    assert client.get(url, headers=normal_user_token_headers).status_code == 400
+
+    response = client.get(
+        f"{settings.API_V1_STR}/utils/response-cache-stats/",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["backend"] == "MemoryBackend"
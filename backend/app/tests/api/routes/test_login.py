@@ -1,12 +1,17 @@
+from collections.abc import Callable
+from typing import Any
 from unittest.mock import patch
 
+import anyio.to_thread
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 
+from app.api.routes.login import login_access_token
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import password_hasher, verify_password
 from app.crud import create_user
-from app.models import UserCreate
+from app.models import EmailOutbox, UserCreate
 from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 from app.utils import generate_password_reset_token
@@ -24,6 +29,30 @@ def test_get_access_token(client: TestClient) -> None:
     assert tokens["access_token"]
 
 
+def test_login_does_not_hold_threadpool_slot(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    in_threadpool: list[Any] = []
+    run_sync = anyio.to_thread.run_sync
+
+    async def record(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        in_threadpool.append(getattr(func, "func", func))
+        return await run_sync(func, *args, **kwargs)
+
+    def blocking_run(*_args: Any) -> None:
+        raise AssertionError("password verified on a blocking call")
+
+    monkeypatch.setattr(anyio.to_thread, "run_sync", record)
+    monkeypatch.setattr(password_hasher, "run", blocking_run)
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 200
+    assert login_access_token not in in_threadpool
+
+
 def test_get_access_token_incorrect_password(client: TestClient) -> None:
     login_data = {
         "username": settings.FIRST_SUPERUSER,
@@ -46,7 +75,7 @@ def test_use_access_token(
 
 
 def test_recovery_password(
-    client: TestClient, normal_user_token_headers: dict[str, str]
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
     with (
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
@@ -59,6 +88,11 @@ def test_recovery_password(
         )
         assert r.status_code == 200
         assert r.json() == {"message": "Password recovery email sent"}
+        outbox = db.exec(
+            select(EmailOutbox).where(EmailOutbox.email_to == email)
+        ).first()
+        assert outbox
+        assert outbox.status == "pending"
 
 
 def test_recovery_password_user_not_exits(
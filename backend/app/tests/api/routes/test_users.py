@@ -1,14 +1,19 @@
 import uuid
 from unittest.mock import patch
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
-from app import crud
+from app import crud, jobs
+from app.api import caching
 from app.core.config import settings
+from app.core.response_cache import MemoryBackend, ResponseCache
 from app.core.security import verify_password
-from app.models import User, UserCreate
-from app.tests.utils.utils import random_email, random_lower_string
+from app.job_worker import JobWorker
+from app.models import EmailOutbox, Item, ItemCreate, Job, User, UserCreate
+from app.tests.utils.user import create_random_user, user_authentication_headers
+from app.tests.utils.utils import count_queries, random_email, random_lower_string
 
 
 def test_get_users_superuser_me(
@@ -37,9 +42,9 @@ def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
     with (
-        patch("app.utils.send_email", return_value=None),
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
         patch("app.core.config.settings.SMTP_USER", "admin@example.com"),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "info@example.com"),
     ):
         username = random_email()
         password = random_lower_string()
@@ -54,6 +59,12 @@ def test_create_user_new_email(
         user = crud.get_user_by_email(session=db, email=username)
         assert user
         assert user.email == created_user["email"]
+        outbox = db.exec(
+            select(EmailOutbox).where(EmailOutbox.email_to == username)
+        ).first()
+        assert outbox
+        assert outbox.status == "pending"
+        assert password in outbox.html_content
 
 
 def test_get_existing_user(
@@ -113,6 +124,20 @@ def test_get_existing_user_permissions_error(
     assert r.json() == {"detail": "The user doesn't have enough privileges"}
 
 
+def test_get_user_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    user_id = uuid.uuid4()
+    for params in ({}, {"fields": "id,email"}):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert r.status_code == 404
+        assert r.json() == {"detail": "User not found"}
+
+
 def test_create_user_existing_username(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -168,6 +193,40 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_with_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    first_page = r.json()
+    assert len(first_page["data"]) == 1
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+    )
+    assert r.status_code == 200
+    second_page = r.json()
+    assert len(second_page["data"]) == 1
+    assert second_page["data"][0]["id"] > first_page["data"][0]["id"]
+
+
+def test_retrieve_users_limit_too_large(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": settings.MAX_PAGE_SIZE + 1},
+    )
+    assert r.status_code == 422
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -191,6 +250,21 @@ def test_update_user_me(
     assert user_db.full_name == full_name
 
 
+def test_update_user_me_issues_single_statement(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    with count_queries() as statements:
+        r = client.patch(
+            f"{settings.API_V1_STR}/users/me",
+            headers=normal_user_token_headers,
+            json={"full_name": "Single Statement"},
+        )
+    assert r.status_code == 200
+    assert r.json()["full_name"] == "Single Statement"
+    assert statements == ["UPDATE"]
+
+
 def test_update_password_me(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -444,6 +518,54 @@ def test_delete_user_super_user(
     assert result is None
 
 
+def test_delete_user_cascades_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    for _ in range(2):
+        crud.create_item(session=db, item_in=ItemCreate(title="Foo"), owner_id=user.id)
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["message"] == "User deleted successfully"
+    assert db.exec(select(Item).where(Item.owner_id == user.id)).first() is None
+
+
+def test_delete_user_purges_large_owner_in_background(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "USER_BACKGROUND_PURGE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "USER_PURGE_BATCH_SIZE", 2)
+    user = create_random_user(db)
+    user_id = user.id
+    for _ in range(5):
+        crud.create_item(session=db, item_in=ItemCreate(title="Foo"), owner_id=user_id)
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 202
+    assert r.json()["message"] == "User deactivated, deletion pending"
+    db.expire_all()
+    user_db = db.get(User, user_id)
+    assert user_db
+    assert not user_db.is_active
+    job = db.exec(select(Job).where(Job.name == jobs.PURGE_USER)).one()
+    assert job.payload == {"user_id": str(user_id)}
+
+    assert JobWorker().drain_once() == 1
+    db.expire_all()
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).first() is None
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    db.refresh(job)
+    assert job.status == "succeeded"
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -484,3 +606,101 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_deactivated_user_token_is_rejected(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+
+    # Warm up the principal cache for this user
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
+def test_retrieve_users_fast_json_response(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = f"{settings.API_V1_STR}/users/"
+    default = client.get(url, headers=superuser_token_headers)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get(url, headers=superuser_token_headers)
+    assert fast.status_code == 200
+    assert fast.json() == default.json()
+
+
+def test_retrieve_users_with_fields(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"fields": "id,email"},
+    )
+    assert r.status_code == 200
+    assert all(set(user) == {"id", "email"} for user in r.json()["data"])
+
+
+def test_retrieve_users_private_field_rejected(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"fields": "email,hashed_password"},
+    )
+    assert r.status_code == 400
+
+
+def test_read_users_cache_invalidated_by_user_mutations(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = ResponseCache(MemoryBackend(maxsize=100, ttl=60), ttl=30, stale_ttl=30)
+    monkeypatch.setattr(caching, "response_cache", cache)
+    url = f"{settings.API_V1_STR}/users/"
+    before = client.get(url, headers=superuser_token_headers).json()
+
+    email = random_email()
+    r = client.post(
+        url,
+        headers=superuser_token_headers,
+        json={"email": email, "password": random_lower_string()},
+    )
+    user_id = r.json()["id"]
+    after = client.get(url, headers=superuser_token_headers).json()
+    assert after["count"] == before["count"] + 1
+
+    user_url = f"{settings.API_V1_STR}/users/{user_id}"
+    assert (
+        client.get(user_url, headers=superuser_token_headers).json()["full_name"]
+        is None
+    )
+    client.patch(user_url, headers=superuser_token_headers, json={"full_name": "New"})
+    r = client.get(user_url, headers=superuser_token_headers)
+    assert r.json()["full_name"] == "New"
+
+    client.delete(user_url, headers=superuser_token_headers)
+    r = client.get(user_url, headers=superuser_token_headers)
+    assert r.status_code == 404
+    assert cache.stats()["misses"] >= 4
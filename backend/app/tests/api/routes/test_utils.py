@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app import crud
+from app.core.config import settings
+from app.models import Job
+
+
+def test_health_check(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() is True
+
+
+def test_password_hashing_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/password-hashing-stats/",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["workers"] == settings.PASSWORD_HASH_WORKERS
+    assert stats["hash_seconds"]["count"] >= 1
+
+
+def test_principal_cache_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/principal-cache-stats/",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["hits"] + stats["misses"] >= 1
+
+
+def test_db_pool_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool-stats/",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    stats = {pool["name"]: pool for pool in r.json()}
+    assert set(stats) == {"sync", "async"}
+    assert stats["async"]["size"] == settings.DB_POOL_SIZE
+    assert stats["async"]["checkout_wait_seconds"]["count"] >= 1
+
+
+def test_job_queue_stats(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    db.execute(delete(Job))
+    crud.enqueue_job(session=db, name="noop")
+    crud.enqueue_job(session=db, name="noop", delay_seconds=60)
+    db.commit()
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/job-queue-stats/",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["queued"] == 2
+    assert stats["running"] == 0
+    assert stats["oldest_queued_seconds"] >= 0
+    db.execute(delete(Job))
+    db.commit()
+
+
+def test_stats_require_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    for path in (
+        "password-hashing-stats/",
+        "principal-cache-stats/",
+        "db-pool-stats/",
+        "job-queue-stats/",
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/utils/{path}", headers=normal_user_token_headers
+        )
+        assert r.status_code == 403
@@ -0,0 +1,47 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_hit_and_miss() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_ttl_cache_expires_entries() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_invalidate() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_disabled() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
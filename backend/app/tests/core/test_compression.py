@@ -0,0 +1,141 @@
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.middleware.cors import CORSMiddleware
+
+from app.core.compression import CompressionMiddleware, compress, select_encoding
+
+BODY = "x" * 4096
+
+
+def _client() -> tuple[TestClient, dict[str, int]]:
+    calls = {"static": 0}
+    app = FastAPI()
+
+    @app.get("/small")
+    def small() -> PlainTextResponse:
+        return PlainTextResponse("tiny")
+
+    @app.get("/large")
+    def large() -> PlainTextResponse:
+        return PlainTextResponse(BODY)
+
+    @app.get("/stream")
+    def stream() -> StreamingResponse:
+        async def chunks() -> AsyncIterator[str]:
+            for _ in range(4):
+                yield "y" * 10
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/static")
+    def static() -> PlainTextResponse:
+        calls["static"] += 1
+        return PlainTextResponse(BODY)
+
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=1024, static_paths=["/static"]
+    )
+    return TestClient(app), calls
+
+
+def test_select_encoding() -> None:
+    available = ["zstd", "br", "gzip"]
+    assert select_encoding("gzip, br", available) == "br"
+    assert select_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert select_encoding("br;q=0, gzip", available) == "gzip"
+    assert select_encoding("*", available) == "zstd"
+    assert select_encoding("identity", available) is None
+    assert select_encoding("", available) is None
+
+
+def test_small_response_not_compressed() -> None:
+    client, _ = _client()
+    r = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.text == "tiny"
+
+
+def test_large_response_gzip() -> None:
+    client, _ = _client()
+    r = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(BODY)
+    assert r.text == BODY
+
+
+def test_no_accept_encoding() -> None:
+    client, _ = _client()
+    r = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.text == BODY
+
+
+def test_streaming_response_compressed() -> None:
+    client, _ = _client()
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert r.text == "y" * 40
+
+
+def test_static_path_compressed_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    compressed: list[str] = []
+
+    def counting_compress(encoding: str, level: int, data: bytes) -> bytes:
+        compressed.append(encoding)
+        return compress(encoding, level, data)
+
+    monkeypatch.setattr("app.core.compression.compress", counting_compress)
+    client, calls = _client()
+    for _ in range(3):
+        r = client.get("/static", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert int(r.headers["content-length"]) < len(BODY)
+        assert r.text == BODY
+    assert calls["static"] == 3
+    assert compressed == ["gzip"]
+
+
+def test_static_path_keeps_per_request_cors_headers() -> None:
+    app = FastAPI()
+
+    @app.get("/static")
+    def static() -> PlainTextResponse:
+        return PlainTextResponse(BODY)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://a.example.com", "https://b.example.com"],
+        allow_credentials=True,
+    )
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=1024, static_paths=["/static"]
+    )
+    client = TestClient(app)
+
+    r = client.get("/static", headers={"Accept-Encoding": "gzip"})
+    assert "access-control-allow-origin" not in r.headers
+    for origin in ["https://a.example.com", "https://b.example.com"]:
+        r = client.get("/static", headers={"Accept-Encoding": "gzip", "Origin": origin})
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["access-control-allow-origin"] == origin
+        assert r.headers["access-control-allow-credentials"] == "true"
+        assert r.text == BODY
+    r = client.get(
+        "/static", headers={"Accept-Encoding": "gzip", "Origin": "https://evil.com"}
+    )
+    assert "access-control-allow-origin" not in r.headers
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd"])
+def test_optional_encodings(encoding: str) -> None:
+    pytest.importorskip("brotli" if encoding == "br" else "zstandard")
+    client, _ = _client()
+    r = client.get("/large", headers={"Accept-Encoding": encoding})
+    assert r.headers["content-encoding"] == encoding
+    assert r.text == BODY
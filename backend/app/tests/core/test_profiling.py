@@ -0,0 +1,185 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import (
+    ContinuousProfiler,
+    ProfileStore,
+    RequestProfiler,
+    StackSampler,
+    profile_store,
+)
+
+
+@pytest.fixture
+def store_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(profile_store, "directory", tmp_path)
+    profile_store.clear_target()
+    return tmp_path
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def test_stack_sampler_requires_collect() -> None:
+    class Incomplete(StackSampler):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(0.001)  # type: ignore[abstract]
+
+
+def test_request_profiler_samples_other_threads() -> None:
+    profiler = RequestProfiler(0.001)
+    worker = threading.Thread(target=_busy, args=(0.2,), name="busy-worker")
+    profiler.start()
+    worker.start()
+    worker.join()
+    profiler.stop()
+
+    profile = profiler.to_speedscope("GET /busy")
+    assert profile["name"] == "GET /busy"
+    names = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert "_busy" in names
+    worker_profile = next(p for p in profile["profiles"] if p["name"] == "busy-worker")
+    assert worker_profile["type"] == "sampled"
+    assert len(worker_profile["samples"]) == len(worker_profile["weights"]) > 10
+    busy_index = names.index("_busy")
+    assert any(busy_index in stack for stack in worker_profile["samples"])
+
+
+def test_continuous_profiler_writes_collapsed_stacks(tmp_path: Path) -> None:
+    profiler = ContinuousProfiler(
+        tmp_path, interval=0.005, rotate_seconds=3600, max_files=10
+    )
+    idle = threading.Event()
+    sleeper = threading.Thread(target=idle.wait, name="idle-worker_3")
+    busy = threading.Thread(target=_busy, args=(0.2,), name="busy-worker-1")
+    sleeper.start()
+    profiler.start()
+    busy.start()
+    busy.join()
+    profiler.stop()
+    idle.set()
+    sleeper.join()
+
+    (path,) = tmp_path.glob("*.collapsed")
+    lines = path.read_text().splitlines()
+    busy_lines = [line for line in lines if line.startswith("busy-worker;")]
+    assert busy_lines
+    stack, count = busy_lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "_busy (app/tests/core/test_profiling.py:" in stack
+    assert not any(line.startswith("idle-worker") for line in lines)
+
+
+def test_continuous_profiler_rotates_files(tmp_path: Path) -> None:
+    profiler = ContinuousProfiler(tmp_path, interval=1, rotate_seconds=0, max_files=2)
+    for i in range(3):
+        profiler._window_start = 1_700_000_000 + i * 60
+        profiler.collect(profiler.stacks(), 1.0)
+
+    files = sorted(p.name for p in tmp_path.glob("*.collapsed"))
+    assert len(files) == 2
+    assert files[0].startswith("20231114T221420Z-")
+    assert profiler.flush() is None
+
+
+def test_profile_store(tmp_path: Path) -> None:
+    store = ProfileStore(tmp_path, max_files=2)
+    ids = [store.new_id() for _ in range(3)]
+    for i, profile_id in enumerate(ids):
+        store.save(profile_id, {"name": f"profile {i}"})
+        time.sleep(0.01)
+
+    profiles = store.list()
+    assert [p["id"] for p in profiles] == [ids[2], ids[1]]
+    assert profiles[0]["name"] == "profile 2"
+    assert store.path(ids[0]) is None
+    assert store.path(ids[2]) is not None
+    assert store.path("../target") is None
+
+    assert not store.matches("/api/v1/items/")
+    store.set_target("/api/v1/items", 60)
+    assert store.matches("/api/v1/items/")
+    assert not store.matches("/api/v1/users/")
+    store.clear_target()
+    assert not store.matches("/api/v1/items/")
+    store.set_target("/api/v1/items", -1)
+    assert store.get_target() is None
+
+
+@pytest.mark.usefixtures("store_dir")
+def test_profile_header_requires_superuser(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    r = client.get(url, headers={**superuser_token_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/profiling/profiles/{profile_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    profile = r.json()
+    assert profile["name"].startswith(f"GET {url} 200 ")
+    assert profile["profiles"]
+
+    r = client.get(url, headers={**normal_user_token_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    r = client.get(url, headers=superuser_token_headers)
+    assert "x-profile-id" not in r.headers
+
+    r = client.get(
+        f"{settings.API_V1_STR}/profiling/profiles/{profile_id}",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 403
+    r = client.get(
+        f"{settings.API_V1_STR}/profiling/profiles/{'0' * 32}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
+
+
+@pytest.mark.usefixtures("store_dir")
+def test_profiling_target(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    health_check = f"{settings.API_V1_STR}/utils/health-check/"
+    target_url = f"{settings.API_V1_STR}/profiling/target"
+    body = {"path_prefix": health_check, "expires_in_seconds": 60}
+
+    r = client.put(target_url, json=body, headers=normal_user_token_headers)
+    assert r.status_code == 403
+    r = client.put(target_url, json=body, headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert r.json()["path_prefix"] == health_check
+
+    r = client.get(health_check)
+    profile_id = r.headers["x-profile-id"]
+    assert "x-profile-id" not in client.get(f"{settings.API_V1_STR}/items/").headers
+
+    r = client.get(
+        f"{settings.API_V1_STR}/profiling/profiles/", headers=superuser_token_headers
+    )
+    assert profile_id in [p["id"] for p in r.json()]
+
+    r = client.delete(target_url, headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert client.get(target_url, headers=superuser_token_headers).json() is None
+    assert "x-profile-id" not in client.get(health_check).headers
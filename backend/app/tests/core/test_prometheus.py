@@ -0,0 +1,182 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.prometheus import MultiProcessStore, RequestMetrics, render
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found in metrics")
+
+
+def test_metrics_labelled_by_operation_id(client: TestClient) -> None:
+    client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    client.get(f"{settings.API_V1_STR}/items/not-a-uuid")
+    client.get("/no/such/path")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert (
+        _sample(
+            text,
+            'http_requests_total{method="GET",operation="utils-health_check",'
+            'status="200"}',
+        )
+        >= 1
+    )
+    assert (
+        _sample(
+            text,
+            'http_requests_total{method="GET",operation="items-read_item",'
+            'status="401"}',
+        )
+        >= 1
+    )
+    assert (
+        _sample(
+            text, 'http_requests_total{method="GET",operation="unmatched",status="404"}'
+        )
+        >= 1
+    )
+    assert "/no/such/path" not in text
+    assert (
+        _sample(
+            text,
+            'http_request_duration_seconds_bucket{method="GET",'
+            'operation="utils-health_check",le="+Inf"}',
+        )
+        >= 1
+    )
+    assert _sample(text, 'http_requests_in_progress{method="GET"}') == 1
+
+
+def test_metrics_bearer_token(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "METRICS_BEARER_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    r = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert r.status_code == 401
+    r = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert r.status_code == 200
+
+
+def test_metrics_require_token_outside_local(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "METRICS_BEARER_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(settings, "METRICS_BEARER_TOKEN", "secret")
+    r = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert r.status_code == 200
+
+
+def test_render_merges_snapshots() -> None:
+    first = RequestMetrics(buckets=(0.1, 1.0))
+    second = RequestMetrics(buckets=(0.1, 1.0))
+    first.started("GET")
+    first.finished("items-read_items", "GET", 200, 0.05)
+    second.started("GET")
+    second.finished("items-read_items", "GET", 200, 0.5)
+    second.started("POST")
+    second.finished('odd"name', "POST", 500, 2.0)
+    second.started("GET")
+
+    text = render([first.snapshot(), second.snapshot()])
+    assert "# TYPE http_requests_total counter" in text
+    assert (
+        'http_requests_total{method="GET",operation="items-read_items",status="200"} 2'
+        in text
+    )
+    assert 'operation="odd\\"name"' in text
+    assert 'http_requests_in_progress{method="GET"} 1' in text
+    prefix = (
+        'http_request_duration_seconds_bucket{method="GET",operation="items-read_items"'
+    )
+    assert f'{prefix},le="0.1"}} 1' in text
+    assert f'{prefix},le="1.0"}} 2' in text
+    assert f'{prefix},le="+Inf"}} 2' in text
+    assert (
+        'http_request_duration_seconds_count{method="GET",operation="items-read_items"} 2'
+        in text
+    )
+
+
+def test_multiprocess_store_aggregates_processes(tmp_path: Path) -> None:
+    worker = RequestMetrics()
+    worker_store = MultiProcessStore(tmp_path, worker)
+    worker.started("GET")
+    worker.finished("utils-health_check", "GET", 200, 0.01)
+    worker.started("GET")
+    worker_store.write()
+
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    dead_snapshot = RequestMetrics()
+    dead_snapshot.started("GET")
+    dead_snapshot.finished("utils-health_check", "GET", 200, 0.01)
+    dead_snapshot.started("GET")
+    (tmp_path / f"{proc.pid}-deadbeef.json").write_text(
+        json.dumps(dead_snapshot.snapshot())
+    )
+
+    scraper = RequestMetrics()
+    scraper.started("GET")
+    scraper.finished("utils-health_check", "GET", 200, 0.01)
+    text = render(MultiProcessStore(tmp_path, scraper).read_all())
+
+    assert (
+        'http_requests_total{method="GET",operation="utils-health_check",status="200"} 3'
+        in text
+    )
+    assert 'http_requests_in_progress{method="GET"} 1' in text
+
+
+def test_multiprocess_store_prunes_dead_processes(tmp_path: Path) -> None:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    for suffix in ("deadbeef", "cafebabe"):
+        dead = RequestMetrics()
+        dead.started("GET")
+        dead.finished("utils-health_check", "GET", 200, 0.01)
+        dead.started("GET")
+        (tmp_path / f"{proc.pid}-{suffix}.json").write_text(json.dumps(dead.snapshot()))
+
+    scraper = RequestMetrics()
+    store = MultiProcessStore(tmp_path, scraper)
+    before = render(store.read_all())
+    assert store.prune() == 2
+    assert store.prune() == 0
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == ["archive.json"]
+
+    after = render(store.read_all())
+    assert after == before
+    assert (
+        'http_requests_total{method="GET",operation="utils-health_check",status="200"} 2'
+        in after
+    )
+    assert 'http_requests_in_progress{method="GET"} 0' not in after
+
+
+def test_multiprocess_store_background_flush(tmp_path: Path) -> None:
+    metrics = RequestMetrics()
+    store = MultiProcessStore(tmp_path, metrics)
+    store.start(0.01)
+    metrics.started("GET")
+    metrics.finished("utils-health_check", "GET", 200, 0.01)
+    store.stop()
+
+    snapshot = json.loads(store.path.read_text())
+    assert snapshot["counters"]["http_requests_total"][0][1] == 1
+    assert not list(tmp_path.glob("*.tmp"))
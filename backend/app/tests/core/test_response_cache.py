@@ -0,0 +1,196 @@
+import asyncio
+import socketserver
+import threading
+import time
+from typing import Any
+
+from app.core.response_cache import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    ResponseCache,
+)
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    server: "FakeRedisServer"
+
+    def _read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        while (args := self._read_command()) is not None:
+            self.wfile.write(self.server.execute(args))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _RedisHandler)
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.commands: list[bytes] = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def _get(self, key: bytes) -> bytes | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and time.monotonic() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: list[bytes]) -> bytes:
+        with self._lock:
+            return self._execute(args)
+
+    def _execute(self, args: list[bytes]) -> bytes:
+        name = args[0].upper()
+        self.commands.append(name)
+        if name == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else encode_bulk(value)
+        if name == b"MGET":
+            values = [self._get(key) for key in args[1:]]
+            return b"*%d\r\n" % len(values) + b"".join(
+                b"$-1\r\n" if v is None else encode_bulk(v) for v in values
+            )
+        if name == b"SET":
+            options = [a.upper() for a in args[3:]]
+            if b"NX" in options and self._get(args[1]) is not None:
+                return b"$-1\r\n"
+            expires = None
+            if b"PX" in options:
+                px = int(args[3 + options.index(b"PX") + 1])
+                expires = time.monotonic() + px / 1000
+            self.data[args[1]] = (args[2], expires)
+            return b"+OK\r\n"
+        if name == b"DEL":
+            deleted = sum(self.data.pop(key, None) is not None for key in args[1:])
+            return b":%d\r\n" % deleted
+        return b"-ERR unknown command\r\n"
+
+    def __enter__(self) -> "FakeRedisServer":
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def encode_bulk(value: bytes) -> bytes:
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def _exercise(backend: CacheBackend) -> None:
+    cache = ResponseCache(backend, ttl=60, stale_ttl=60)
+    calls = 0
+
+    async def load() -> bytes:
+        nonlocal calls
+        calls += 1
+        return b'{"n":%d}' % calls
+
+    assert await cache.get_or_load("a", ["items"], load) == b'{"n":1}'
+    assert await cache.get_or_load("a", ["items"], load) == b'{"n":1}'
+    assert await cache.get_or_load("b", ["items"], load) == b'{"n":2}'
+    await cache.invalidate(["items"])
+    assert await cache.get_or_load("a", ["items"], load) == b'{"n":3}'
+    await cache.invalidate(["other"])
+    assert await cache.get_or_load("a", ["items"], load) == b'{"n":3}'
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["hit_ratio"] == 0.4
+    await cache.close()
+
+
+def test_memory_backend() -> None:
+    asyncio.run(_exercise(MemoryBackend(maxsize=100, ttl=120)))
+
+
+def test_redis_backend() -> None:
+    with FakeRedisServer() as server:
+        asyncio.run(_exercise(RedisBackend(server.url, ttl=120)))
+    assert b"MGET" in server.commands
+    assert b"DEL" in server.commands
+
+
+def test_invalidate_sync() -> None:
+    async def _run(backend: CacheBackend) -> None:
+        cache = ResponseCache(backend, ttl=60, stale_ttl=60)
+        calls = 0
+
+        async def load() -> bytes:
+            nonlocal calls
+            calls += 1
+            return b"%d" % calls
+
+        assert await cache.get_or_load("a", ["items"], load) == b"1"
+        assert await cache.get_or_load("a", ["items"], load) == b"1"
+        cache.invalidate_sync(["items"])
+        assert await cache.get_or_load("a", ["items"], load) == b"2"
+        assert cache.stats()["errors"] == 0
+        await cache.close()
+
+    asyncio.run(_run(MemoryBackend(maxsize=100, ttl=120)))
+    with FakeRedisServer() as server:
+        asyncio.run(_run(RedisBackend(server.url, ttl=120)))
+
+
+def test_stale_while_revalidate() -> None:
+    async def _run() -> None:
+        cache = ResponseCache(MemoryBackend(maxsize=100, ttl=60), ttl=0, stale_ttl=60)
+        calls = 0
+
+        async def load() -> bytes:
+            nonlocal calls
+            calls += 1
+            return b"%d" % calls
+
+        assert await cache.get_or_load("a", ["items"], load, load) == b"1"
+        assert await cache.get_or_load("a", ["items"], load, load) == b"1"
+        await asyncio.sleep(0)
+        assert calls == 2
+        assert await cache.get_or_load("a", ["items"], load, load) == b"2"
+        stats = cache.stats()
+        assert stats["stale_hits"] == 2
+        assert stats["refreshes"] >= 1
+        await cache.close()
+
+    asyncio.run(_run())
+
+
+def test_backend_errors_fall_back_to_load() -> None:
+    async def _run() -> None:
+        cache = ResponseCache(
+            RedisBackend("redis://127.0.0.1:1/0", ttl=60), ttl=30, stale_ttl=30
+        )
+
+        async def load() -> bytes:
+            return b"fresh"
+
+        assert await cache.get_or_load("a", ["items"], load) == b"fresh"
+        await cache.invalidate(["items"])
+        cache.invalidate_sync(["items"])
+        assert cache.stats()["errors"] == 3
+
+    asyncio.run(_run())
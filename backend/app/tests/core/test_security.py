@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.core.security import (
+    PasswordHasher,
+    PasswordHashingBusyError,
+    _hash_password,
+    get_password_hash,
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
+
+
+def test_hash_and_verify_password() -> None:
+    hashed_password = get_password_hash("secret-password")
+    assert hashed_password != "secret-password"
+    assert verify_password("secret-password", hashed_password)
+    assert not verify_password("wrong-password", hashed_password)
+
+
+def test_hash_and_verify_password_async() -> None:
+    async def _run() -> None:
+        hashed_password = await get_password_hash_async("secret-password")
+        assert await verify_password_async("secret-password", hashed_password)
+        assert not await verify_password_async("wrong-password", hashed_password)
+
+    asyncio.run(_run())
+
+
+def test_password_hasher_rejects_when_queue_full() -> None:
+    hasher = PasswordHasher(workers=1, queue_size=0)
+    try:
+        future = hasher._submit(_hash_password, "secret-password")
+        with pytest.raises(PasswordHashingBusyError):
+            hasher.run(_hash_password, "another-password")
+        assert future.result()[0]
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_password_hasher_inline() -> None:
+    hasher = PasswordHasher(workers=0, queue_size=0)
+    hashed_password = hasher.run(_hash_password, "secret-password")
+    assert hashed_password
+    stats = hasher.stats()
+    assert stats["in_flight"] == 0
+    assert stats["hash_seconds"]["count"] == 1
+    assert stats["queue_wait_seconds"]["count"] == 1
@@ -0,0 +1,257 @@
+import smtplib
+import time
+
+import pytest
+
+from app import utils
+from app.core import smtp
+from app.core.smtp import OutgoingEmail, SMTPOptions, SMTPTransport
+from app.tests.utils.smtp import SMTPServerStub
+from app.utils import EmailData, send_emails
+
+
+def _email(to: str, body: bytes = b"Subject: Hi\r\n\r\nHello\r\n") -> OutgoingEmail:
+    return OutgoingEmail(from_addr="info@example.com", to_addrs=[to], data=body)
+
+
+def _transport(server: SMTPServerStub, **kwargs: int) -> SMTPTransport:
+    return SMTPTransport(SMTPOptions(host="127.0.0.1", port=server.port), **kwargs)
+
+
+def test_send_many_reuses_one_connection() -> None:
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        emails = [_email(f"user{i}@example.com") for i in range(20)]
+        assert transport.send_many(emails) == [None] * 20
+        assert transport.send_many([_email("late@example.com")]) == [None]
+        transport.close()
+
+    assert server.connections == 1
+    assert [email.rcpt_to for email in server.received] == [
+        *([f"user{i}@example.com"] for i in range(20)),
+        ["late@example.com"],
+    ]
+    stats = transport.stats()
+    assert stats["connections_opened"] == 1
+    assert stats["messages_sent"] == 21
+    assert stats["messages_failed"] == 0
+
+
+def test_message_body_is_dot_stuffed() -> None:
+    body = b"Subject: Hi\n\n.leading dot\n..two dots\nend"
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        transport.send(_email("user@example.com", body))
+        transport.close()
+
+    assert server.received[0].data == (
+        b"Subject: Hi\r\n\r\n.leading dot\r\n..two dots\r\nend\r\n"
+    )
+
+
+def test_reconnects_after_server_disconnect() -> None:
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        transport.send(_email("first@example.com"))
+        server.disconnect_all()
+        transport.send(_email("second@example.com"))
+        transport.close()
+
+    assert [email.rcpt_to for email in server.received] == [
+        ["first@example.com"],
+        ["second@example.com"],
+    ]
+    stats = transport.stats()
+    assert stats["connections_opened"] == 2
+    assert stats["reconnects"] == 1
+
+
+def test_refused_recipient_does_not_break_batch() -> None:
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        results = transport.send_many(
+            [
+                _email("a@example.com"),
+                _email("reject@example.com"),
+                _email("b@example.com"),
+            ]
+        )
+        transport.close()
+
+    assert results[0] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert results[2] is None
+    assert server.connections == 1
+    assert [email.rcpt_to for email in server.received] == [
+        ["a@example.com"],
+        ["b@example.com"],
+    ]
+    assert transport.stats()["messages_failed"] == 1
+
+
+def test_server_without_pipelining() -> None:
+    with SMTPServerStub(pipelining=False) as server:
+        transport = _transport(server)
+        results = transport.send_many(
+            [_email("a@example.com"), _email("reject@example.com")]
+        )
+        transport.close()
+
+    assert results[0] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert server.connections == 1
+
+
+def test_non_ascii_addresses() -> None:
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        results = transport.send_many(
+            [
+                _email("user@bücher.example"),
+                _email("jürgen@example.com"),
+                _email("b@example.com"),
+            ]
+        )
+        transport.close()
+
+    assert results[0] is None
+    assert isinstance(results[1], ValueError)
+    assert results[2] is None
+    assert server.connections == 1
+    assert [email.rcpt_to for email in server.received] == [
+        ["user@xn--bcher-kva.example"],
+        ["b@example.com"],
+    ]
+
+
+def test_unexpected_error_discards_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    encode_data = smtp._encode_data
+
+    def fail_on_boom(data: bytes) -> bytes:
+        if b"boom" in data:
+            raise RuntimeError("boom")
+        return encode_data(data)
+
+    monkeypatch.setattr(smtp, "_encode_data", fail_on_boom)
+    with SMTPServerStub() as server:
+        transport = _transport(server)
+        results = transport.send_many(
+            [
+                _email("a@example.com"),
+                _email("boom@example.com", b"Subject: boom\r\n\r\nboom\r\n"),
+                _email("b@example.com"),
+            ]
+        )
+        transport.close()
+
+    assert results[0] is None
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] is None
+    assert server.connections == 2
+    assert [email.rcpt_to for email in server.received] == [
+        ["a@example.com"],
+        ["b@example.com"],
+    ]
+    assert transport.stats()["messages_failed"] == 1
+
+
+def test_connection_is_recycled_after_max_messages() -> None:
+    with SMTPServerStub() as server:
+        transport = _transport(server, max_messages_per_connection=2)
+        for i in range(5):
+            transport.send(_email(f"user{i}@example.com"))
+        transport.close()
+
+    assert len(server.received) == 5
+    assert server.connections == 3
+
+
+def test_send_emails_builds_mime_messages(monkeypatch: pytest.MonkeyPatch) -> None:
+    with SMTPServerStub() as server:
+        monkeypatch.setattr("app.core.config.settings.SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr("app.core.config.settings.SMTP_PORT", server.port)
+        monkeypatch.setattr("app.core.config.settings.SMTP_TLS", False)
+        monkeypatch.setattr("app.core.config.settings.SMTP_USER", None)
+        monkeypatch.setattr(
+            "app.core.config.settings.EMAILS_FROM_EMAIL", "info@example.com"
+        )
+        transport = SMTPTransport()
+        monkeypatch.setattr("app.utils.smtp_transport", transport)
+        results = send_emails(
+            messages=[
+                ("a@example.com", EmailData(html_content="<p>A</p>", subject="One")),
+                ("b@example.com", EmailData(html_content="<p>B</p>", subject="Two")),
+            ]
+        )
+        transport.close()
+
+    assert results == [None, None]
+    assert server.connections == 1
+    first, second = server.received
+    assert first.mail_from == "info@example.com"
+    assert first.rcpt_to == ["a@example.com"]
+    assert b"Subject: One" in first.data
+    assert b"To: a@example.com" in first.data
+    assert b"Subject: Two" in second.data
+
+
+def test_send_emails_isolates_build_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    build_outgoing_email = utils.build_outgoing_email
+
+    def build(*, email_to: str, email_data: EmailData) -> OutgoingEmail:
+        if email_to.startswith("broken"):
+            raise ValueError("bad template")
+        return build_outgoing_email(email_to=email_to, email_data=email_data)
+
+    with SMTPServerStub() as server:
+        monkeypatch.setattr("app.core.config.settings.SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr("app.core.config.settings.SMTP_PORT", server.port)
+        monkeypatch.setattr("app.core.config.settings.SMTP_TLS", False)
+        monkeypatch.setattr("app.core.config.settings.SMTP_USER", None)
+        monkeypatch.setattr(
+            "app.core.config.settings.EMAILS_FROM_EMAIL", "info@example.com"
+        )
+        transport = SMTPTransport()
+        monkeypatch.setattr("app.utils.smtp_transport", transport)
+        monkeypatch.setattr(utils, "build_outgoing_email", build)
+        data = EmailData(html_content="<p>Hi</p>", subject="Hi")
+        results = send_emails(
+            messages=[
+                ("a@example.com", data),
+                ("broken@example.com", data),
+                ("b@example.com", data),
+            ]
+        )
+        transport.close()
+
+    assert results[0] is None
+    assert isinstance(results[1], ValueError)
+    assert results[2] is None
+    assert [email.rcpt_to for email in server.received] == [
+        ["a@example.com"],
+        ["b@example.com"],
+    ]
+
+
+def test_pooled_transport_throughput() -> None:
+    messages = 20
+    emails = [_email(f"user{i}@example.com") for i in range(messages)]
+    with SMTPServerStub(handshake_delay=0.02) as server:
+        per_message = _transport(server, max_messages_per_connection=1)
+        start = time.perf_counter()
+        for email in emails:
+            per_message.send(email)
+        per_message_rate = messages / (time.perf_counter() - start)
+
+        pooled = _transport(server)
+        start = time.perf_counter()
+        assert pooled.send_many(emails) == [None] * messages
+        pooled_rate = messages / (time.perf_counter() - start)
+        pooled.close()
+
+    print(
+        f"per-message connection: {per_message_rate:.0f} msg/s, "
+        f"pooled: {pooled_rate:.0f} msg/s"
+    )
+    assert len(server.received) == 2 * messages
+    assert pooled_rate > 3 * per_message_rate
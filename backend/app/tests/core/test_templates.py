@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+from jinja2 import FileSystemBytecodeCache, Template
+
+from app.core.templates import EMAIL_TEMPLATES_DIR, TemplateRegistry
+
+CONTEXT = {
+    "project_name": "Project",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "password": "secret",
+    "valid_hours": 48,
+    "link": "http://localhost:5173/reset-password?token=abc",
+}
+
+
+@pytest.mark.parametrize(
+    "name", ["new_account.html", "reset_password.html", "test_email.html"]
+)
+@pytest.mark.parametrize("static", [False, True])
+def test_render_matches_plain_template(name: str, static: bool) -> None:
+    registry = TemplateRegistry(
+        EMAIL_TEMPLATES_DIR,
+        static_context={"project_name": "Project"} if static else None,
+    )
+    expected = Template((EMAIL_TEMPLATES_DIR / name).read_text()).render(CONTEXT)
+    assert registry.render(name, CONTEXT) == expected
+
+
+def test_load_compiles_all_templates() -> None:
+    registry = TemplateRegistry(EMAIL_TEMPLATES_DIR)
+    registry.load()
+    assert set(registry._templates) == {
+        "new_account.html",
+        "reset_password.html",
+        "test_email.html",
+    }
+
+
+def test_bytecode_cache_keyed_by_static_context(tmp_path: Path) -> None:
+    def registry(project_name: str) -> TemplateRegistry:
+        return TemplateRegistry(
+            EMAIL_TEMPLATES_DIR,
+            bytecode_cache=FileSystemBytecodeCache(str(tmp_path)),
+            static_context={"project_name": project_name},
+        )
+
+    first = registry("First").render("test_email.html", {"email": "a@example.com"})
+    assert list(tmp_path.iterdir())
+    cached = registry("First").render("test_email.html", {"email": "a@example.com"})
+    assert cached == first
+    second = registry("Second").render("test_email.html", {"email": "a@example.com"})
+    assert "Second" in second
+    assert "First" not in second
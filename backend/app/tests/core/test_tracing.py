@@ -0,0 +1,140 @@
+import asyncio
+import random
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+import sentry_sdk
+
+from app.core import tracing
+from app.core.config import Settings, settings
+from app.core.tracing import (
+    before_send_transaction,
+    route_sample_rate,
+    traced,
+    traces_sampler,
+)
+
+
+@pytest.fixture
+def sample_rates(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SENTRY_TRACES_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(
+        settings,
+        "SENTRY_TRACES_ROUTE_SAMPLE_RATES",
+        {"/api/v1/utils/health-check/": 0.0, "/api/v1/items": 0.5, "/api/v1/": 1.0},
+    )
+    monkeypatch.setattr(settings, "SENTRY_TRACES_KEEP_SLOW_SECONDS", 1.0)
+
+
+def _transaction(
+    duration: float, status: str = "ok", path: str = "/api/v1/items/"
+) -> dict[str, Any]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return {
+        "type": "transaction",
+        "start_timestamp": start,
+        "timestamp": start + timedelta(seconds=duration),
+        "contexts": {"trace": {"status": status}},
+        "request": {"url": f"http://api.example.com{path}?skip=0"},
+    }
+
+
+@pytest.mark.usefixtures("sample_rates")
+def test_route_sample_rate_uses_longest_prefix() -> None:
+    assert route_sample_rate("/api/v1/items/123") == 0.5
+    assert route_sample_rate("/api/v1/users/me") == 1.0
+    assert route_sample_rate("/api/v1/utils/health-check/") == 0.0
+    assert route_sample_rate("/docs") == 0.0
+
+
+@pytest.mark.usefixtures("sample_rates")
+def test_traces_sampler(monkeypatch: pytest.MonkeyPatch) -> None:
+    def sample(path: str, **context: Any) -> float:
+        return traces_sampler({"asgi_scope": {"path": path}, **context})
+
+    assert sample("/api/v1/utils/health-check/") == 0.0
+    assert sample("/api/v1/items/") == 1.0
+    assert sample("/api/v1/utils/health-check/", parent_sampled=True) == 1.0
+
+    monkeypatch.setattr(settings, "SENTRY_TRACES_KEEP_SLOW_SECONDS", 0.0)
+    assert sample("/api/v1/items/") == 0.5
+    assert sample("/docs") == 0.0
+
+
+@pytest.mark.usefixtures("sample_rates")
+def test_before_send_keeps_slow_and_failed_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(random, "random", lambda: 0.9)
+    assert before_send_transaction(_transaction(0.01), {}) is None
+    assert before_send_transaction(_transaction(2.0), {}) is not None
+    assert before_send_transaction(_transaction(0.01, "internal_error"), {})
+    assert before_send_transaction(_transaction(0.01, "not_found"), {}) is None
+
+    traced_upstream = _transaction(0.01)
+    traced_upstream["contexts"]["trace"]["parent_span_id"] = "b7ad6b7169203331"
+    assert before_send_transaction(traced_upstream, {}) is not None
+
+    serialized = _transaction(0.01, path="/api/v1/users/me")
+    serialized["start_timestamp"] = "2026-01-01T00:00:00Z"
+    serialized["timestamp"] = "2026-01-01T00:00:00.010000Z"
+    assert before_send_transaction(serialized, {}) is not None
+
+    monkeypatch.setattr(random, "random", lambda: 0.1)
+    assert before_send_transaction(_transaction(0.01), {}) is not None
+
+
+def test_slow_keep_is_opt_in() -> None:
+    assert Settings.model_fields["SENTRY_TRACES_KEEP_SLOW_SECONDS"].default == 0
+
+
+def test_before_send_without_tail_sampling(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SENTRY_TRACES_KEEP_SLOW_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "SENTRY_TRACES_SAMPLE_RATE", 0.0)
+    assert before_send_transaction(_transaction(0.01), {}) is not None
+
+
+def test_spans_are_noops_without_sentry(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(**_kwargs: Any) -> None:
+        raise AssertionError("span started without Sentry")
+
+    monkeypatch.setattr(tracing, "_enabled", False)
+    monkeypatch.setattr(sentry_sdk, "start_span", fail)
+
+    @traced("db")
+    def query() -> int:
+        return 1
+
+    with tracing.span("jwt.decode"):
+        pass
+    assert query() == 1
+
+
+def test_traced_wraps_sync_and_async_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    spans: list[tuple[str, str | None]] = []
+
+    @contextmanager
+    def start_span(*, op: str, description: str | None = None) -> Iterator[None]:
+        spans.append((op, description))
+        yield
+
+    monkeypatch.setattr(tracing, "_enabled", True)
+    monkeypatch.setattr(sentry_sdk, "start_span", start_span)
+
+    @traced("db")
+    def query(value: int) -> int:
+        return value * 2
+
+    @traced("db")
+    async def query_async(value: int) -> int:
+        return value * 3
+
+    assert query(2) == 4
+    assert asyncio.run(query_async(2)) == 6
+    assert [op for op, _ in spans] == ["db", "db"]
+    assert spans[0][1] == f"{__name__}.{query.__qualname__}"
+    assert spans[1][1] == f"{__name__}.{query_async.__qualname__}"
+    assert query.__name__ == "query"
@@ -0,0 +1,38 @@
+import uuid
+
+import pytest
+from sqlalchemy import ClauseElement, text
+from sqlmodel import Session, select
+
+from app import crud
+from app.api.routes.items import export_statement, visible_items
+from app.core.security import Principal
+from app.models import Item
+
+owner = Principal(id=uuid.uuid4(), is_active=True, is_superuser=False)
+
+
+def _plan(db: Session, statement: ClauseElement) -> str:
+    compiled = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    # 测试库数据量很小，规划器总是倾向于顺序扫描；禁用后如果仍然出现
+    # 顺序扫描，说明没有可用的索引
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    rows: list[str] = list(db.execute(text(f"EXPLAIN {compiled}")).scalars())
+    db.rollback()
+    return "\n".join(rows)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        visible_items(select(Item), owner).limit(100),
+        visible_items(select(Item), owner, uuid.uuid4()).limit(100),
+        export_statement(owner),
+        crud.purge_items_statement(user_id=owner.id, batch_size=100),
+    ],
+    ids=["owner_page", "owner_cursor_page", "owner_export", "owner_purge"],
+)
+def test_owner_queries_use_index(db: Session, statement: ClauseElement) -> None:
+    plan = _plan(db, statement)
+    assert "ix_item_owner_id_id" in plan, plan
+    assert "Seq Scan on item" not in plan, plan
@@ -1,7 +1,11 @@
+import asyncio
+
 from fastapi.encoders import jsonable_encoder
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
+from app.core.db import async_engine
 from app.core.security import verify_password
 from app.models import User, UserCreate, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string
@@ -89,3 +93,25 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def test_create_and_authenticate_user_async() -> None:
+    email = random_email()
+    password = random_lower_string()
+
+    async def _run() -> None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            user_in = UserCreate(email=email, password=password)
+            user = await crud.create_user_async(session=session, user_create=user_in)
+            assert user.email == email
+            authenticated_user = await crud.authenticate_async(
+                session=session, email=email, password=password
+            )
+            assert authenticated_user
+            assert authenticated_user.id == user.id
+            assert not await crud.authenticate_async(
+                session=session, email=email, password="wrong-password"
+            )
+        await async_engine.dispose()
+
+    asyncio.run(_run())
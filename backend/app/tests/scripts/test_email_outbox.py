@@ -0,0 +1,137 @@
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app import crud
+from app.email_outbox import EmailOutboxWorker
+from app.models import EmailOutbox
+from app.utils import EmailData
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def send_emails(
+        self, *, messages: Sequence[tuple[str, EmailData]]
+    ) -> list[Exception | None]:
+        self.batches.append([email_to for email_to, _ in messages])
+        return [
+            ConnectionError("relay unavailable")
+            if email_to.startswith("broken")
+            else None
+            for email_to, _ in messages
+        ]
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch: pytest.MonkeyPatch, db: Session) -> FakeTransport:
+    db.execute(delete(EmailOutbox))
+    db.commit()
+    transport = FakeTransport()
+    monkeypatch.setattr("app.email_outbox.send_emails", transport.send_emails)
+    return transport
+
+
+def test_drain_sends_claimed_batch_together(
+    db: Session, fake_smtp: FakeTransport
+) -> None:
+    for i in range(3):
+        crud.enqueue_email(
+            session=db,
+            email_to=f"user{i}@example.com",
+            subject="Hi",
+            html_content="<p>password: secret</p>",
+        )
+    db.commit()
+
+    worker = EmailOutboxWorker(batch_size=2)
+    assert worker.drain_once() == 2
+    assert worker.drain_once() == 1
+    assert worker.drain_once() == 0
+
+    assert [len(batch) for batch in fake_smtp.batches] == [2, 1]
+    assert sorted(sum(fake_smtp.batches, [])) == [
+        "user0@example.com",
+        "user1@example.com",
+        "user2@example.com",
+    ]
+    db.expire_all()
+    for email in db.exec(select(EmailOutbox)).all():
+        assert email.status == "sent"
+        assert email.attempts == 1
+        assert email.sent_at is not None
+        assert email.html_content == ""
+
+
+@pytest.mark.usefixtures("fake_smtp")
+def test_failed_send_retries_with_backoff(db: Session) -> None:
+    queued = crud.enqueue_email(
+        session=db,
+        email_to="broken@example.com",
+        subject="Hi",
+        html_content="<p>token: secret</p>",
+    )
+    db.commit()
+    email_id = queued.id
+
+    worker = EmailOutboxWorker(max_attempts=2, retry_base_seconds=60)
+    before = datetime.now(timezone.utc)
+    assert worker.drain_once() == 1
+    db.expire_all()
+    email = db.get(EmailOutbox, email_id)
+    assert email
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.html_content == "<p>token: secret</p>"
+    assert email.last_error == "relay unavailable"
+    next_attempt_at = email.next_attempt_at
+    if next_attempt_at.tzinfo is None:
+        next_attempt_at = next_attempt_at.replace(tzinfo=timezone.utc)
+    assert next_attempt_at >= before + timedelta(seconds=60)
+
+    assert worker.drain_once() == 0
+
+    email.next_attempt_at = datetime.now(timezone.utc)
+    db.add(email)
+    db.commit()
+    assert worker.drain_once() == 1
+    db.expire_all()
+    email = db.get(EmailOutbox, email_id)
+    assert email
+    assert email.status == "failed"
+    assert email.attempts == 2
+    assert email.html_content == ""
+
+
+def test_batch_error_counts_as_failed_attempt(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db.execute(delete(EmailOutbox))
+    queued = crud.enqueue_email(
+        session=db, email_to="user@example.com", subject="Hi", html_content=""
+    )
+    db.commit()
+    email_id = queued.id
+
+    def fail(**_kwargs: object) -> list[Exception | None]:
+        raise RuntimeError("transport crashed")
+
+    monkeypatch.setattr("app.email_outbox.send_emails", fail)
+    worker = EmailOutboxWorker(max_attempts=1)
+    assert worker.drain_once() == 1
+    db.expire_all()
+    email = db.get(EmailOutbox, email_id)
+    assert email
+    assert email.status == "failed"
+    assert email.attempts == 1
+    assert email.last_error == "transport crashed"
+
+
+def test_retry_delay_is_capped() -> None:
+    worker = EmailOutboxWorker(retry_base_seconds=30, retry_max_seconds=100)
+    assert worker.retry_delay(1) == timedelta(seconds=30)
+    assert worker.retry_delay(2) == timedelta(seconds=60)
+    assert worker.retry_delay(3) == timedelta(seconds=100)
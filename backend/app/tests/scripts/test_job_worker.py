@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app import crud
+from app.job_worker import JobWorker
+from app.models import Job
+
+
+@pytest.fixture(autouse=True)
+def clean_jobs(db: Session) -> None:
+    db.execute(delete(Job))
+    db.commit()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def test_jobs_run_by_priority(db: Session) -> None:
+    ran: list[str] = []
+
+    def record(payload: dict[str, Any]) -> None:
+        ran.append(payload["label"])
+
+    crud.enqueue_job(session=db, name="record", payload={"label": "low"})
+    crud.enqueue_job(session=db, name="record", payload={"label": "high"}, priority=10)
+    crud.enqueue_job(
+        session=db, name="record", payload={"label": "later"}, delay_seconds=60
+    )
+    db.commit()
+
+    worker = JobWorker(job_handlers={"record": record})
+    assert worker.drain_once() == 2
+    assert worker.drain_once() == 0
+    assert ran == ["high", "low"]
+
+    db.expire_all()
+    statuses = {job.payload["label"]: job.status for job in db.exec(select(Job))}
+    assert statuses == {"high": "succeeded", "low": "succeeded", "later": "queued"}
+    stats = worker.stats()
+    assert stats["claimed"] == 2
+    assert stats["succeeded"] == 2
+    assert set(stats["mean_ms"]) == {"record"}
+
+
+def test_failed_job_retries_with_backoff(db: Session) -> None:
+    def broken(_payload: dict[str, Any]) -> None:
+        raise RuntimeError("import source unavailable")
+
+    queued = crud.enqueue_job(session=db, name="broken", max_attempts=2)
+    db.commit()
+    job_id = queued.id
+
+    worker = JobWorker(job_handlers={"broken": broken}, retry_base_seconds=60)
+    before = datetime.now(timezone.utc)
+    assert worker.drain_once() == 1
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.lease_id is None
+    assert job.last_error == "import source unavailable"
+    assert _as_utc(job.available_at) >= before + timedelta(seconds=60)
+    assert worker.drain_once() == 0
+
+    job.available_at = datetime.now(timezone.utc)
+    db.add(job)
+    db.commit()
+    assert worker.drain_once() == 1
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.finished_at is not None
+    assert worker.stats()["retried"] == 1
+    assert worker.stats()["failed"] == 1
+
+
+def test_unknown_job_fails_without_retry(db: Session) -> None:
+    queued = crud.enqueue_job(session=db, name="missing")
+    db.commit()
+    job_id = queued.id
+
+    assert JobWorker(job_handlers={}).drain_once() == 1
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == "failed"
+    assert job.attempts == 1
+    assert "No handler registered" in (job.last_error or "")
+
+
+def test_expired_lease_is_reclaimed(db: Session) -> None:
+    queued = crud.enqueue_job(session=db, name="slow", max_attempts=2)
+    db.commit()
+    job_id = queued.id
+
+    (first,) = crud.claim_jobs(session=db, limit=10, visibility_timeout=60)
+    assert crud.claim_jobs(session=db, limit=10, visibility_timeout=60) == []
+    first_lease = first.lease_id
+    assert first_lease
+
+    crud.extend_job_leases(session=db, lease_ids=[first_lease], visibility_timeout=0)
+    (second,) = crud.claim_jobs(session=db, limit=10, visibility_timeout=0)
+    assert second.id == job_id
+    assert second.attempts == 2
+    assert second.lease_id != first_lease
+
+    stale = Job(id=job_id, name="slow", lease_id=first_lease)
+    assert not crud.finish_job(session=db, job=stale)
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == "running"
+
+    assert crud.claim_jobs(session=db, limit=10, visibility_timeout=60) == []
+    db.expire_all()
+    job = db.get(Job, job_id)
+    assert job
+    assert job.status == "failed"
+    assert job.last_error == "Visibility timeout expired"
+
+
+def test_worker_filters_by_name(db: Session) -> None:
+    ran: list[str] = []
+    crud.enqueue_job(session=db, name="a")
+    crud.enqueue_job(session=db, name="b")
+    db.commit()
+
+    worker = JobWorker(
+        names=["b"],
+        job_handlers={"a": lambda _: ran.append("a"), "b": lambda _: ran.append("b")},
+    )
+    assert worker.drain_once() == 1
+    assert ran == ["b"]
+
+
+def test_run_executes_jobs_concurrently(db: Session) -> None:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow(_payload: dict[str, Any]) -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.1)
+        with lock:
+            active -= 1
+
+    for _ in range(8):
+        crud.enqueue_job(session=db, name="slow")
+    db.commit()
+
+    worker = JobWorker(
+        concurrency=4,
+        poll_interval=0.05,
+        stats_interval=0,
+        job_handlers={"slow": slow},
+    )
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while worker.stats()["succeeded"] < 8 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+
+    stats = worker.stats()
+    assert stats["succeeded"] == 8
+    assert stats["in_flight"] == 0
+    assert stats["jobs_per_second"] > 0
+    assert peak == 4
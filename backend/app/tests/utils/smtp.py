@@ -0,0 +1,121 @@
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class ReceivedEmail:
+    mail_from: str
+    rcpt_to: list[str]
+    data: bytes
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "SMTPServerStub"
+    disable_nagle_algorithm = True
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def _read_data(self) -> bytes | None:
+        lines: list[bytes] = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if line == b".\r\n":
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def handle(self) -> None:
+        self.server.track(self.request)
+        time.sleep(self.server.handshake_delay)
+        self._reply("220 localhost ESMTP stub")
+        mail_from: str | None = None
+        rcpt_to: list[str] = []
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                if self.server.pipelining:
+                    self._reply("250-localhost")
+                    self._reply("250-PIPELINING")
+                self._reply("250 8BITMIME")
+            elif verb == "MAIL":
+                mail_from = command.split(":", 1)[1].strip("<> ")
+                rcpt_to = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                addr = command.split(":", 1)[1].strip("<> ")
+                if addr.startswith("reject"):
+                    self._reply("550 No such user")
+                else:
+                    rcpt_to.append(addr)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                if mail_from is None or not rcpt_to:
+                    self._reply("554 No valid recipients")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                if data is None:
+                    return
+                self.server.received.append(ReceivedEmail(mail_from, rcpt_to, data))
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif verb == "RSET":
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("500 Unknown command")
+
+
+class SMTPServerStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *, pipelining: bool = True, handshake_delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.pipelining = pipelining
+        self.handshake_delay = handshake_delay
+        self.received: list[ReceivedEmail] = []
+        self.connections = 0
+        self._sockets: list[socket.socket] = []
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return int(self.server_address[1])
+
+    def track(self, sock: socket.socket) -> None:
+        with self._lock:
+            self.connections += 1
+            self._sockets.append(sock)
+
+    def disconnect_all(self) -> None:
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "SMTPServerStub":
+        threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.disconnect_all()
+        self.server_close()
@@ -1,16 +1,18 @@
 import logging
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
 from typing import Any
 
 import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.core.smtp import OutgoingEmail, smtp_transport
+from app.core.templates import email_templates
+from app.core.tracing import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,36 +25,60 @@ class EmailData:
 
 
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_templates.render(template_name, context)
     return html_content
 
 
+def build_email_message(*, subject: str = "", html_content: str = "") -> Any:
+    return emails.Message(
+        subject=subject,
+        html=html_content,
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+
+
+def build_outgoing_email(*, email_to: str, email_data: EmailData) -> OutgoingEmail:
+    message = build_email_message(
+        subject=email_data.subject, html_content=email_data.html_content
+    )
+    message.set_mail_to(email_to)
+    return OutgoingEmail(
+        from_addr=str(settings.EMAILS_FROM_EMAIL),
+        to_addrs=[email_to],
+        data=message.as_string().encode(),
+    )
+
+
+def send_emails(*, messages: Sequence[tuple[str, EmailData]]) -> list[Exception | None]:
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    results: list[Exception | None] = []
+    outgoing: list[OutgoingEmail] = []
+    for email_to, email_data in messages:
+        # 单封邮件构建失败只标记这一封，不影响同批的其他邮件
+        try:
+            outgoing.append(
+                build_outgoing_email(email_to=email_to, email_data=email_data)
+            )
+            results.append(None)
+        except Exception as e:
+            results.append(e)
+    with span("smtp.send", f"{len(outgoing)} messages"):
+        sent = iter(smtp_transport.send_many(outgoing))
+    return [next(sent) if result is None else result for result in results]
+
+
 def send_email(
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
 ) -> None:
-    assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
+    email_data = EmailData(html_content=html_content, subject=subject)
+    (error,) = send_emails(messages=[(email_to, email_data)])
+    if error is not None:
+        logger.error(f"send email to {email_to} failed: {error}")
+    else:
+        logger.info(f"send email to {email_to} succeeded")
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -115,9 +141,10 @@ def generate_password_reset_token(email: str) -> str:
 
 def verify_password_reset_token(token: str) -> str | None:
     try:
-        decoded_token = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        with span("jwt.decode", "password_reset_token"):
+            decoded_token = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
@@ -0,0 +1,83 @@
+"""
+Measure CPU cost versus bytes saved for each response compression level.
+
+Payloads are a ``read_items`` page of 100 and 1000 rows and the OpenAPI
+document. For every available encoding (gzip always; br and zstd when
+``brotli``/``zstandard`` are installed) and level, the benchmark reports
+the compressed size, the ratio, the time to compress one payload and the
+resulting throughput, so the ``COMPRESSION_*_LEVEL`` settings can be picked
+from data.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_compression --repeat 50
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import Any
+
+from app.core.compression import ENCODINGS, compress
+from app.main import app
+from app.models import Item, ItemsPublic
+from benchmarks.common import print_results
+
+LEVELS = {
+    "gzip": [1, 6, 9],
+    "br": [1, 4, 8, 11],
+    "zstd": [1, 3, 9, 19],
+}
+
+
+def _payloads() -> dict[str, bytes]:
+    owner_id = uuid.uuid4()
+    payloads = {}
+    for rows in (100, 1000):
+        items = [
+            Item(
+                id=uuid.uuid4(),
+                title=f"Item {i}",
+                description="Lorem ipsum dolor sit amet, consectetur adipiscing",
+                owner_id=owner_id,
+            )
+            for i in range(rows)
+        ]
+        page = ItemsPublic.model_validate({"data": items, "count": rows})
+        payloads[f"items_{rows}"] = page.model_dump_json().encode()
+    payloads["openapi"] = json.dumps(app.openapi()).encode()
+    return payloads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    for name, data in _payloads().items():
+        for encoding in ENCODINGS:
+            for level in LEVELS[encoding]:
+                compressed = compress(encoding, level, data)
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    compress(encoding, level, data)
+                elapsed = (time.perf_counter() - start) / args.repeat
+                results.append(
+                    {
+                        "payload": name,
+                        "encoding": f"{encoding}-{level}",
+                        "bytes": len(data),
+                        "compressed": len(compressed),
+                        "saved_pct": 100 * (1 - len(compressed) / len(data)),
+                        "ms": elapsed * 1000,
+                        "mb_per_s": len(data) / elapsed / 1_000_000,
+                    }
+                )
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
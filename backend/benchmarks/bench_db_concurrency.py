@@ -0,0 +1,128 @@
+"""
+Compare the sync and async database paths under concurrent load.
+
+The sync path mirrors a plain ``def`` route: every request runs in
+Starlette's threadpool (40 threads by default) and holds a thread for its
+whole database wait. The async path mirrors an ``async def`` route using
+``AsyncSession``: requests wait on the event loop without taking a thread.
+
+Each simulated request runs the same queries as ``read_items`` (a count and
+a page of items). ``--db-latency-ms`` adds a ``pg_sleep`` to emulate a slower
+database or network so the difference in concurrency is visible.
+
+Usage (from the ``backend`` directory, with Postgres running)::
+
+    python -m benchmarks.bench_db_concurrency --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+import anyio.to_thread
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models import Item
+from benchmarks.common import print_results, summarize_latencies
+
+
+def _statements(page_size: int) -> tuple[Any, Any]:
+    count_statement = select(func.count()).select_from(Item)
+    page_statement = select(Item).limit(page_size)
+    return count_statement, page_statement
+
+
+async def run_sync(args: argparse.Namespace) -> dict[str, Any]:
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        pool_size=args.pool_size,
+        max_overflow=0,
+    )
+    count_statement, page_statement = _statements(args.page_size)
+    sleep = text("SELECT pg_sleep(:s)").bindparams(s=args.db_latency_ms / 1000)
+
+    def handle_request() -> None:
+        with Session(engine) as session:
+            if args.db_latency_ms:
+                session.execute(sleep)
+            session.exec(count_statement).one()
+            session.exec(page_statement).all()
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = args.threads
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await anyio.to_thread.run_sync(handle_request)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return {
+        "mode": f"sync (threads={args.threads})",
+        "requests": args.requests,
+        "req_per_s": args.requests / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+async def run_async(args: argparse.Namespace) -> dict[str, Any]:
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        pool_size=args.pool_size,
+        max_overflow=0,
+    )
+    count_statement, page_statement = _statements(args.page_size)
+    sleep = text("SELECT pg_sleep(:s)").bindparams(s=args.db_latency_ms / 1000)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                if args.db_latency_ms:
+                    await session.execute(sleep)
+                (await session.exec(count_statement)).one()
+                (await session.exec(page_statement)).all()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return {
+        "mode": "async",
+        "requests": args.requests,
+        "req_per_s": args.requests / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_sync(args)), asyncio.run(run_async(args))]
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare per-render cost of the email templates before and after the registry.
+
+``baseline`` reproduces the old ``render_email_template``: read the file and
+build a new ``jinja2.Template`` on every call. ``registry`` renders a
+template compiled once at startup, and ``registry+static`` additionally
+inlines ``project_name`` at compile time so the static HTML around it is
+emitted as a single string. ``cold start`` times compiling all templates
+with an empty and with a warm bytecode cache.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_email_templates --renders 2000
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+from jinja2 import FileSystemBytecodeCache, Template
+
+from app.core.templates import EMAIL_TEMPLATES_DIR, TemplateRegistry
+from benchmarks.common import print_results, summarize_latencies
+
+CONTEXTS: dict[str, dict[str, Any]] = {
+    "new_account.html": {
+        "project_name": "Full Stack FastAPI Project",
+        "username": "user@example.com",
+        "password": "changethis",
+        "email": "user@example.com",
+        "link": "http://localhost:5173",
+    },
+    "reset_password.html": {
+        "project_name": "Full Stack FastAPI Project",
+        "username": "user@example.com",
+        "email": "user@example.com",
+        "valid_hours": 48,
+        "link": "http://localhost:5173/reset-password?token=abc",
+    },
+    "test_email.html": {
+        "project_name": "Full Stack FastAPI Project",
+        "email": "user@example.com",
+    },
+}
+
+
+def _baseline(name: str, context: dict[str, Any]) -> str:
+    template_str = (EMAIL_TEMPLATES_DIR / name).read_text()
+    return str(Template(template_str).render(context))
+
+
+def _time(
+    mode: str,
+    render: Callable[[str, dict[str, Any]], str],
+    name: str,
+    renders: int,
+) -> dict[str, Any]:
+    context = CONTEXTS[name]
+    render(name, context)  # warm up
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(renders):
+        t = time.perf_counter()
+        render(name, context)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "template": name,
+        "renders_per_s": renders / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+def _cold_start(cache_dir: str, mode: str) -> dict[str, Any]:
+    start = time.perf_counter()
+    TemplateRegistry(
+        EMAIL_TEMPLATES_DIR,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        static_context={"project_name": "Full Stack FastAPI Project"},
+    ).load()
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "template": "all",
+        "renders_per_s": 0.0,
+        **summarize_latencies([elapsed]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--renders", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    registry = TemplateRegistry(EMAIL_TEMPLATES_DIR)
+    registry.load()
+    static = TemplateRegistry(
+        EMAIL_TEMPLATES_DIR,
+        static_context={"project_name": "Full Stack FastAPI Project"},
+    )
+    static.load()
+
+    modes: dict[str, Callable[[str, dict[str, Any]], str]] = {
+        "baseline": _baseline,
+        "registry": registry.render,
+        "registry+static": static.render,
+    }
+    results = [
+        _time(mode, render, name, args.renders)
+        for name in CONTEXTS
+        for mode, render in modes.items()
+    ]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results.append(_cold_start(cache_dir, "cold start (empty cache)"))
+        results.append(_cold_start(cache_dir, "cold start (bytecode cache)"))
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
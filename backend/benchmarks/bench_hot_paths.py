@@ -0,0 +1,495 @@
+"""
+Microbenchmark suite for the backend's hot paths.
+
+Each case times one call of a core function in a tight loop, the way
+``timeit`` does: the loop count is raised until one round takes at least
+``--min-time`` seconds, and the round is repeated ``--repeat`` times. The
+garbage collector stays enabled, because ORM objects and pydantic models
+allocate heavily in production too. Times are per call, in microseconds.
+
+Cases cover password hashing and verification (through the configured
+process pool), token creation and the JWT decode in
+``deps.get_current_principal``, ``ItemsPublic`` validation and serialization
+at several page sizes, email template rendering, and the ``crud`` functions
+against the configured Postgres. Database cases create a throwaway user and
+remove everything they wrote when the run ends. They are skipped when the
+database is unreachable or ``--no-db`` is given.
+
+Results can be written as JSON with ``--output``. ``--compare`` checks the
+current run against such a file and exits with status 1 if any case is more
+than ``--threshold`` slower than in the baseline. Cases are compared on the
+fastest round by default, which is the least sensitive to interference from
+other processes; ``--metric median`` compares medians instead. Baselines are
+only comparable on the same machine.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_hot_paths --output baseline.json
+    python -m benchmarks.bench_hot_paths --compare baseline.json
+    python -m benchmarks.bench_hot_paths --filter serialization --filter jwt
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, cast
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, col, delete, text
+
+from app import crud
+from app.api.deps import get_current_principal
+from app.api.serialization import get_type_adapter
+from app.core import security
+from app.core.config import settings
+from app.core.db import engine
+from app.core.security import Principal, password_hasher, principal_cache
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemsPublic,
+    Job,
+    User,
+    UserCreate,
+    UserUpdate,
+)
+from app.utils import render_email_template
+from benchmarks.bench_email_templates import CONTEXTS
+from benchmarks.common import print_results
+
+PAGE_SIZES = (10, 100, 1000)
+
+PASSWORD = "benchmark-password"
+
+# Job name used by the queue round-trip case, so real jobs are never claimed
+BENCH_JOB = "benchmark.noop"
+
+
+class SkipCase(Exception):
+    """Raised by a case's setup when it cannot run in this environment."""
+
+
+class Context:
+    """
+    State shared by the cases of one run.
+
+    The database session and the benchmark user are created on first use,
+    and everything written to the database is removed by ``close``.
+    """
+
+    def __init__(self, use_db: bool) -> None:
+        self.use_db = use_db
+        self._session: Session | None = None
+        self._user: User | None = None
+        self._db_error: str | None = None if use_db else "--no-db"
+        self.created_users: list[uuid.UUID] = []
+
+    @property
+    def session(self) -> Session:
+        if self._db_error is not None:
+            raise SkipCase(f"database unavailable ({self._db_error})")
+        if self._session is None:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except OperationalError as e:
+                self._db_error = str(e.orig).strip().splitlines()[0]
+                raise SkipCase(f"database unavailable ({self._db_error})")
+            self._session = Session(engine, expire_on_commit=False)
+        return self._session
+
+    @property
+    def user(self) -> User:
+        if self._user is None:
+            self._user = self.create_user()
+        return self._user
+
+    def create_user(self) -> User:
+        user_in = UserCreate(
+            email=f"bench-{uuid.uuid4().hex}@example.com", password=PASSWORD
+        )
+        user = crud.create_user(session=self.session, user_create=user_in)
+        self.created_users.append(user.id)
+        return user
+
+    def close(self) -> None:
+        if self._session is None:
+            return
+        session = self._session
+        session.rollback()
+        for user_id in self.created_users:
+            crud.purge_user(session=session, user_id=user_id, batch_size=10_000)
+        session.execute(delete(Job).where(col(Job.name) == BENCH_JOB))
+        session.commit()
+        session.close()
+
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    setup: Callable[[Context], Callable[[], Any]]
+
+
+CASES: list[Case] = []
+
+
+def case(
+    name: str, group: str
+) -> Callable[[Callable[[Context], Callable[[], Any]]], Callable[[Context], Any]]:
+    """Register a case whose setup returns the function to time."""
+
+    def decorator(
+        setup: Callable[[Context], Callable[[], Any]],
+    ) -> Callable[[Context], Any]:
+        CASES.append(Case(name, group, setup))
+        return setup
+
+    return decorator
+
+
+def _run_coroutine(coroutine: Any) -> Any:
+    # Drive a coroutine that completes without suspending, so the timing does
+    # not include an event loop round trip.
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended")
+
+
+@case("security.get_password_hash", "security")
+def _hash_password(_ctx: Context) -> Callable[[], Any]:
+    return lambda: security.get_password_hash(PASSWORD)
+
+
+@case("security.verify_password", "security")
+def _verify_password(_ctx: Context) -> Callable[[], Any]:
+    hashed = security.get_password_hash(PASSWORD)
+    return lambda: security.verify_password(PASSWORD, hashed)
+
+
+@case("security.create_access_token", "jwt")
+def _create_access_token(_ctx: Context) -> Callable[[], Any]:
+    subject = str(uuid.uuid4())
+    expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return lambda: security.create_access_token(subject, expires_delta=expires)
+
+
+@case("deps.get_current_principal (cached principal)", "jwt")
+def _decode_token(_ctx: Context) -> Callable[[], Any]:
+    user_id = uuid.uuid4()
+    token = security.create_access_token(str(user_id), timedelta(minutes=60))
+    principal_cache.set(
+        user_id, Principal(id=user_id, is_active=True, is_superuser=False)
+    )
+    if principal_cache.get(user_id) is None:
+        raise SkipCase("PRINCIPAL_CACHE_TTL_SECONDS is 0")
+    # A cached principal never touches the session
+    session = cast(Any, None)
+    return lambda: _run_coroutine(get_current_principal(session, token))
+
+
+def _items(page_size: int) -> list[Item]:
+    owner_id = uuid.uuid4()
+    return [
+        Item(
+            id=uuid.uuid4(),
+            title=f"Item {i}",
+            description="Lorem ipsum dolor sit amet",
+            owner_id=owner_id,
+        )
+        for i in range(page_size)
+    ]
+
+
+def _register_serialization(page_size: int) -> None:
+    def validate(_ctx: Context) -> Callable[[], Any]:
+        rows = _items(page_size)
+        return lambda: ItemsPublic.model_validate({"data": rows, "count": page_size})
+
+    def dump_json(_ctx: Context) -> Callable[[], Any]:
+        content = ItemsPublic.model_validate(
+            {"data": _items(page_size), "count": page_size}
+        )
+        adapter = get_type_adapter(ItemsPublic)
+        return lambda: adapter.dump_json(content)
+
+    case(f"ItemsPublic.model_validate[{page_size}]", "serialization")(validate)
+    case(f"ItemsPublic dump_json[{page_size}]", "serialization")(dump_json)
+
+
+for _page_size in PAGE_SIZES:
+    _register_serialization(_page_size)
+
+
+def _register_email_template(name: str) -> None:
+    def render(_ctx: Context) -> Callable[[], Any]:
+        context = CONTEXTS[name]
+        return lambda: render_email_template(template_name=name, context=context)
+
+    case(f"render_email_template[{name}]", "email")(render)
+
+
+for _template_name in CONTEXTS:
+    _register_email_template(_template_name)
+
+
+@case("crud.get_user_by_email", "crud")
+def _get_user_by_email(ctx: Context) -> Callable[[], Any]:
+    session, email = ctx.session, ctx.user.email
+    return lambda: crud.get_user_by_email(session=session, email=email)
+
+
+@case("crud.authenticate", "crud")
+def _authenticate(ctx: Context) -> Callable[[], Any]:
+    session, email = ctx.session, ctx.user.email
+    return lambda: crud.authenticate(session=session, email=email, password=PASSWORD)
+
+
+@case("crud.create_user", "crud")
+def _create_user(ctx: Context) -> Callable[[], Any]:
+    ctx.session  # noqa: B018  # skip early when the database is unavailable
+    return ctx.create_user
+
+
+@case("crud.update_user", "crud")
+def _update_user(ctx: Context) -> Callable[[], Any]:
+    session, user = ctx.session, ctx.user
+    names = iter(range(sys.maxsize))
+
+    def update() -> Any:
+        user_in = UserUpdate(full_name=f"Benchmark {next(names)}")
+        return crud.update_user(session=session, db_user=user, user_in=user_in)
+
+    return update
+
+
+@case("crud.create_item", "crud")
+def _create_item(ctx: Context) -> Callable[[], Any]:
+    session, owner_id = ctx.session, ctx.user.id
+    item_in = ItemCreate(title="Benchmark item", description="Lorem ipsum")
+    return lambda: crud.create_item(session=session, item_in=item_in, owner_id=owner_id)
+
+
+@case("crud.get_job_queue_stats", "crud")
+def _job_queue_stats(ctx: Context) -> Callable[[], Any]:
+    session = ctx.session
+    return lambda: crud.get_job_queue_stats(session=session)
+
+
+@case("crud job round trip (enqueue, claim, finish)", "crud")
+def _job_round_trip(ctx: Context) -> Callable[[], Any]:
+    session = ctx.session
+
+    def round_trip() -> None:
+        crud.enqueue_job(session=session, name=BENCH_JOB)
+        session.commit()
+        (job,) = crud.claim_jobs(
+            session=session, limit=1, visibility_timeout=60, names=[BENCH_JOB]
+        )
+        crud.finish_job(session=session, job=job)
+
+    return round_trip
+
+
+def measure(fn: Callable[[], Any], *, repeat: int, min_time: float) -> dict[str, Any]:
+    """Time ``fn`` and return per-call statistics in microseconds."""
+    timer = timeit.Timer(fn, "gc.enable()", globals={"gc": gc})
+    fn()  # warm up caches, connections and lazy imports
+    loops = 1
+    while (elapsed := timer.timeit(loops)) < min_time:
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+    rounds = [elapsed / loops]
+    rounds += [timer.timeit(loops) / loops for _ in range(repeat - 1)]
+    median = statistics.median(rounds)
+    return {
+        "loops": loops,
+        "median_us": median * 1e6,
+        "min_us": min(rounds) * 1e6,
+        "mean_us": statistics.fmean(rounds) * 1e6,
+        "stdev_us": statistics.stdev(rounds) * 1e6 if len(rounds) > 1 else 0.0,
+        "ops_per_s": 1 / median,
+    }
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    *,
+    threshold: float,
+    metric: str,
+) -> list[dict[str, Any]]:
+    """Compare ``metric`` with a baseline run and label each case."""
+    previous = {row["name"]: row for row in baseline}
+    rows = []
+    for row in results:
+        base = previous.pop(row["name"], None)
+        if base is None:
+            rows.append(
+                {
+                    "name": row["name"],
+                    "baseline_us": "-",
+                    "current_us": row[metric],
+                    "change_pct": "-",
+                    "status": "new",
+                }
+            )
+            continue
+        change = row[metric] / base[metric] - 1
+        if change > threshold:
+            status = "REGRESSED"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append(
+            {
+                "name": row["name"],
+                "baseline_us": base[metric],
+                "current_us": row[metric],
+                "change_pct": change * 100,
+                "status": status,
+            }
+        )
+    for base in previous.values():
+        rows.append(
+            {
+                "name": base["name"],
+                "baseline_us": base[metric],
+                "current_us": "-",
+                "change_pct": "-",
+                "status": "missing",
+            }
+        )
+    return rows
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def _context(use_db: bool) -> Iterator[Context]:
+    ctx = Context(use_db)
+    with ExitStack() as stack:
+        stack.callback(password_hasher.shutdown)
+        stack.callback(ctx.close)
+        password_hasher.start()
+        yield ctx
+
+
+def run(
+    cases: list[Case], *, use_db: bool, repeat: int, min_time: float
+) -> list[dict[str, Any]]:
+    results = []
+    with _context(use_db) as ctx:
+        for c in cases:
+            try:
+                fn = c.setup(ctx)
+            except SkipCase as e:
+                print(f"skipped {c.name}: {e}", file=sys.stderr)
+                continue
+            stats = measure(fn, repeat=repeat, min_time=min_time)
+            results.append({"name": c.name, "group": c.group, **stats})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        help="only run cases whose name or group contains this text (repeatable)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--no-db", action="store_true", help="skip crud cases")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="relative slowdown reported as a regression",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=["min", "median"],
+        default="min",
+        help="statistic compared with the baseline",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    cases = [
+        c
+        for c in CASES
+        if not args.filter or any(f in c.name or f in c.group for f in args.filter)
+    ]
+    if args.list:
+        for c in cases:
+            print(f"{c.group:<14} {c.name}")
+        return
+
+    results = run(
+        cases, use_db=not args.no_db, repeat=args.repeat, min_time=args.min_time
+    )
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "min_time": args.min_time,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.compare:
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_results(results, as_json=False)
+        return
+
+    with open(args.compare) as f:
+        baseline = json.load(f)["results"]
+    # Cases left out by --filter are not reported as missing
+    selected = {c.name for c in cases}
+    baseline = [row for row in baseline if row["name"] in selected]
+    rows = compare(
+        results, baseline, threshold=args.threshold, metric=f"{args.metric}_us"
+    )
+    print_results(rows, as_json=args.json)
+    if any(row["status"] == "REGRESSED" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure the per-request overhead of the request metrics middleware.
+
+A minimal ASGI app that sets ``scope["route"]`` the way the router does and
+returns an empty 200 is called directly, with and without
+``MetricsMiddleware`` in front of it, so the numbers isolate the middleware
+from routing, validation and the network. The cost of rendering ``/metrics``
+for a realistic number of time series is reported as well.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_metrics --requests 50000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.routes.utils import router
+from app.core.prometheus import MetricsMiddleware, RequestMetrics, render
+from app.main import custom_generate_unique_id
+from benchmarks.common import print_results, summarize_latencies
+
+ROUTE = router.routes[0]
+
+
+async def _endpoint(scope: Scope, _receive: Receive, send: Send) -> None:
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive() -> Message:
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(_message: Message) -> None:
+    pass
+
+
+async def _time(mode: str, app: ASGIApp, requests: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope: Scope = {"type": "http", "method": "GET", "path": "/"}
+        t = time.perf_counter()
+        await app(scope, _receive, _send)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    summary = summarize_latencies(latencies)
+    return {
+        "mode": mode,
+        "requests_per_s": requests / elapsed,
+        "mean_us": summary["mean_ms"] * 1000,
+        "p99_us": summary["p99_ms"] * 1000,
+    }
+
+
+def _render(series: int, repeat: int) -> dict[str, Any]:
+    metrics = RequestMetrics()
+    for i in range(series):
+        metrics.started("GET")
+        metrics.finished(f"operation-{i}", "GET", 200, 0.01)
+    snapshots = [metrics.snapshot()] * 4  # four worker processes
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render(snapshots)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        "mode": f"render {series} operations x 4 processes",
+        "requests_per_s": 1 / elapsed,
+        "mean_us": elapsed * 1_000_000,
+        "p99_us": 0.0,
+    }
+
+
+async def _run(requests: int) -> list[dict[str, Any]]:
+    middleware = MetricsMiddleware(
+        _endpoint,
+        metrics=RequestMetrics(),
+        generate_unique_id=custom_generate_unique_id,
+    )
+    await _time("warm up", middleware, 1000)
+    return [
+        await _time("no middleware", _endpoint, requests),
+        await _time("metrics middleware", middleware, requests),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args.requests))
+    results.append(_render(50, 200))
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare the default and the fast JSON response paths for list endpoints.
+
+The default path returns an ``ItemsPublic`` instance and lets FastAPI
+validate it again against ``response_model``, run ``jsonable_encoder`` and
+encode with the stdlib ``json`` module. The fast path (enabled with
+``FAST_JSON_RESPONSES``) encodes the already validated model straight to
+bytes with a cached pydantic ``TypeAdapter``.
+
+Both routes are served from an in-memory page of ORM ``Item`` rows, so the
+numbers isolate serialization cost from the database. Recent FastAPI
+releases already encode ``response_model`` output with pydantic, which
+narrows the end-to-end gap; the ``encode`` rows time the serialization step
+alone, comparing the ``jsonable_encoder`` + ``json`` path used by older
+releases with the cached ``TypeAdapter``.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_serialization --pages 100 1000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.api.serialization import fast_response, get_type_adapter
+from app.core.config import settings
+from app.models import Item, ItemsPublic
+from benchmarks.common import print_results, summarize_latencies
+
+
+def _build_app(rows: list[Item]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items", response_model=ItemsPublic)
+    def read_items() -> Any:
+        return fast_response(
+            ItemsPublic, ItemsPublic.model_validate({"data": rows, "count": len(rows)})
+        )
+
+    return app
+
+
+def _run(client: TestClient, fast: bool, requests: int, page: int) -> dict[str, Any]:
+    settings.FAST_JSON_RESPONSES = fast
+    client.get("/items")  # warm up
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        client.get("/items")
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "fast" if fast else "default",
+        "page_size": page,
+        "req_per_s": requests / elapsed,
+        "rows_per_s": requests * page / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+def _run_encode(rows: list[Item], fast: bool, requests: int) -> dict[str, Any]:
+    content = ItemsPublic.model_validate({"data": rows, "count": len(rows)})
+    adapter = get_type_adapter(ItemsPublic)
+
+    def encode() -> bytes:
+        if fast:
+            return adapter.dump_json(content)
+        validated = ItemsPublic.model_validate(content.model_dump())
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    encode()
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        encode()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "encode type_adapter" if fast else "encode jsonable_encoder",
+        "page_size": len(rows),
+        "req_per_s": requests / elapsed,
+        "rows_per_s": requests * len(rows) / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = []
+    for page in args.pages:
+        owner_id = uuid.uuid4()
+        rows = [
+            Item(
+                id=uuid.uuid4(),
+                title=f"Item {i}",
+                description="Lorem ipsum dolor sit amet",
+                owner_id=owner_id,
+            )
+            for i in range(page)
+        ]
+        with TestClient(_build_app(rows)) as client:
+            for fast in (False, True):
+                results.append(_run(client, fast, args.requests, page))
+        for fast in (False, True):
+            results.append(_run_encode(rows, fast, args.requests))
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare SMTP send throughput with and without the pooled transport.
+
+All modes talk to the in-process SMTP stand-in from the test suite, which
+sleeps ``--handshake-ms`` before its greeting to stand in for TCP, TLS and
+AUTH setup against a real relay. ``per-message`` opens a new session for
+every email (the old ``emails``-library behaviour), ``pooled`` keeps one
+session open without PIPELINING, and ``pooled+pipelining`` additionally
+sends MAIL FROM, RCPT TO and DATA in a single round trip.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.bench_smtp --messages 200 --handshake-ms 20
+"""
+
+import argparse
+import time
+from typing import Any
+
+from app.core.smtp import OutgoingEmail, SMTPOptions, SMTPTransport
+from app.tests.utils.smtp import SMTPServerStub
+from benchmarks.common import print_results, summarize_latencies
+
+BODY = b"Subject: Benchmark\r\nContent-Type: text/html\r\n\r\n" + b"<p>x</p>" * 256
+
+
+def _run(
+    mode: str,
+    *,
+    messages: int,
+    handshake_delay: float,
+    pipelining: bool,
+    max_messages_per_connection: int,
+) -> dict[str, Any]:
+    emails = [
+        OutgoingEmail(
+            from_addr="info@example.com",
+            to_addrs=[f"user{i}@example.com"],
+            data=BODY,
+        )
+        for i in range(messages)
+    ]
+    with SMTPServerStub(
+        pipelining=pipelining, handshake_delay=handshake_delay
+    ) as server:
+        transport = SMTPTransport(
+            SMTPOptions(host="127.0.0.1", port=server.port),
+            max_messages_per_connection=max_messages_per_connection,
+        )
+        latencies: list[float] = []
+        start = time.perf_counter()
+        for email in emails:
+            t = time.perf_counter()
+            transport.send(email)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        transport.close()
+    return {
+        "mode": mode,
+        "connections": server.connections,
+        "messages_per_s": messages / elapsed,
+        **summarize_latencies(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=20.0)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    handshake_delay = args.handshake_ms / 1000
+    modes = {
+        "per-message": (False, 1),
+        "pooled": (False, args.messages),
+        "pooled+pipelining": (True, args.messages),
+    }
+    results = [
+        _run(
+            mode,
+            messages=args.messages,
+            handshake_delay=handshake_delay,
+            pipelining=pipelining,
+            max_messages_per_connection=max_messages,
+        )
+        for mode, (pipelining, max_messages) in modes.items()
+    ]
+    print_results(results, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
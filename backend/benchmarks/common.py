@@ -0,0 +1,47 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Every benchmark reports its results as a list of flat dictionaries so they
+can be printed as a table or dumped as JSON.
+"""
+
+import json
+import statistics
+from collections.abc import Sequence
+from typing import Any
+
+
+def summarize_latencies(latencies: Sequence[float]) -> dict[str, float]:
+    """Return throughput-independent latency statistics in milliseconds."""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+
+    def percentile(fraction: float) -> float:
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def print_results(results: Sequence[dict[str, Any]], *, as_json: bool) -> None:
+    """Print benchmark results as JSON or as an aligned text table."""
+    if as_json:
+        print(json.dumps(list(results), indent=2))
+        return
+    if not results:
+        return
+    columns = list(results[0].keys())
+    rows = [
+        [f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+        for row in results
+    ]
+    widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths, strict=True)))
+    for r in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths, strict=True)))